@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Preview transport benchmark.
+Compares pushing preview frames as base64 strings through the Flet control
+channel with streaming raw JPEGs from the local MJPEG endpoint. Both paths
+deliver the same frames at 30 fps to a client on a loopback socket and are
+measured the same way: process CPU time per frame, bytes on the wire and
+publish-to-receive latency.
+
+Usage: python benchmark_preview.py [width] [height] [frames]
+"""
+import base64
+import http.client
+import json
+import socket
+import struct
+import sys
+import threading
+import time
+
+from src.controllers.encoder_pool import encode_jpeg
+from src.controllers.simulated_camera import SimulatedCamera
+from src.utils.mjpeg_server import MjpegServer
+
+
+def make_frames(width, height, count, quality=80):
+    """Pre-encode a set of distinct JPEG frames so encoding isn't part of the measurement."""
+    camera = SimulatedCamera(width, height)
+    return [encode_jpeg(camera.render(t=i * 0.05), quality) for i in range(count)]
+
+
+def _publish_paced(frames, fps, publish):
+    """Call publish(jpeg) for every frame at fps; returns {jpeg: publish time}."""
+    published_at = {}
+    interval = 1.0 / fps
+    started = time.perf_counter()
+    for index, jpeg in enumerate(frames):
+        published_at[jpeg] = time.perf_counter()
+        publish(jpeg)
+        time.sleep(max(0.0, started + (index + 1) * interval - time.perf_counter()))
+    return published_at
+
+
+def _measure(received, started, cpu_started):
+    """Wall and CPU time from the first publish to the last frame received."""
+    if not received:
+        return time.perf_counter() - started, time.process_time() - cpu_started
+    arrived, cpu_arrived, _ = received[-1]
+    return arrived - started, cpu_arrived - cpu_started
+
+
+def _latencies(received, published_at):
+    """Publish-to-receive time of every frame received."""
+    return [arrived - published_at[payload] for arrived, _, payload in received if payload in published_at]
+
+
+def bench_base64(frames, fps=30.0):
+    """Send frames as the base64 JSON patches page.update(image) produces, to a local socket client.
+
+    The client parses each message and decodes the image, as the Flet
+    client does before it can show the frame.
+    """
+    listener = socket.create_server(("127.0.0.1", 0))
+    received = []
+    ready = threading.Event()
+
+    def client():
+        conn = socket.create_connection(listener.getsockname())
+        stream = conn.makefile("rb")
+        ready.set()
+        while len(received) < len(frames):
+            header = stream.read(4)
+            if len(header) < 4:
+                break
+            message = json.loads(stream.read(struct.unpack(">I", header)[0]))
+            payload = base64.b64decode(message["payload"]["props"][0]["srcBase64"])
+            received.append((time.perf_counter(), time.process_time(), payload))
+        conn.close()
+
+    thread = threading.Thread(target=client, daemon=True)
+    thread.start()
+    sender, _ = listener.accept()
+    ready.wait(5)
+
+    wire_bytes = 0
+
+    def publish(jpeg):
+        nonlocal wire_bytes
+        img_base64 = base64.b64encode(jpeg).decode('utf-8')
+        # Roughly what Flet sends for page.update(image): a JSON patch with the new property
+        message = json.dumps({
+            "action": "updateControlProps",
+            "payload": {"props": [{"i": "_preview", "srcBase64": img_base64}]},
+        }).encode('utf-8')
+        sender.sendall(struct.pack(">I", len(message)) + message)
+        wire_bytes += len(message)
+
+    started, cpu_started = time.perf_counter(), time.process_time()
+    published_at = _publish_paced(frames, fps, publish)
+    thread.join(5)
+    elapsed, cpu = _measure(received, started, cpu_started)
+    sender.close()
+    listener.close()
+    return elapsed, cpu, wire_bytes, len(received), _latencies(received, published_at)
+
+
+def bench_mjpeg(frames, fps=30.0):
+    """Publish frames at fps through the MJPEG endpoint to a local HTTP client."""
+    server = MjpegServer()
+    server.start()
+
+    received = []
+    ready = threading.Event()
+
+    def client():
+        conn = http.client.HTTPConnection("127.0.0.1", server.port)
+        conn.request("GET", "/stream.mjpg")
+        response = conn.getresponse()
+        ready.set()
+        while len(received) < len(frames):
+            line = response.fp.readline()
+            if not line:
+                break
+            if line.lower().startswith(b"content-length:"):
+                length = int(line.split(b":")[1])
+                response.fp.readline()  # Blank line after the part headers
+                payload = response.fp.read(length)
+                received.append((time.perf_counter(), time.process_time(), payload))
+        conn.close()
+
+    thread = threading.Thread(target=client, daemon=True)
+    thread.start()
+    ready.wait(5)
+
+    started, cpu_started = time.perf_counter(), time.process_time()
+    published_at = _publish_paced(frames, fps, server.publish)
+    # A client that skipped frames waits for the rest until the timeout;
+    # the measurement ends at the last frame it received
+    thread.join(5)
+    elapsed, cpu = _measure(received, started, cpu_started)
+    wire_bytes = server.bytes_sent
+    server.stop()
+    return elapsed, cpu, wire_bytes, len(received), _latencies(received, published_at)
+
+
+def report(result, count, jpeg_bytes):
+    elapsed, cpu, wire_bytes, delivered, latencies = result
+    print(f"Delivered: {delivered}/{count} frames in {elapsed:.2f}s ({delivered / elapsed:.1f} fps)")
+    if not delivered:
+        return
+    print(f"CPU (sender + client): {cpu / delivered * 1000:.2f} ms/frame")
+    print(f"Bytes on the wire: {wire_bytes / delivered / 1024:.1f} KB/frame ({wire_bytes / jpeg_bytes:.2f}x JPEG size)")
+    if latencies:
+        latencies.sort()
+        print(f"Publish-to-receive latency: median {latencies[len(latencies) // 2] * 1000:.2f} ms, "
+              f"p95 {latencies[int(len(latencies) * 0.95)] * 1000:.2f} ms")
+
+
+def main():
+    width = int(sys.argv[1]) if len(sys.argv) > 1 else 1280
+    height = int(sys.argv[2]) if len(sys.argv) > 2 else 720
+    count = int(sys.argv[3]) if len(sys.argv) > 3 else 150
+
+    print(f"Encoding {count} frames at {width}x{height}...")
+    frames = make_frames(width, height, count)
+    jpeg_bytes = sum(len(jpeg) for jpeg in frames)
+    print(f"Average JPEG size: {jpeg_bytes / count / 1024:.1f} KB")
+
+    print("\n===== base64 / control channel =====")
+    report(bench_base64(frames), count, jpeg_bytes)
+
+    print("\n===== MJPEG / HTTP =====")
+    report(bench_mjpeg(frames), count, jpeg_bytes)
+
+if __name__ == "__main__":
+    main()
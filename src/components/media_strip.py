@@ -0,0 +1,255 @@
+import base64
+import cv2
+import flet as ft
+import os
+import threading
+from typing import Callable, List, Optional
+
+from src.controllers.encoder_pool import encode_jpeg
+from src.controllers.media_store import MediaItem, MediaStore
+from src.controllers.sprite_sheet import SpriteSheet
+from src.controllers.thumbnail_cache import ThumbnailCache
+
+
+class MediaStrip(ft.Container):
+    """Captured-media strip that shows a fixed window of items from a MediaStore.
+
+    The strip owns `window` thumbnail slots, created once. Scrolling (mouse
+    wheel / trackpad over the strip, or the arrow buttons) moves the window
+    through the store and re-points the same slots at other items, which
+    are fetched from the store on demand. The control tree and the size of
+    each update therefore stay the same however many items were captured.
+
+    With sprite_sheet=True the visible thumbnails are packed into a single
+    image instead of one Image control each, so a strip update is one
+    transfer rather than `window` of them (which matters in web mode).
+    Clicks are mapped back to items by their position on the sheet, and
+    when a capture arrives only its tile is drawn; the rest are shifted.
+
+    Given the width it is laid out in, the strip shrinks `thumb_size` so
+    the paging buttons and all `window` tiles fit without clipping, which
+    also keeps sheet coordinates equal to tap coordinates.
+    """
+
+    BUTTON_WIDTH = 48  # IconButton including its tap target
+    SPACING = 10
+
+    def __init__(
+        self,
+        store: MediaStore,
+        thumbnails: ThumbnailCache,
+        on_select: Optional[Callable[[MediaItem], None]] = None,
+        window: int = 6,
+        thumb_size: int = 120,
+        sprite_sheet: bool = False,
+        width: Optional[int] = None,
+    ):
+        super().__init__()
+        self.store = store
+        self.thumbnails = thumbnails
+        self.on_select = on_select
+        self.window = window
+        if width is not None:
+            available = width - 2 * (self.BUTTON_WIDTH + self.SPACING) - (window - 1) * self.SPACING
+            thumb_size = max(1, min(thumb_size, available // window))
+        self.thumb_size = thumb_size
+        self.sheet = SpriteSheet(window, thumb_size, spacing=self.SPACING) if sprite_sheet else None
+
+        self.offset = 0  # Index of the first shown item, counted from the newest
+        self._items: List[Optional[MediaItem]] = [None] * window
+        self._lock = threading.Lock()
+        # Sheet encodes take turns, so an encode of an older sheet never lands last
+        self._encode_lock = threading.Lock()
+        self._shown_version = 0
+
+        self.build()
+
+    def build(self):
+        """Build the fixed set of slots and the paging buttons"""
+        self._slots = []
+        for index in range(0 if self.sheet else self.window):
+            self._slots.append(
+                ft.Container(
+                    content=ft.Image(
+                        src=None,
+                        width=self.thumb_size,
+                        height=self.thumb_size,
+                        fit=ft.ImageFit.COVER,
+                        border_radius=5,
+                    ),
+                    width=self.thumb_size,
+                    height=self.thumb_size,
+                    border_radius=5,
+                    visible=False,
+                    on_click=lambda e, slot=index: self._select(slot),
+                )
+            )
+
+        self.newer_button = ft.IconButton(
+            icon=ft.Icons.CHEVRON_LEFT,
+            tooltip="Newer",
+            on_click=lambda e: self.scroll(-self.window),
+            icon_color="#ffffff",
+            disabled=True,
+        )
+        self.older_button = ft.IconButton(
+            icon=ft.Icons.CHEVRON_RIGHT,
+            tooltip="Older",
+            on_click=lambda e: self.scroll(self.window),
+            icon_color="#ffffff",
+            disabled=True,
+        )
+
+        if self.sheet is not None:
+            self.sheet_image = ft.Image(
+                src_base64=base64.b64encode(self.sheet.encode()).decode('utf-8'),
+                width=self.sheet.width,
+                height=self.sheet.height,
+                gapless_playback=True,
+            )
+            items = ft.GestureDetector(
+                content=self.sheet_image,
+                on_tap_down=self._on_sheet_tap,
+                on_scroll=self._on_scroll,
+                mouse_cursor=ft.MouseCursor.CLICK,
+            )
+        else:
+            items = ft.GestureDetector(
+                content=ft.Row(self._slots, spacing=self.SPACING),
+                on_scroll=self._on_scroll,
+                expand=True,
+            )
+
+        self.content = ft.Row(
+            [
+                self.newer_button,
+                items,
+                self.older_button,
+            ],
+            spacing=self.SPACING,
+            height=self.thumb_size,
+        )
+
+    def item_added(self):
+        """Call after adding an item to the store."""
+        with self._lock:
+            if self.offset > 0:
+                # Keep showing the same items while the user looks at older ones
+                self.offset += 1
+        self.refresh()
+
+    def scroll(self, delta: int):
+        """Move the window delta items towards older (positive) or newer (negative) media."""
+        with self._lock:
+            last_offset = max(0, self.store.count() - self.window)
+            offset = min(max(0, self.offset + delta), last_offset)
+            if offset == self.offset:
+                return
+            self.offset = offset
+        self.refresh()
+
+    def refresh(self):
+        """Point the slots at the items in the current window."""
+        if self.sheet is not None:
+            self._refresh_sheet()
+            return
+        requests = []
+        with self._lock:
+            offset = self.offset
+            items = self.store.fetch(offset, self.window)
+            for index, slot in enumerate(self._slots):
+                item = items[index] if index < len(items) else None
+                if item == self._items[index]:
+                    continue
+                self._items[index] = item
+                slot.visible = item is not None
+                slot.content.src = None
+                if item is not None:
+                    slot.tooltip = f"{item.media_type.capitalize()}: {os.path.basename(item.path)}"
+                    requests.append((index, item.path))
+            self.newer_button.disabled = offset == 0
+            self.older_button.disabled = offset + self.window >= self.store.count()
+        # Outside the lock: cache hits call back on this thread
+        for index, path in requests:
+            self.thumbnails.request(path, self._show_thumbnail)
+        self._update()
+
+    def _refresh_sheet(self):
+        """Sprite-sheet refresh: redraw only the tiles of items new to the window."""
+        with self._lock:
+            offset = self.offset
+            items = self.store.fetch(offset, self.window)
+            self._items = items + [None] * (self.window - len(items))
+            missing = [items[index].path for index in self.sheet.arrange([item.path for item in items])]
+            self.newer_button.disabled = offset == 0
+            self.older_button.disabled = offset + self.window >= self.store.count()
+        # Cached thumbnails are drawn now so the sheet goes out once
+        requests = [path for path in missing if not self._draw_tile(path, self.thumbnails.get(path))]
+        self._encode_sheet()
+        for path in requests:
+            self.thumbnails.request(path, self._show_thumbnail)
+        self._update()
+
+    def _draw_tile(self, path: str, thumb_path: Optional[str]) -> bool:
+        """Draw a thumbnail into the tile of path, wherever it is now. False if it can't be read."""
+        if thumb_path is None:
+            return False
+        # Read from disk without the lock; only the draw into the sheet needs it
+        image = cv2.imread(thumb_path, cv2.IMREAD_COLOR)
+        if image is None:
+            return False
+        with self._lock:
+            if path in self.sheet.keys:
+                self.sheet.draw(self.sheet.keys.index(path), image)
+        return True
+
+    def _encode_sheet(self) -> bool:
+        """Point the sheet image at the current sheet. Returns False if it was already current."""
+        with self._encode_lock:
+            with self._lock:
+                if self.sheet.version == self._shown_version:
+                    return False
+                version, canvas = self.sheet.version, self.sheet.canvas.copy()
+            jpeg = encode_jpeg(canvas, self.sheet.quality)
+            if jpeg is None:
+                return False
+            self.sheet_image.src_base64 = base64.b64encode(jpeg).decode('utf-8')
+            self._shown_version = version
+            return True
+
+    def _show_thumbnail(self, path: str, thumb_path: Optional[str]):
+        """Thumbnail callback; goes to wherever the item is now, ignored if it left the window."""
+        if thumb_path is None:
+            return
+        if self.sheet is not None:
+            if not self._draw_tile(path, thumb_path) or not self._encode_sheet():
+                return
+        else:
+            with self._lock:
+                # New captures shift items along while thumbnails are generated
+                index = next((index for index, item in enumerate(self._items)
+                              if item is not None and item.path == path), None)
+                if index is None:
+                    return
+                self._slots[index].content.src = thumb_path
+        self._update()
+
+    def _on_sheet_tap(self, e: ft.TapEvent):
+        index = self.sheet.tile_at(e.local_x, e.local_y)
+        if index is not None:
+            self._select(index)
+
+    def _on_scroll(self, e: ft.ScrollEvent):
+        delta = e.scroll_delta_y or e.scroll_delta_x or 0
+        if delta:
+            self.scroll(1 if delta > 0 else -1)
+
+    def _select(self, index: int):
+        item = self._items[index]
+        if item is not None and self.on_select is not None:
+            self.on_select(item)
+
+    def _update(self):
+        # Only the strip is sent, not the whole view
+        if self.page is not None:
+            self.update()
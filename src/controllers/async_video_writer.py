@@ -0,0 +1,150 @@
+import cv2
+import numpy as np
+import threading
+import time
+from typing import Dict, Optional, Tuple
+from src.controllers.bounded_queue import DropOldestQueue
+
+
+class AsyncVideoWriter:
+    """cv2.VideoWriter that encodes on its own thread, fed by a bounded DropOldestQueue.
+
+    Frames are placed on a constant-fps clock by capture time, skipping or
+    repeating frames as needed; release() drains the queue before releasing
+    the writer.
+    """
+
+    def __init__(self, path: str, fourcc: int, fps: float, size: Tuple[int, int],
+                 queue_size: int = 16, name: str = "video-writer"):
+        self.path = path
+        self.fps = fps
+        self.size = tuple(size)
+        self._writer = cv2.VideoWriter(path, fourcc, fps, self.size)
+        self.queue = DropOldestQueue(queue_size, name)
+        self._space = threading.Condition()
+
+        self.written = 0  # Captured frames written (not counting duplicates)
+        self.duplicated = 0
+        self.skipped = 0
+        self.errors = 0
+        self._clock_start = None  # Capture time of the first frame
+        self._next_slot = 0  # Output frame index the next write fills
+        self._last_frame = None
+        self._last_captured_at = None
+        self._latency_total = 0.0
+        self.max_latency = 0.0
+
+        self._thread = None
+        if self._writer.isOpened():
+            self._thread = threading.Thread(target=self._worker, name=name, daemon=True)
+            self._thread.start()
+
+    def isOpened(self) -> bool:
+        """Same as cv2.VideoWriter.isOpened(); False once released."""
+        return self._writer is not None and self._writer.isOpened()
+
+    def write(self, frame: np.ndarray, captured_at: Optional[float] = None, copy: bool = True,
+              wait: bool = False) -> bool:
+        """Queue a frame (copied unless copy=False) for writing. Returns False if the writer is closed.
+
+        With wait=True the call blocks while the queue is full instead of dropping a frame.
+        """
+        if self.queue.closed or self._thread is None:
+            return False
+        if captured_at is None:
+            captured_at = time.monotonic()
+        # Copy before any wait, so the frame is the one the caller passed in
+        if copy:
+            frame = frame.copy()
+        if wait:
+            with self._space:
+                while len(self.queue) >= self.queue.maxsize and self._thread.is_alive():
+                    self._space.wait(0.5)
+        self.queue.put((frame, captured_at))
+        return True
+
+    def release(self, timeout: float = 10.0) -> None:
+        """Write everything still queued, then release the underlying writer."""
+        self.queue.close()
+        if self._thread is None:
+            # The encoder thread never started
+            self._release_writer()
+            return
+        if self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+            if self._thread.is_alive():
+                # The encoder thread releases the writer once it has drained
+                print(f"Video writer did not drain within {timeout:.0f}s; "
+                      f"{len(self.queue)} frames still queued for {self.path}")
+
+    def _release_writer(self) -> None:
+        with self._space:
+            writer, self._writer = self._writer, None
+        if writer is not None:
+            writer.release()
+            print(f"Video writer released {self.path}: {self.stats()}")
+
+    @property
+    def duration(self) -> float:
+        """Length of the clip written so far, in seconds of capture time."""
+        if self._clock_start is None:
+            return 0.0
+        return self._last_captured_at - self._clock_start + 1.0 / self.fps
+
+    @property
+    def achieved_fps(self) -> float:
+        """Distinct captured frames per second of clip."""
+        return self.written / self.duration if self.written else 0.0
+
+    def stats(self) -> Dict[str, float]:
+        """Frame-clock, drop and capture-to-write latency counters for this clip."""
+        stats = {
+            "written": self.written,
+            "duplicated": self.duplicated,
+            "skipped": self.skipped,
+            "duration": round(self.duration, 2),
+            "target_fps": self.fps,
+            "achieved_fps": round(self.achieved_fps, 1),
+            "errors": self.errors,
+            "avg_latency_ms": round(self._latency_total / self.written * 1000, 1) if self.written else 0.0,
+            "max_latency_ms": round(self.max_latency * 1000, 1),
+        }
+        stats.update(self.queue.stats())
+        return stats
+
+    def _worker(self) -> None:
+        while True:
+            item = self.queue.get(timeout=0.5)
+            with self._space:
+                self._space.notify_all()
+            if item is None:
+                if self.queue.closed:
+                    # Closed and drained
+                    self._release_writer()
+                    return
+                continue
+            frame, captured_at = item
+            try:
+                if self._clock_start is None:
+                    self._clock_start = captured_at
+                slot = int(round((captured_at - self._clock_start) * self.fps))
+                if slot < self._next_slot:
+                    # Camera is running ahead of the output clock
+                    self.skipped += 1
+                    continue
+                # Cover slots the camera missed with the previous frame
+                while self._next_slot < slot and self._last_frame is not None:
+                    self._writer.write(self._last_frame)
+                    self.duplicated += 1
+                    self._next_slot += 1
+                self._writer.write(frame)
+                self._next_slot = slot + 1
+                self._last_frame = frame
+                self._last_captured_at = captured_at
+                self.written += 1
+                latency = time.monotonic() - captured_at
+                self._latency_total += latency
+                self.max_latency = max(self.max_latency, latency)
+            except Exception as e:
+                self.errors += 1
+                print(f"Error writing video frame: {e}")
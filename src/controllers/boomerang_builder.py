@@ -0,0 +1,134 @@
+import cv2
+import numpy as np
+import tempfile
+from typing import Callable, Dict, Optional
+from src.controllers.simulated_camera import FramePacer
+
+
+def loop_indices(count: int, speed_ramp: bool = False, min_speed: float = 0.5,
+                 max_speed: float = 2.0) -> np.ndarray:
+    """Clip frame indices for one forward-then-reverse pass over count frames.
+
+    With speed_ramp the step size follows a sine from min_speed at the
+    turnarounds to max_speed in between.
+    """
+    if count < 2:
+        return np.zeros(1, dtype=np.intp)
+    path_length = 2 * (count - 1)
+    if speed_ramp:
+        grid = np.linspace(0.0, path_length, path_length * 8 + 1)
+        speeds = min_speed + (max_speed - min_speed) * np.abs(np.sin(np.pi * grid / (count - 1)))
+        # Time to cover each grid step at the speed at its start
+        elapsed = np.concatenate(([0.0], np.cumsum(np.diff(grid) / speeds[:-1])))
+        positions = np.interp(np.arange(0.0, elapsed[-1]), elapsed, grid)
+    else:
+        positions = np.arange(path_length, dtype=np.float64)
+    positions = np.rint(positions).astype(np.intp) % path_length
+    # Fold the return half of the path back onto the clip
+    return np.where(positions < count, positions, path_length - positions)
+
+
+class BoomerangBuilder:
+    """Collects a short clip and writes it as a forward-and-reverse boomerang loop.
+
+    A clip larger than `ram_budget` bytes is kept in a memmap over a scratch
+    file instead of in RAM.
+    """
+
+    def __init__(self, max_frames: int = 45, fps: float = 30.0, loops: int = 3,
+                 speed_ramp: bool = True, ram_budget: int = 200 * 1024 * 1024,
+                 scratch_dir: Optional[str] = None):
+        if max_frames < 2:
+            raise ValueError("A boomerang needs at least two frames")
+        self.max_frames = max_frames
+        self.fps = fps
+        self.loops = loops
+        self.speed_ramp = speed_ramp
+        self.ram_budget = ram_budget
+        self.scratch_dir = scratch_dir
+
+        self._store = None
+        self._scratch = None
+        self.count = 0
+
+    @property
+    def is_spilled(self) -> bool:
+        """True if the clip is held in a memory-mapped scratch file."""
+        return self._scratch is not None
+
+    def _allocate(self, shape, dtype) -> None:
+        self.release()
+        shape = (self.max_frames,) + tuple(shape)
+        if int(np.prod(shape)) * np.dtype(dtype).itemsize <= self.ram_budget:
+            self._store = np.empty(shape, dtype=dtype)
+        else:
+            # Deleted automatically when closed (or when the process exits)
+            self._scratch = tempfile.TemporaryFile(prefix="boomerang_", dir=self.scratch_dir)
+            self._store = np.memmap(self._scratch, dtype=dtype, mode="w+", shape=shape)
+
+    def add(self, frame: np.ndarray) -> bool:
+        """Copy a frame into the clip. Returns False once the clip is full."""
+        if self._store is None or self.count == 0 and self._store.shape[1:] != frame.shape:
+            self._allocate(frame.shape, frame.dtype)
+        if self.count >= self.max_frames or frame.shape != self._store.shape[1:]:
+            return False
+        np.copyto(self._store[self.count], frame)
+        self.count += 1
+        return True
+
+    def capture(self, get_frame: Callable[[], Optional[np.ndarray]],
+                on_progress: Optional[Callable[[int, int], None]] = None) -> int:
+        """Fill the clip from get_frame() at `fps` until max_frames are collected; returns the count.
+
+        on_progress(captured, total) is called after each frame.
+        """
+        self.count = 0
+        pacer = FramePacer(self.fps)
+        while self.count < self.max_frames:
+            frame = get_frame()
+            if frame is not None:
+                if not self.add(frame):
+                    break  # Resolution changed; keep the frames we have
+                if on_progress is not None:
+                    on_progress(self.count, self.max_frames)
+            pacer.wait()
+        if self.is_spilled:
+            # Write the dirty pages back so the kernel can reclaim them freely
+            self._store.flush()
+        return self.count
+
+    def write(self, path: str) -> int:
+        """Write the boomerang loop (repeated `loops` times) to an mp4 and return the frame count."""
+        if self.count == 0:
+            raise ValueError("No frames captured")
+        height, width = self._store.shape[1:3]
+        writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), self.fps, (width, height))
+        if not writer.isOpened():
+            raise IOError(f"Failed to open video writer for {path}")
+        written = 0
+        try:
+            indices = loop_indices(self.count, self.speed_ramp)
+            for _ in range(self.loops):
+                for index in indices:
+                    # A view into the store (or memmap), not a copy
+                    writer.write(self._store[index])
+                    written += 1
+        finally:
+            writer.release()
+        return written
+
+    def release(self) -> None:
+        """Free the clip and delete the scratch file, if any."""
+        self._store = None
+        if self._scratch is not None:
+            self._scratch.close()
+            self._scratch = None
+        self.count = 0
+
+    def stats(self) -> Dict[str, object]:
+        """Clip size and where it is stored."""
+        return {
+            "frames": self.count,
+            "bytes": self._store[:self.count].nbytes if self._store is not None else 0,
+            "spilled": self.is_spilled,
+        }
@@ -0,0 +1,70 @@
+import collections
+import threading
+from typing import Any, Dict, Optional
+
+
+class DropOldestQueue:
+    """Bounded FIFO between two pipeline stages.
+
+    put() never blocks: when the queue is full the oldest item is dropped and counted.
+    """
+
+    def __init__(self, maxsize: int, name: str = ""):
+        if maxsize < 1:
+            raise ValueError("DropOldestQueue needs a maxsize of at least 1")
+        self.name = name
+        self.maxsize = maxsize
+        self._items = collections.deque()
+        self._not_empty = threading.Condition(threading.Lock())
+        self._closed = False
+        self.enqueued = 0
+        self.dropped = 0
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    @property
+    def closed(self) -> bool:
+        """True once close() was called; items already queued can still be read."""
+        return self._closed
+
+    def put(self, item: Any) -> bool:
+        """Append an item, discarding the oldest one if full. Returns True if one was dropped."""
+        with self._not_empty:
+            if self._closed:
+                return False
+            dropped = False
+            if len(self._items) >= self.maxsize:
+                self._items.popleft()
+                self.dropped += 1
+                dropped = True
+            self._items.append(item)
+            self.enqueued += 1
+            self._not_empty.notify()
+            return dropped
+
+    def get(self, timeout: Optional[float] = None) -> Optional[Any]:
+        """Pop the oldest item, waiting up to timeout. Returns None on timeout or when closed."""
+        with self._not_empty:
+            if not self._items and not self._closed:
+                self._not_empty.wait(timeout)
+            if not self._items:
+                return None
+            return self._items.popleft()
+
+    def clear(self) -> int:
+        """Discard everything queued and return how many items were removed."""
+        with self._not_empty:
+            count = len(self._items)
+            self._items.clear()
+            return count
+
+    def close(self) -> None:
+        """Wake up any waiting consumer; later puts are ignored."""
+        with self._not_empty:
+            self._closed = True
+            self._not_empty.notify_all()
+
+    def stats(self) -> Dict[str, int]:
+        """Counters for this queue."""
+        return {"enqueued": self.enqueued, "dropped": self.dropped, "depth": len(self._items)}
@@ -0,0 +1,137 @@
+import cv2
+import numpy as np
+import time
+from typing import Dict, List, Optional
+from src.controllers.encoder_pool import decode_jpeg
+from src.controllers.frame_ring import CompressedFrameRing, FrameRef, FrameRing
+
+
+def sharpness_scores(grays: np.ndarray) -> np.ndarray:
+    """Variance of the Laplacian for each image in an (N, H, W) grayscale stack; blurred frames score lower."""
+    stack = grays.astype(np.float32)
+    laplacian = (
+        stack[:, :-2, 1:-1] + stack[:, 2:, 1:-1]
+        + stack[:, 1:-1, :-2] + stack[:, 1:-1, 2:]
+        - 4.0 * stack[:, 1:-1, 1:-1]
+    )
+    return laplacian.reshape(len(stack), -1).var(axis=1)
+
+
+class BurstCapture:
+    """Grabs a short burst of frames at the shutter and keeps the sharpest one.
+
+    A burst is up to `count` frames or `window` seconds, scored on a
+    downscaled grayscale crop of the central `roi` fraction.
+    """
+
+    def __init__(self, count: int = 5, window: float = 0.2, roi: float = 0.6,
+                 score_width: int = 320):
+        if count < 1:
+            raise ValueError("BurstCapture needs at least one frame")
+        self.count = count
+        self.window = window
+        self.roi = roi
+        self.score_width = score_width
+
+        self.last_scores = []
+        self.last_elapsed = 0.0  # Seconds from capture() to the chosen frame
+
+    def _score_input(self, frame: np.ndarray) -> np.ndarray:
+        """Downscaled grayscale crop of the central ROI of a BGR or grayscale frame."""
+        height, width = frame.shape[:2]
+        crop_w, crop_h = max(3, int(width * self.roi)), max(3, int(height * self.roi))
+        x, y = (width - crop_w) // 2, (height - crop_h) // 2
+        crop = frame[y:y + crop_h, x:x + crop_w]
+        if crop.ndim == 3:
+            crop = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY)
+        if crop_w > self.score_width:
+            size = (self.score_width, max(3, crop_h * self.score_width // crop_w))
+            crop = cv2.resize(crop, size, interpolation=cv2.INTER_AREA)
+        return crop
+
+    def capture(self, frame_ring: FrameRing) -> Optional[FrameRef]:
+        """Return a private copy of the sharpest frame of a burst read from frame_ring."""
+        started = time.monotonic()
+        deadline = started + self.window
+
+        ref = frame_ring.latest()
+        if ref is None:
+            return None
+        # Ring slots are reused while we wait, so each frame is copied into
+        # a burst buffer allocated once per capture
+        burst = np.empty((self.count,) + ref.frame.shape, dtype=ref.frame.dtype)
+        refs = []
+        while ref is not None:
+            np.copyto(burst[len(refs)], ref.frame)
+            if frame_ring.is_valid(ref.seq):
+                refs.append(FrameRef(burst[len(refs)], ref.seq, ref.timestamp))
+            if len(refs) == self.count:
+                break
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            ref = frame_ring.wait_for_frame(ref.seq, remaining)
+            if ref is not None and ref.frame.shape != burst.shape[1:]:
+                break  # Resolution changed mid-burst; keep what we have
+
+        if not refs:
+            # Every burst frame was overwritten while copying; fall back to the latest
+            self.last_scores = []
+            self.last_elapsed = time.monotonic() - started
+            return frame_ring.snapshot()
+        best = refs[self._best([self._score_input(ref.frame) for ref in refs])]
+        self.last_elapsed = time.monotonic() - started
+        return best
+
+    def capture_compressed(self, compressed_ring: CompressedFrameRing) -> Optional[FrameRef]:
+        """Like capture(), for JPEG frames from a camera in MJPG passthrough mode."""
+        started = time.monotonic()
+        deadline = started + self.window
+
+        item = compressed_ring.latest()
+        items = []
+        while item is not None:
+            items.append(item)
+            remaining = deadline - time.monotonic()
+            if len(items) == self.count or remaining <= 0:
+                break
+            item = compressed_ring.wait_for_frame(item.seq, remaining)
+        if not items:
+            return None
+
+        grays, decoded = [], []
+        reduction = None
+        for item in items:
+            if reduction is None:
+                # Pick the largest JPEG reduction that still leaves score_width pixels in the ROI
+                full = decode_jpeg(item.data, 8, grayscale=True)
+                if full is None:
+                    continue
+                reduction = 1
+                while reduction < 8 and full.shape[1] * 8 * self.roi / (reduction * 2) >= self.score_width:
+                    reduction *= 2
+            gray = decode_jpeg(item.data, reduction, grayscale=True)
+            if gray is None:
+                continue
+            gray = self._score_input(gray)
+            if grays and gray.shape != grays[0].shape:
+                break  # Resolution changed mid-burst; keep what we have
+            grays.append(gray)
+            decoded.append(item)
+        if not decoded:
+            return None
+
+        best = decoded[self._best(grays)]
+        frame = decode_jpeg(best.data)
+        self.last_elapsed = time.monotonic() - started
+        return FrameRef(frame, best.seq, best.timestamp) if frame is not None else None
+
+    def _best(self, grays: List[np.ndarray]) -> int:
+        """Score a burst and return the index of its sharpest frame."""
+        scores = sharpness_scores(np.stack(grays))
+        self.last_scores = [round(float(score), 1) for score in scores]
+        return int(np.argmax(scores))
+
+    def stats(self) -> Dict[str, object]:
+        """Scores and timing of the most recent burst."""
+        return {"scores": self.last_scores, "elapsed_ms": round(self.last_elapsed * 1000, 1)}
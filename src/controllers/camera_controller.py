@@ -3,8 +3,15 @@ import numpy as np
 import time
 import threading
 import os
-from typing import Optional, List, Tuple
+from typing import Callable, Optional, Tuple
 from datetime import datetime
+from src.controllers.async_video_writer import AsyncVideoWriter
+from src.controllers.burst_capture import BurstCapture
+from src.controllers.camera_discovery import CameraDiscovery
+from src.controllers.encoder_pool import encode_jpeg
+from src.controllers.frame_ring import FrameRing
+from src.controllers.photo_saver import PhotoSaveQueue
+from src.controllers.simulated_camera import SimulatedCamera, FramePacer
 
 class CameraController:
     """Camera controller for handling camera operations in the SelfieBooth application."""
@@ -15,8 +22,9 @@ class CameraController:
         self.camera_id = 0  # Default camera
         self.frame_width = 1280
         self.frame_height = 720
-        self.preview_lock = threading.Lock()
-        self.latest_frame = None
+        self.frame_ring = FrameRing()
+        self.burst = BurstCapture()
+        self.photo_saver = PhotoSaveQueue()
         self.video_writer = None
         self.is_recording = False
         self.recording_start_time = 0
@@ -29,26 +37,20 @@ class CameraController:
         """Initialize camera and start frame capture."""
         try:
             print("Attempting to initialize camera...")
-            # First try to use the real camera
-            self.camera = cv2.VideoCapture(self.camera_id)
+            # Open the last known-good camera, or probe all devices in parallel
+            discovery = CameraDiscovery(width=self.frame_width, height=self.frame_height)
+            self.camera, camera_info = discovery.open()
             
-            if not self.camera.isOpened():
-                print(f"Could not open real camera (ID: {self.camera_id}), using simulated camera instead")
+            if self.camera is None:
+                print("Could not open a real camera, using simulated camera instead")
                 # Use a simulated camera feed (colored noise pattern)
                 self._start_simulated_capture()
                 self.is_initialized = True
                 print("Simulated camera initialized successfully")
                 return True
             
-            # Set camera resolution
-            print(f"Camera opened successfully, setting resolution to {self.frame_width}x{self.frame_height}")
-            self.camera.set(cv2.CAP_PROP_FRAME_WIDTH, self.frame_width)
-            self.camera.set(cv2.CAP_PROP_FRAME_HEIGHT, self.frame_height)
-            
-            # Check if resolution was set correctly
-            actual_width = self.camera.get(cv2.CAP_PROP_FRAME_WIDTH)
-            actual_height = self.camera.get(cv2.CAP_PROP_FRAME_HEIGHT)
-            print(f"Actual camera resolution: {actual_width}x{actual_height}")
+            self.camera_id = camera_info.device
+            print(f"Actual camera resolution: {camera_info.width}x{camera_info.height}")
             
             # Test read a frame to make sure camera is working
             ret, test_frame = self.camera.read()
@@ -56,6 +58,7 @@ class CameraController:
                 print("Could not read test frame from camera, using simulated camera instead")
                 self.camera.release()
                 self.camera = None
+                discovery.clear_cache()
                 self._start_simulated_capture()
                 self.is_initialized = True
                 print("Simulated camera initialized successfully")
@@ -63,8 +66,7 @@ class CameraController:
             else:
                 print(f"Successfully read test frame with shape: {test_frame.shape}")
                 # Store this first frame so we have something to show immediately
-                with self.preview_lock:
-                    self.latest_frame = test_frame.copy()
+                self.frame_ring.push(test_frame)
             
             # Start background thread to continuously read frames
             self._start_frame_capture()
@@ -94,19 +96,23 @@ class CameraController:
             frame_count = 0
             while self.is_initialized and self.camera is not None:
                 try:
-                    ret, frame = self.camera.read()
+                    # Read straight into the next ring slot; OpenCV only
+                    # allocates a new array if the camera changed resolution
+                    ret, frame = self.camera.read(self.frame_ring.begin_write())
                     if ret:
                         # Increment frame counter and log every 30 frames (approximately once per second)
                         frame_count += 1
                         if frame_count % 30 == 0:
                             print(f"Camera captured frame #{frame_count} successfully. Shape: {frame.shape}")
                         
-                        # If recording, write frame to video
-                        if self.is_recording and self.video_writer:
-                            self.video_writer.write(frame)
+                        timestamp = time.monotonic()
+                        # If recording, queue a copy for the writer thread (read the
+                        # attribute once; stop_video_recording() may clear it meanwhile)
+                        writer = self.video_writer
+                        if self.is_recording and writer is not None:
+                            writer.write(frame, timestamp)
                         
-                        with self.preview_lock:
-                            self.latest_frame = frame
+                        self.frame_ring.commit(frame, timestamp)
                     else:
                         print("Camera.read() returned False. Camera may be disconnected.")
                     time.sleep(0.01)  # Small sleep to avoid maxing out CPU
@@ -123,74 +129,39 @@ class CameraController:
         
     def _start_simulated_capture(self):
         """Start a background thread to generate simulated camera frames."""
+        simulator = SimulatedCamera(self.frame_width, self.frame_height)
+        
         def generate_frames():
-            width = 640
-            height = 480
-            frame_count = 0
-            
             print("Starting simulated camera thread...")
             
             # Generate an initial frame immediately
-            initial_frame = np.zeros((height, width, 3), dtype=np.uint8)
-            
-            # Add text overlay to initial frame
-            text = "SIMULATED CAMERA INITIALIZING..."
-            font = cv2.FONT_HERSHEY_SIMPLEX
-            text_size = cv2.getTextSize(text, font, 1, 2)[0]
-            text_x = (width - text_size[0]) // 2
-            text_y = height // 2
-            cv2.putText(initial_frame, text, (text_x, text_y), font, 1, (255, 255, 255), 2)
+            initial_frame = simulator.render_placeholder()
             
             # Store initial frame
-            with self.preview_lock:
-                self.latest_frame = initial_frame.copy()
-                print(f"Initial simulated frame created with shape: {initial_frame.shape}")
+            self.frame_ring.push(initial_frame)
+            print(f"Initial simulated frame created with shape: {initial_frame.shape}")
             
+            pacer = FramePacer(simulator.fps)
             while self.is_initialized:
                 try:
-                    # Create a colored pattern that changes over time
-                    # to simulate a camera feed
-                    t = time.time() * 2  # Time factor for animation
-                    frame_count += 1
-                    
-                    # Create a base frame with gradient
-                    frame = np.zeros((height, width, 3), dtype=np.uint8)
+                    # Render the animated pattern directly into the next ring slot
+                    frame = simulator.render(out=self.frame_ring.begin_write(simulator.frame_shape))
                     
-                    # Generate a colorful gradient with some movement
-                    for y in range(0, height, 2):  # Step by 2 for better performance
-                        for x in range(0, width, 2):  # Step by 2 for better performance
-                            r = int(127 + 127 * np.sin(x / 50 + t))
-                            g = int(127 + 127 * np.sin(y / 50 + t * 0.7))
-                            b = int(127 + 127 * np.sin((x + y) / 100 + t * 1.3))
-                            # Set 2x2 block for better performance
-                            if x+1 < width and y+1 < height:
-                                frame[y:y+2, x:x+2] = [b, g, r]  # OpenCV uses BGR
+                    timestamp = time.monotonic()
+                    # If recording, queue a copy for the writer thread (read the
+                    # attribute once; stop_video_recording() may clear it meanwhile)
+                    writer = self.video_writer
+                    if self.is_recording and writer is not None:
+                        writer.write(frame, timestamp)
                     
-                    # Add a text overlay
-                    text = "SIMULATED CAMERA"
-                    font = cv2.FONT_HERSHEY_SIMPLEX
-                    text_size = cv2.getTextSize(text, font, 1, 2)[0]
-                    text_x = (width - text_size[0]) // 2
-                    text_y = height // 2
-                    cv2.putText(frame, text, (text_x, text_y), font, 1, (255, 255, 255), 2)
-                    
-                    # Add frame counter
-                    counter_text = f"Frame: {frame_count}"
-                    cv2.putText(frame, counter_text, (10, height - 20), font, 0.5, (255, 255, 255), 1)
-                    
-                    # If recording, write frame to video
-                    if self.is_recording and self.video_writer:
-                        self.video_writer.write(frame)
-                    
-                    # Store the frame safely
-                    with self.preview_lock:
-                        self.latest_frame = frame.copy()
+                    # Publish the frame to readers
+                    self.frame_ring.commit(frame, timestamp)
                     
                     # Log occasionally
-                    if frame_count % 30 == 0:
-                        print(f"Generated simulated frame #{frame_count}")
+                    if simulator.frame_count % 30 == 0:
+                        print(f"Generated simulated frame #{simulator.frame_count}")
                     
-                    time.sleep(0.033)  # ~30 FPS
+                    pacer.wait()
                 except Exception as e:
                     print(f"Simulated frame generation error: {e}")
                     import traceback
@@ -202,50 +173,51 @@ class CameraController:
         thread.start()
         print("Simulated camera thread started")
     
+    @property
+    def latest_frame(self) -> Optional[np.ndarray]:
+        """Read-only view of the newest frame, kept for callers of the old attribute."""
+        ref = self.frame_ring.latest()
+        return ref.frame if ref is not None else None
+    
     def get_preview_frame(self) -> Optional[np.ndarray]:
-        """Get the latest frame for preview display."""
-        with self.preview_lock:
-            if self.latest_frame is None:
-                print("Warning: No frame available in get_preview_frame")
-                return None
-            
-            # Print frame info occasionally
-            if hasattr(self, "_frame_debug_counter"):
-                self._frame_debug_counter += 1
-                if self._frame_debug_counter % 30 == 0:  # Log every ~1 second
-                    print(f"Returning preview frame. Shape: {self.latest_frame.shape}")
-            else:
-                self._frame_debug_counter = 0
-                print("First frame retrieval from get_preview_frame")
-            
-            # Return a copy to avoid threading issues
-            return self.latest_frame.copy()
-        return None
+        """Get a read-only view of the latest frame for preview display."""
+        ref = self.frame_ring.latest()
+        if ref is None:
+            print("Warning: No frame available in get_preview_frame")
+            return None
+        
+        # Print frame info occasionally
+        if hasattr(self, "_frame_debug_counter"):
+            self._frame_debug_counter += 1
+            if self._frame_debug_counter % 30 == 0:  # Log every ~1 second
+                print(f"Returning preview frame #{ref.seq}. Shape: {ref.frame.shape}")
+        else:
+            self._frame_debug_counter = 0
+            print("First frame retrieval from get_preview_frame")
+        
+        return ref.frame
     
-    def capture_photo(self) -> Tuple[Optional[np.ndarray], Optional[str]]:
-        """Capture a high-quality photo frame and save it to disk."""
-        if not self.is_initialized or self.camera is None:
+    def capture_photo(self, on_saved: Optional[Callable[[str, Optional[Exception]], None]] = None
+                      ) -> Tuple[Optional[np.ndarray], Optional[str]]:
+        """Capture the sharpest frame of a short burst and queue it to be saved to disk.
+
+        on_saved(path, error) is called once it is on disk, so the returned path may not exist yet.
+        """
+        if not self.is_initialized or self.frame_ring.last_seq < 0:
             return None, None
         
-        # For better quality, we directly read a new frame
-        # rather than using the preview frame
-        for _ in range(3):  # Skip a few frames to let camera adjust
-            self.camera.read()
-        
-        ret, frame = self.camera.read()
-        if not ret:
+        best = self.burst.capture(self.frame_ring)
+        if best is None:
             return None, None
+        print(f"Burst capture: {self.burst.stats()}")
         
-        # Save the image
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        # Queue the image; milliseconds keep rapid shots from colliding
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")[:-3]
         filename = f"photo_{timestamp}.jpg"
         filepath = os.path.join(self.output_dir, filename)
+        self.photo_saver.save(best.frame, filepath, on_saved)
         
-        # Convert from BGR to RGB for saving
-        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        cv2.imwrite(filepath, cv2.cvtColor(rgb_frame, cv2.COLOR_RGB2BGR))
-        
-        return frame, filepath
+        return best.frame, filepath
     
     def start_video_recording(self) -> Optional[str]:
         """Start recording video to a file."""
@@ -257,9 +229,10 @@ class CameraController:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             output_path = os.path.join(self.output_dir, f"video_{timestamp}.mp4")
             
-            # Initialize video writer
+            # Initialize video writer; it encodes on its own thread so the
+            # capture loop only pays for a frame copy
             fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-            self.video_writer = cv2.VideoWriter(
+            self.video_writer = AsyncVideoWriter(
                 output_path,
                 fourcc,
                 30.0,  # FPS
@@ -285,9 +258,12 @@ class CameraController:
             # Calculate recording duration
             duration = time.time() - self.recording_start_time
             
-            # Stop recording
+            # Stop recording; release() writes any queued frames first
             self.is_recording = False
             self.video_writer.release()
+            print(f"Recorded clip: {self.video_writer.stats()}")
+            # The clip length follows capture timestamps, so report that
+            duration = self.video_writer.duration or duration
             self.video_writer = None
             
             return True, duration
@@ -309,6 +285,9 @@ class CameraController:
         if self.is_recording and self.video_writer:
             self.stop_video_recording()
         
+        # Let queued photos reach the disk
+        self.photo_saver.close()
+        
         # Release camera
         if self.camera is not None:
             try:
@@ -317,26 +296,16 @@ class CameraController:
                 print(f"Error releasing camera: {e}")
             self.camera = None
     
-    def frame_to_bytes(self, frame: np.ndarray) -> bytes:
+    def frame_to_bytes(self, frame: np.ndarray, quality: int = 80) -> bytes:
         """Convert OpenCV frame to bytes for Flet image display."""
         try:
-            # Convert BGR to RGB for display
-            rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            
             # Reduce the image size for better performance if needed
             # This is especially important for iPad where large images can cause performance issues
-            if frame.shape[1] > 640:  # If width > 640
-                scale_factor = 640.0 / frame.shape[1]
-                width = 640
-                height = int(frame.shape[0] * scale_factor)
-                rgb_frame = cv2.resize(rgb_frame, (width, height), interpolation=cv2.INTER_AREA)
-            
-            # Encode as JPEG with quality setting (0-100), lower for better performance
-            encode_params = [int(cv2.IMWRITE_JPEG_QUALITY), 80]  # 80% quality
-            _, buffer = cv2.imencode('.jpg', rgb_frame, encode_params)
+            scale = min(1.0, 640.0 / frame.shape[1])
             
-            # Return just the bytes - base64 encoding will be done in the view
-            return buffer.tobytes()
+            # imencode expects BGR, so the frame is encoded as-is (no color
+            # conversion); base64 encoding will be done in the view
+            return encode_jpeg(frame, quality, scale) or b''
         except Exception as e:
             print(f"Error converting frame to bytes: {e}")
             return b''
@@ -0,0 +1,279 @@
+import cv2
+import glob
+import json
+import os
+import platform
+import re
+import threading
+import time
+from typing import List, NamedTuple, Optional, Tuple, Union
+
+
+class CameraInfo(NamedTuple):
+    """A camera configuration that is known to deliver frames."""
+    backend: int
+    device: Union[int, str]  # Camera index or device path (e.g. /dev/video2)
+    width: int
+    height: int
+    fourcc: str
+
+
+def fourcc_to_str(value: float) -> str:
+    """Decode a CAP_PROP_FOURCC value into its four-character code."""
+    code = int(value)
+    chars = "".join(chr((code >> (8 * i)) & 0xFF) for i in range(4))
+    return chars if chars.isprintable() else ""
+
+
+class _Probe:
+    """Result slot for one device probed in a worker thread."""
+
+    def __init__(self, device: Union[int, str]):
+        self.device = device
+        self.done = threading.Event()
+        self.abandoned = False
+        self.camera = None
+        self.info = None
+
+
+class CameraDiscovery:
+    """Finds a working camera, probing devices in parallel and caching the winner per requested resolution.
+
+    With passthrough=True an MJPG camera is switched to hand out undecoded
+    JPEG buffers when the driver supports it.
+    """
+
+    def __init__(self, width: Optional[int] = None, height: Optional[int] = None,
+                 cache_path: Optional[str] = None, max_index: int = 5,
+                 probe_timeout: float = 4.0, prefer_mjpg: bool = True, passthrough: bool = False):
+        self.width = width
+        self.height = height
+        self.max_index = max_index
+        self.probe_timeout = probe_timeout
+        self.prefer_mjpg = prefer_mjpg
+        self.passthrough = passthrough
+        if cache_path is None:
+            cache_path = os.path.join(os.path.expanduser("~"), ".selfiebooth", "camera_cache.json")
+        self.cache_path = cache_path
+
+    @staticmethod
+    def backends() -> List[int]:
+        """Capture backends worth trying on this platform, in order of preference."""
+        system = platform.system()
+        if system == "Linux":
+            return [cv2.CAP_V4L2, cv2.CAP_ANY]
+        if system == "Windows":
+            return [cv2.CAP_MSMF, cv2.CAP_DSHOW, cv2.CAP_ANY]
+        if system == "Darwin":
+            return [cv2.CAP_AVFOUNDATION, cv2.CAP_ANY]
+        return [cv2.CAP_ANY]
+
+    def devices(self) -> List[Union[int, str]]:
+        """Camera indices plus any extra /dev/video* nodes not covered by an index."""
+        devices: List[Union[int, str]] = list(range(self.max_index))
+        for path in sorted(glob.glob("/dev/video*")):
+            match = re.fullmatch(r"/dev/video(\d+)", path)
+            if match and int(match.group(1)) < self.max_index:
+                continue
+            devices.append(path)
+        return devices
+
+    def _cache_key(self) -> str:
+        """Cache entry for the requested resolution."""
+        return f"{self.width}x{self.height}" if self.width and self.height else "default"
+
+    def _read_cache(self) -> dict:
+        """All cache entries, keyed by requested resolution."""
+        with open(self.cache_path, "r") as f:
+            entries = json.load(f)
+        if not isinstance(entries, dict) or "backend" in entries:
+            return {}  # Written before entries were keyed by resolution
+        return entries
+
+    def load_cache(self) -> Optional[CameraInfo]:
+        """Return the last known-good camera for the requested resolution, or None."""
+        try:
+            data = self._read_cache().get(self._cache_key())
+            if data is None:
+                return None
+            return CameraInfo(
+                backend=int(data["backend"]),
+                device=data["device"],
+                width=int(data["width"]),
+                height=int(data["height"]),
+                fourcc=str(data.get("fourcc", "")),
+            )
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"Ignoring unreadable camera cache {self.cache_path}: {e}")
+            return None
+
+    def _write_cache(self, entries: dict) -> None:
+        os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+        tmp_path = self.cache_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(entries, f, indent=2)
+        os.replace(tmp_path, self.cache_path)
+
+    def save_cache(self, info: CameraInfo) -> None:
+        """Persist a known-good camera configuration for the requested resolution."""
+        try:
+            try:
+                entries = self._read_cache()
+            except Exception:
+                entries = {}
+            entries[self._cache_key()] = info._asdict()
+            self._write_cache(entries)
+        except Exception as e:
+            print(f"Could not write camera cache {self.cache_path}: {e}")
+
+    def clear_cache(self) -> None:
+        """Forget the cached camera for the requested resolution so the next open() does a full probe."""
+        try:
+            entries = self._read_cache()
+            if entries.pop(self._cache_key(), None) is None:
+                return
+            if entries:
+                self._write_cache(entries)
+            else:
+                os.remove(self.cache_path)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"Could not update camera cache {self.cache_path}: {e}")
+
+    def _try_open(self, device: Union[int, str], backend: int,
+                  fourcc: str = "") -> Tuple[Optional[cv2.VideoCapture], Optional[CameraInfo]]:
+        """Open one device with one backend and confirm it delivers a frame."""
+        camera = None
+        try:
+            camera = cv2.VideoCapture(device, backend)
+            if not camera.isOpened():
+                camera.release()
+                return None, None
+
+            if not fourcc and self.prefer_mjpg and backend == cv2.CAP_V4L2:
+                fourcc = "MJPG"
+            if fourcc:
+                camera.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*fourcc))
+            if self.width and self.height:
+                camera.set(cv2.CAP_PROP_FRAME_WIDTH, self.width)
+                camera.set(cv2.CAP_PROP_FRAME_HEIGHT, self.height)
+
+            ret, frame = camera.read()
+            if not ret or frame is None:
+                print(f"Camera {device} opened with backend {backend} but could not read frames")
+                camera.release()
+                return None, None
+
+            info = CameraInfo(
+                backend=backend,
+                device=device,
+                width=int(camera.get(cv2.CAP_PROP_FRAME_WIDTH)) or frame.shape[1],
+                height=int(camera.get(cv2.CAP_PROP_FRAME_HEIGHT)) or frame.shape[0],
+                fourcc=fourcc_to_str(camera.get(cv2.CAP_PROP_FOURCC)),
+            )
+            return camera, info
+        except Exception as e:
+            print(f"Error with camera {device}, backend {backend}: {e}")
+            if camera is not None:
+                camera.release()
+            return None, None
+
+    def _probe_device(self, probe: _Probe, lock: threading.Lock) -> None:
+        """Worker: try each backend for one device until one works."""
+        try:
+            for backend in self.backends():
+                if probe.abandoned:
+                    return
+                camera, info = self._try_open(probe.device, backend)
+                if camera is None:
+                    continue
+                with lock:
+                    if probe.abandoned:
+                        # The coordinator already picked another camera or gave up
+                        camera.release()
+                    else:
+                        probe.camera = camera
+                        probe.info = info
+                return
+        finally:
+            probe.done.set()
+
+    def probe(self) -> Tuple[Optional[cv2.VideoCapture], Optional[CameraInfo]]:
+        """Probe all candidate devices concurrently and return the preferred working one."""
+        started = time.monotonic()
+        lock = threading.Lock()
+        probes = [_Probe(device) for device in self.devices()]
+        for probe in probes:
+            threading.Thread(target=self._probe_device, args=(probe, lock), daemon=True).start()
+
+        # Devices are ordered by preference; the first one that works wins
+        winner = None
+        deadline = started + self.probe_timeout
+        for probe in probes:
+            if not probe.done.wait(max(0.0, deadline - time.monotonic())):
+                print(f"Camera probe for {probe.device} timed out")
+                continue
+            if probe.camera is not None:
+                winner = probe
+                break
+
+        with lock:
+            for probe in probes:
+                if probe is winner:
+                    continue
+                probe.abandoned = True
+                if probe.camera is not None:
+                    probe.camera.release()
+                    probe.camera = None
+
+        print(f"Camera probe finished in {time.monotonic() - started:.2f}s")
+        if winner is None:
+            return None, None
+        return winner.camera, winner.info
+
+    @staticmethod
+    def enable_passthrough(camera: cv2.VideoCapture) -> bool:
+        """Switch an MJPG camera to delivering undecoded JPEG buffers. Returns True on success."""
+        try:
+            if fourcc_to_str(camera.get(cv2.CAP_PROP_FOURCC)) != "MJPG":
+                return False
+            if not camera.set(cv2.CAP_PROP_CONVERT_RGB, 0):
+                return False
+            ret, frame = camera.read()
+            if ret and frame is not None and (frame.ndim == 1 or frame.shape[0] == 1):
+                print("Camera delivers compressed MJPG frames (passthrough enabled)")
+                return True
+            # The backend ignored the request; go back to decoded frames
+            camera.set(cv2.CAP_PROP_CONVERT_RGB, 1)
+        except Exception as e:
+            print(f"Could not enable MJPG passthrough: {e}")
+        return False
+
+    def open(self) -> Tuple[Optional[cv2.VideoCapture], Optional[CameraInfo]]:
+        """Open the cached camera if it still works, otherwise run a full probe."""
+        camera, info = self._open()
+        if camera is not None and self.passthrough:
+            self.enable_passthrough(camera)
+        return camera, info
+
+    def _open(self) -> Tuple[Optional[cv2.VideoCapture], Optional[CameraInfo]]:
+        cached = self.load_cache()
+        if cached is not None:
+            print(f"Trying cached camera {cached.device} (backend {cached.backend}, {cached.fourcc or 'default'} format)")
+            camera, info = self._try_open(cached.device, cached.backend, cached.fourcc)
+            if camera is not None:
+                if info != cached:
+                    self.save_cache(info)
+                return camera, info
+            print("Cached camera is not available, probing all devices...")
+
+        camera, info = self.probe()
+        if camera is not None:
+            print(f"Using camera {info.device} with backend {info.backend} at {info.width}x{info.height}")
+            self.save_cache(info)
+        else:
+            self.clear_cache()
+        return camera, info
@@ -0,0 +1,79 @@
+import cv2
+import numpy as np
+from typing import Dict, Optional, Tuple
+
+
+class FrameChangeDetector:
+    """Cheap test for "has the scene changed since the last preview push?", on a tiny grayscale signature.
+
+    A frame is also let through every `keepalive` seconds so idle clients
+    still get refreshed.
+    """
+
+    def __init__(self, threshold: float = 2.0, cell_threshold: float = 12.0,
+                 signature_size: Tuple[int, int] = (32, 18), keepalive: float = 2.0):
+        self.threshold = threshold
+        self.cell_threshold = cell_threshold
+        self.signature_size = signature_size
+        self.keepalive = keepalive
+
+        self._reference = None  # Signature of the last frame let through
+        self._reference_time = None
+        self.changed = 0
+        self.unchanged = 0
+
+    def signature(self, frame: np.ndarray) -> np.ndarray:
+        """Downsampled grayscale signature of a BGR frame as int16."""
+        width, height = self.signature_size
+        # Subsample first so the area resize only touches a few thousand pixels
+        step = max(1, min(frame.shape[1] // (width * 4), frame.shape[0] // (height * 4)))
+        sample = np.ascontiguousarray(frame[::step, ::step])
+        small = cv2.resize(sample, (width, height), interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return small.astype(np.int16)
+
+    def compressed_signature(self, data: bytes) -> Optional[np.ndarray]:
+        """Signature of a JPEG frame, using a 1/8-size grayscale decode instead of a full decode."""
+        small = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_REDUCED_GRAYSCALE_8)
+        if small is None:
+            return None
+        small = cv2.resize(small, self.signature_size, interpolation=cv2.INTER_AREA)
+        return small.astype(np.int16)
+
+    def has_changed(self, frame: np.ndarray, timestamp: float) -> bool:
+        """True if frame differs enough from the last frame let through (which it then becomes)."""
+        return self._compare(self.signature(frame), timestamp)
+
+    def has_changed_compressed(self, data: bytes, timestamp: float) -> bool:
+        """has_changed() for a JPEG frame from an MJPG passthrough camera."""
+        signature = self.compressed_signature(data)
+        if signature is None:
+            return True
+        return self._compare(signature, timestamp)
+
+    def _compare(self, signature: np.ndarray, timestamp: float) -> bool:
+        changed = (
+            self._reference is None
+            or self._reference.shape != signature.shape
+            or timestamp - self._reference_time >= self.keepalive
+        )
+        if not changed:
+            diff = np.abs(signature - self._reference)
+            changed = diff.mean() >= self.threshold or diff.max() >= self.cell_threshold
+
+        if changed:
+            self._reference = signature
+            self._reference_time = timestamp
+            self.changed += 1
+        else:
+            self.unchanged += 1
+        return changed
+
+    def reset(self) -> None:
+        """Force the next frame through, e.g. after the preview was replaced."""
+        self._reference = None
+
+    def stats(self) -> Dict[str, int]:
+        """How many frames were let through and how many were skipped."""
+        return {"changed": self.changed, "unchanged": self.unchanged}
@@ -0,0 +1,124 @@
+import cv2
+import numpy as np
+import os
+import threading
+from typing import Any, Callable, Dict, Optional
+from src.controllers.bounded_queue import DropOldestQueue
+
+
+def encode_jpeg(frame: np.ndarray, quality: int = 85, scale: float = 1.0) -> Optional[bytes]:
+    """Optionally downscale a BGR frame and JPEG-encode it. Returns None on failure."""
+    if scale < 1.0:
+        size = (max(1, int(frame.shape[1] * scale)), max(1, int(frame.shape[0] * scale)))
+        frame = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+    ok, buffer = cv2.imencode('.jpg', frame, [int(cv2.IMWRITE_JPEG_QUALITY), int(quality)])
+    return buffer.tobytes() if ok else None
+
+
+_REDUCED_COLOR_FLAGS = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+_REDUCED_GRAYSCALE_FLAGS = {
+    1: cv2.IMREAD_GRAYSCALE,
+    2: cv2.IMREAD_REDUCED_GRAYSCALE_2,
+    4: cv2.IMREAD_REDUCED_GRAYSCALE_4,
+    8: cv2.IMREAD_REDUCED_GRAYSCALE_8,
+}
+
+
+def decode_jpeg(data, reduction: int = 1, grayscale: bool = False) -> Optional[np.ndarray]:
+    """Decode JPEG bytes to a BGR (or grayscale) frame, optionally at a cheaper 1/2, 1/4 or 1/8 size."""
+    flags = (_REDUCED_GRAYSCALE_FLAGS if grayscale else _REDUCED_COLOR_FLAGS)[reduction]
+    buffer = np.frombuffer(data, dtype=np.uint8) if isinstance(data, (bytes, bytearray)) else data
+    return cv2.imdecode(buffer, flags)
+
+
+class JpegEncoderPool:
+    """Thread pool that JPEG-encodes frames in parallel but delivers them in order.
+
+    Callbacks run under the delivery lock, in submission order, so they
+    should be quick.
+    """
+
+    def __init__(self, workers: Optional[int] = None, queue_size: Optional[int] = None,
+                 name: str = "encode"):
+        if workers is None:
+            workers = max(1, min(4, (os.cpu_count() or 2) - 1))
+        self.workers = workers
+        self.input_queue = DropOldestQueue(queue_size or workers * 2, name)
+
+        self._dequeue_lock = threading.Lock()
+        self._deliver_lock = threading.Lock()
+        self._next_ticket = 0
+        self._next_delivery = 0
+        self._finished = {}
+
+        self.encoded = 0
+        self.errors = 0
+        self.is_running = True
+        self._threads = []
+        for index in range(workers):
+            thread = threading.Thread(target=self._worker, name=f"{name}-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, frame: np.ndarray, on_encoded: Callable[[Any, Optional[bytes]], None],
+               quality: int = 85, scale: float = 1.0, tag: Any = None) -> bool:
+        """Queue a frame for encoding; on_encoded(tag, jpeg_bytes) is called in order.
+
+        Returns True if the queue was full and its oldest job was dropped.
+        """
+        return self.input_queue.put((frame, on_encoded, quality, scale, tag))
+
+    def close(self, timeout: float = 2.0) -> None:
+        """Stop the workers; queued jobs that have not started are discarded."""
+        self.is_running = False
+        self.input_queue.close()
+        for thread in self._threads:
+            if thread is not threading.current_thread():
+                thread.join(timeout)
+        self._threads = []
+
+    def stats(self) -> Dict[str, int]:
+        """Encoded/error counts plus the input queue counters."""
+        stats = {"workers": self.workers, "frames": self.encoded, "errors": self.errors}
+        stats.update(self.input_queue.stats())
+        return stats
+
+    def _worker(self) -> None:
+        while self.is_running:
+            # Ticket assignment must happen in dequeue order, so both happen
+            # under one lock; idle workers simply queue up on it
+            with self._dequeue_lock:
+                job = self.input_queue.get(timeout=0.5)
+                if job is None:
+                    continue
+                ticket = self._next_ticket
+                self._next_ticket += 1
+
+            frame, on_encoded, quality, scale, tag = job
+            try:
+                result = encode_jpeg(frame, quality, scale)
+            except Exception as e:
+                print(f"JPEG encode error: {e}")
+                result = None
+            self._deliver(ticket, on_encoded, tag, result)
+
+    def _deliver(self, ticket: int, on_encoded: Callable, tag: Any, result: Optional[bytes]) -> None:
+        """Park a finished job and flush every job that is now in order."""
+        with self._deliver_lock:
+            self._finished[ticket] = (on_encoded, tag, result)
+            while self._next_delivery in self._finished:
+                callback, ready_tag, ready_result = self._finished.pop(self._next_delivery)
+                self._next_delivery += 1
+                if ready_result is None:
+                    self.errors += 1
+                else:
+                    self.encoded += 1
+                try:
+                    callback(ready_tag, ready_result)
+                except Exception as e:
+                    print(f"Encoded frame callback error: {e}")
@@ -0,0 +1,224 @@
+import numpy as np
+import threading
+import time
+from typing import NamedTuple, Optional, Tuple
+
+
+class FrameRef(NamedTuple):
+    """A read-only view of one frame in a FrameRing."""
+    frame: np.ndarray
+    seq: int
+    timestamp: float  # time.monotonic() when the frame was captured
+
+
+class FrameRing:
+    """Preallocated N-slot frame store shared by one producer and many readers.
+
+    Readers get read-only views of the slots; is_valid(seq) tells whether a
+    view has been overwritten since, and snapshot() returns a private copy.
+    """
+
+    def __init__(self, slots: int = 8):
+        if slots < 2:
+            raise ValueError("FrameRing needs at least 2 slots")
+        self.slots = slots
+        self._buffers = []
+        self._views = []
+        self._slot_seqs = [-1] * slots
+        self._timestamps = [0.0] * slots
+        self._write_seq = -1  # Last committed sequence number
+        self._shape = None
+        self._dtype = None
+        # Only used by readers that want to wait for a new frame; the
+        # producer takes it just long enough to notify
+        self._new_frame = threading.Condition()
+
+    @property
+    def shape(self) -> Optional[Tuple[int, ...]]:
+        """Shape of the frames currently stored in the ring."""
+        return self._shape
+
+    @property
+    def last_seq(self) -> int:
+        """Sequence number of the newest committed frame, or -1 if empty."""
+        return self._write_seq
+
+    def _allocate(self, shape: Tuple[int, ...], dtype) -> None:
+        """(Re)allocate all slots for a new frame shape."""
+        self._buffers = [np.empty(shape, dtype=dtype) for _ in range(self.slots)]
+        views = []
+        for buffer in self._buffers:
+            view = buffer.view()
+            view.flags.writeable = False
+            views.append(view)
+        self._views = views
+        self._slot_seqs = [-1] * self.slots
+        self._shape = tuple(shape)
+        self._dtype = np.dtype(dtype)
+
+    def begin_write(self, shape: Optional[Tuple[int, ...]] = None, dtype=np.uint8) -> Optional[np.ndarray]:
+        """Return the writable buffer for the next slot, (re)allocating the ring if shape is given.
+
+        Returns None if nothing was allocated yet.
+        """
+        if shape is not None and (tuple(shape) != self._shape or np.dtype(dtype) != self._dtype):
+            self._allocate(shape, dtype)
+        if self._shape is None:
+            return None
+
+        slot = (self._write_seq + 1) % self.slots
+        # Mark the slot as being written so readers holding an old view of it
+        # can tell their data is no longer valid
+        self._slot_seqs[slot] = -1
+        return self._buffers[slot]
+
+    def commit(self, frame: Optional[np.ndarray] = None, timestamp: Optional[float] = None) -> int:
+        """Publish the slot returned by begin_write and return its sequence number.
+
+        A frame that is not the slot buffer itself is copied into the slot.
+        """
+        if timestamp is None:
+            timestamp = time.monotonic()
+
+        if frame is not None:
+            if frame.shape != self._shape or frame.dtype != self._dtype:
+                self._allocate(frame.shape, frame.dtype)
+            buffer = self._buffers[(self._write_seq + 1) % self.slots]
+            if not np.may_share_memory(frame, buffer):
+                np.copyto(buffer, frame)
+        elif self._shape is None:
+            raise ValueError("commit() without a frame requires begin_write() with a shape first")
+
+        seq = self._write_seq + 1
+        slot = seq % self.slots
+        self._timestamps[slot] = timestamp
+        self._slot_seqs[slot] = seq
+        # Publishing the sequence number is a single attribute store, which
+        # is atomic under the GIL, so readers never need a lock to see it
+        self._write_seq = seq
+
+        with self._new_frame:
+            self._new_frame.notify_all()
+        return seq
+
+    def push(self, frame: np.ndarray, timestamp: Optional[float] = None) -> int:
+        """Copy a finished frame into the next slot and publish it."""
+        self.begin_write(frame.shape, frame.dtype)
+        return self.commit(frame, timestamp)
+
+    def get(self, seq: int) -> Optional[FrameRef]:
+        """Return a read-only view of frame seq, or None if it was overwritten."""
+        if seq < 0:
+            return None
+        slot = seq % self.slots
+        if self._slot_seqs[slot] != seq:
+            return None
+        ref = FrameRef(self._views[slot], seq, self._timestamps[slot])
+        # Re-check in case the producer lapped the slot while we read it
+        return ref if self._slot_seqs[slot] == seq else None
+
+    def latest(self) -> Optional[FrameRef]:
+        """Return a read-only view of the newest frame, or None if the ring is empty."""
+        while True:
+            seq = self._write_seq
+            if seq < 0:
+                return None
+            ref = self.get(seq)
+            if ref is not None or seq == self._write_seq:
+                # A miss without a newer commit means the ring was just reallocated
+                return ref
+
+    def recent(self, count: int) -> list:
+        """Return up to count of the newest still-valid frames, oldest first."""
+        newest = self._write_seq
+        refs = []
+        for seq in range(max(0, newest - min(count, self.slots - 1) + 1), newest + 1):
+            ref = self.get(seq)
+            if ref is not None:
+                refs.append(ref)
+        return refs
+
+    def is_valid(self, seq: int) -> bool:
+        """True if frame seq has not been overwritten since it was read."""
+        return seq >= 0 and self._slot_seqs[seq % self.slots] == seq
+
+    def wait_for_frame(self, after_seq: int, timeout: Optional[float] = None) -> Optional[FrameRef]:
+        """Block until a frame newer than after_seq is committed, then return the newest one."""
+        with self._new_frame:
+            if self._write_seq <= after_seq:
+                self._new_frame.wait(timeout)
+        ref = self.latest()
+        if ref is None or ref.seq <= after_seq:
+            return None
+        return ref
+
+    def snapshot(self) -> Optional[FrameRef]:
+        """Return a private, writable copy of the newest frame."""
+        while True:
+            ref = self.latest()
+            if ref is None:
+                return None
+            frame = ref.frame.copy()
+            if self.is_valid(ref.seq):
+                return FrameRef(frame, ref.seq, ref.timestamp)
+
+
+
+class CompressedFrame(NamedTuple):
+    """One compressed (JPEG) frame as delivered by the camera."""
+    data: bytes
+    seq: int
+    timestamp: float  # time.monotonic() when the frame was captured
+
+
+class CompressedFrameRing:
+    """The N most recent compressed frames from a camera in MJPG passthrough mode.
+
+    Frames are immutable bytes, so readers can keep them as long as they like.
+    """
+
+    def __init__(self, slots: int = 8):
+        if slots < 2:
+            raise ValueError("CompressedFrameRing needs at least 2 slots")
+        self.slots = slots
+        self._frames = [None] * slots
+        self._write_seq = -1
+        self._new_frame = threading.Condition()
+
+    @property
+    def last_seq(self) -> int:
+        """Sequence number of the newest frame, or -1 if empty."""
+        return self._write_seq
+
+    def push(self, data: bytes, timestamp: Optional[float] = None) -> CompressedFrame:
+        """Store a compressed frame and return it with its sequence number."""
+        if timestamp is None:
+            timestamp = time.monotonic()
+        seq = self._write_seq + 1
+        frame = CompressedFrame(data, seq, timestamp)
+        self._frames[seq % self.slots] = frame
+        self._write_seq = seq
+        with self._new_frame:
+            self._new_frame.notify_all()
+        return frame
+
+    def get(self, seq: int) -> Optional[CompressedFrame]:
+        """Return frame seq, or None if it has already been evicted."""
+        if seq < 0:
+            return None
+        frame = self._frames[seq % self.slots]
+        return frame if frame is not None and frame.seq == seq else None
+
+    def latest(self) -> Optional[CompressedFrame]:
+        """Return the newest frame, or None if the ring is empty."""
+        return self.get(self._write_seq)
+
+    def wait_for_frame(self, after_seq: int, timeout: Optional[float] = None) -> Optional[CompressedFrame]:
+        """Block until a frame newer than after_seq is pushed, then return the newest one."""
+        with self._new_frame:
+            if self._write_seq <= after_seq:
+                self._new_frame.wait(timeout)
+        frame = self.latest()
+        if frame is None or frame.seq <= after_seq:
+            return None
+        return frame
@@ -0,0 +1,222 @@
+import concurrent.futures
+import cv2
+import io
+import multiprocessing
+import numpy as np
+import os
+import threading
+from typing import Callable, List, Optional, Tuple
+from src.controllers.simulated_camera import FramePacer
+
+# Colors are bucketed to 5 bits per channel before clustering, so the
+# palette search works on at most 32768 weighted points regardless of
+# how many frames or pixels the GIF has
+_BITS = 5
+_LEVELS = 1 << _BITS
+
+
+def _color_codes(frames: np.ndarray) -> np.ndarray:
+    """15-bit color code of every pixel in an (N, H, W, 3) BGR stack."""
+    shift = 8 - _BITS
+    quantized = (frames >> shift).astype(np.uint16)
+    return (quantized[..., 0] << (2 * _BITS)) | (quantized[..., 1] << _BITS) | quantized[..., 2]
+
+
+def _nearest(points: np.ndarray, centers: np.ndarray) -> np.ndarray:
+    """Index of the nearest center for each point, computed with one matrix product."""
+    scores = (centers * centers).sum(axis=1)[None, :] - 2.0 * (points @ centers.T)
+    return scores.argmin(axis=1)
+
+
+def quantize_frames(frames: np.ndarray, colors: int = 256,
+                    iterations: int = 6) -> Tuple[np.ndarray, np.ndarray]:
+    """Build one palette for a whole stack of BGR frames and map every pixel onto it.
+
+    Returns (palette as (K, 3) uint8 BGR, indices as (N, H, W) uint8).
+    """
+    codes = _color_codes(frames)
+    histogram = np.bincount(codes.ravel(), minlength=_LEVELS ** 3)
+    present = np.flatnonzero(histogram)
+    weights = histogram[present].astype(np.float32)
+
+    # Bucket centers in BGR
+    step = 256 // _LEVELS
+    points = np.stack([
+        (present >> (2 * _BITS)) & (_LEVELS - 1),
+        (present >> _BITS) & (_LEVELS - 1),
+        present & (_LEVELS - 1),
+    ], axis=1).astype(np.float32) * step + step / 2
+
+    if len(present) <= colors:
+        centers = points
+        labels = np.arange(len(present))
+    else:
+        centers = points[np.argsort(-weights)[:colors]].copy()
+        for _ in range(iterations):
+            labels = _nearest(points, centers)
+            totals = np.bincount(labels, weights=weights, minlength=colors)
+            used = totals > 0
+            for channel in range(3):
+                sums = np.bincount(labels, weights=weights * points[:, channel], minlength=colors)
+                centers[used, channel] = sums[used] / totals[used]
+        labels = _nearest(points, centers)
+
+    lookup = np.zeros(_LEVELS ** 3, dtype=np.uint8)
+    lookup[present] = labels
+    palette = np.clip(np.rint(centers), 0, 255).astype(np.uint8)
+    return palette, lookup[codes]
+
+
+def encode_gif(frames: np.ndarray, frame_duration_ms: int, colors: int = 256) -> bytes:
+    """Quantize an (N, H, W, 3) BGR stack to a shared palette and return animated GIF bytes.
+
+    Runs in a worker process, so it must stay a module-level function.
+    """
+    from PIL import Image
+
+    palette, indices = quantize_frames(frames, colors)
+    # GIF palettes are RGB, padded to 256 entries
+    rgb_palette = np.zeros((256, 3), dtype=np.uint8)
+    rgb_palette[:len(palette)] = palette[:, ::-1]
+    palette_list = rgb_palette.ravel().tolist()
+
+    images = []
+    for frame_indices in indices:
+        image = Image.fromarray(frame_indices)
+        image.putpalette(palette_list)  # Turns the "L" image into "P"
+        images.append(image)
+
+    buffer = io.BytesIO()
+    images[0].save(buffer, format="GIF", save_all=True, append_images=images[1:],
+                   duration=frame_duration_ms, loop=0, optimize=False)
+    return buffer.getvalue()
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor(use_threads: bool = False) -> concurrent.futures.Executor:
+    """Shared single-worker process pool (spawned, not forked), or a thread pool with use_threads=True."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            if not use_threads:
+                try:
+                    _executor = concurrent.futures.ProcessPoolExecutor(
+                        max_workers=1, mp_context=multiprocessing.get_context("spawn"))
+                except (NotImplementedError, OSError, ImportError) as e:
+                    # e.g. iOS, where multiprocessing is unavailable
+                    print(f"GIF worker process unavailable ({e}); encoding on a thread")
+            if _executor is None:
+                _executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="gif")
+        return _executor
+
+
+def _replace_executor(broken: concurrent.futures.Executor) -> None:
+    """Drop a pool whose worker died so the next GIF gets a working one."""
+    global _executor
+    with _executor_lock:
+        if _executor is broken:
+            _executor = None
+    broken.shutdown(wait=False)
+
+
+def _submit(fn, *args) -> Tuple[concurrent.futures.Executor, concurrent.futures.Future]:
+    """Submit to the shared pool, replacing it if broken; returns the executor used and the future."""
+    executor = _get_executor()
+    try:
+        return executor, executor.submit(fn, *args)
+    except concurrent.futures.BrokenExecutor:
+        print("GIF worker process died; starting a new one")
+        _replace_executor(executor)
+    executor = _get_executor()
+    try:
+        return executor, executor.submit(fn, *args)
+    except concurrent.futures.BrokenExecutor:
+        print("GIF worker processes keep dying; encoding on a thread")
+        _replace_executor(executor)
+    executor = _get_executor(use_threads=True)
+    return executor, executor.submit(fn, *args)
+
+
+class GifBuilder:
+    """Captures frames at a fixed interval and turns them into an animated GIF.
+
+    encode() builds the GIF in a worker process and returns a future of its bytes.
+    """
+
+    def __init__(self, duration: float = 3.0, interval: float = 0.1, max_width: int = 480,
+                 colors: int = 256):
+        self.duration = duration
+        self.interval = interval
+        self.max_width = max_width
+        self.colors = colors
+        self.frames: List[np.ndarray] = []
+
+    @property
+    def frame_count(self) -> int:
+        """Number of frames the GIF will have."""
+        return max(1, int(round(self.duration / self.interval)))
+
+    def _downsize(self, frame: np.ndarray) -> np.ndarray:
+        if frame.shape[1] <= self.max_width:
+            return frame.copy()
+        height = max(1, int(frame.shape[0] * self.max_width / frame.shape[1]))
+        return cv2.resize(frame, (self.max_width, height), interpolation=cv2.INTER_AREA)
+
+    def capture(self, get_frame: Callable[[], Optional[np.ndarray]],
+                on_progress: Optional[Callable[[int, int], None]] = None) -> int:
+        """Sample frames from get_frame() at the fixed interval for about `duration`; returns the count.
+
+        on_progress(captured, total) is called after each frame.
+        """
+        self.frames = []
+        pacer = FramePacer(1.0 / self.interval)
+        total = self.frame_count
+        while len(self.frames) < total:
+            frame = get_frame()
+            if frame is not None:
+                small = self._downsize(frame)
+                if self.frames and small.shape != self.frames[0].shape:
+                    break  # Resolution changed; keep the frames we have
+                self.frames.append(small)
+                if on_progress is not None:
+                    on_progress(len(self.frames), total)
+            pacer.wait()
+        return len(self.frames)
+
+    def encode(self) -> concurrent.futures.Future:
+        """Start encoding the captured frames in the worker; the future yields GIF bytes."""
+        if not self.frames:
+            raise ValueError("No frames captured")
+        args = (np.stack(self.frames), int(round(self.interval * 1000)), self.colors)
+        result = concurrent.futures.Future()
+
+        def finished(done, executor, retried=False):
+            try:
+                result.set_result(done.result())
+            except concurrent.futures.BrokenExecutor as e:
+                # The worker died while encoding; encode once more in a fresh pool
+                _replace_executor(executor)
+                if retried:
+                    result.set_exception(e)
+                    return
+                print("GIF worker process died while encoding; retrying")
+                executor, retry = _submit(encode_gif, *args)
+                retry.add_done_callback(lambda retry: finished(retry, executor, retried=True))
+            except Exception as e:
+                result.set_exception(e)
+
+        executor, future = _submit(encode_gif, *args)
+        future.add_done_callback(lambda future: finished(future, executor))
+        return result
+
+    @staticmethod
+    def save(data: bytes, path: str) -> str:
+        """Write GIF bytes to path atomically (temp file + rename) and return the path."""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        return path
@@ -0,0 +1,95 @@
+import cv2
+import numpy as np
+from typing import TYPE_CHECKING, Dict, Optional
+
+from src.controllers.media_store import MediaItem
+from src.controllers.thumbnail_cache import VIDEO_EXTENSIONS
+
+if TYPE_CHECKING:
+    from src.controllers.media_library import MediaLibrary
+
+
+def perceptual_hashes(grays: np.ndarray) -> np.ndarray:
+    """64-bit difference hashes (dHash) of an (N, 8, 9) stack of grayscale thumbnails."""
+    bits = grays[:, :, 1:] > grays[:, :, :-1]
+    packed = np.packbits(bits.reshape(len(grays), 64), axis=1)
+    return packed.view(">u8").ravel().astype(np.uint64)
+
+
+def perceptual_hash(image: np.ndarray) -> int:
+    """dHash of one BGR or grayscale image."""
+    if image.ndim == 3:
+        image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    small = cv2.resize(image, (9, 8), interpolation=cv2.INTER_AREA)
+    return int(perceptual_hashes(small[np.newaxis])[0])
+
+
+def hamming_distances(value: int, hashes: np.ndarray) -> np.ndarray:
+    """Number of differing bits between value and each of hashes (uint64)."""
+    xor = np.bitwise_xor(hashes.astype(np.uint64), np.uint64(value))
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(xor).astype(np.intp)
+    # numpy < 2.0
+    return np.unpackbits(xor.view(np.uint8).reshape(-1, 8), axis=1).sum(axis=1)
+
+
+def file_perceptual_hash(path: str) -> Optional[int]:
+    """dHash of an image file (or a video's first frame), or None if it can't be read."""
+    try:
+        if path.lower().endswith(VIDEO_EXTENSIONS):
+            capture = cv2.VideoCapture(path)
+            try:
+                ok, frame = capture.read()
+            finally:
+                capture.release()
+            image = frame if ok else None
+        else:
+            # An 1/8-size decode is plenty for an 8x9 thumbnail
+            image = cv2.imread(path, cv2.IMREAD_REDUCED_GRAYSCALE_8)
+    except Exception as e:
+        print(f"Could not hash {path}: {e}")
+        return None
+    return perceptual_hash(image) if image is not None else None
+
+
+class UploadDeduplicator:
+    """Decides whether a new capture is a copy of one already headed for the server.
+
+    Exact SHA-256 matches always count; with collapse_near=True so does a
+    capture within `max_distance` hash bits of one taken `window` seconds earlier.
+    """
+
+    def __init__(self, library: "MediaLibrary", collapse_near: bool = False,
+                 window: float = 10.0, max_distance: int = 4):
+        self.library = library
+        self.collapse_near = collapse_near
+        self.window = window
+        self.max_distance = max_distance
+        self.exact = 0
+        self.near = 0
+
+    def find(self, item: MediaItem) -> Optional[MediaItem]:
+        """The earlier item that item duplicates, or None if it should be uploaded."""
+        if item.sha256 is not None:
+            original = self.library.find_by_sha256(item.sha256, item.event_id, before_id=item.id)
+            if original is not None:
+                self.exact += 1
+                return original
+        if not self.collapse_near or item.phash is None:
+            return None
+        candidates = self.library.recent(item.event_id, item.media_type, item.created_at - self.window,
+                                         item.created_at, exclude_id=item.id)
+        candidates = [candidate for candidate in candidates if candidate.phash is not None]
+        if not candidates:
+            return None
+        hashes = np.array([candidate.phash for candidate in candidates], dtype=np.int64).view(np.uint64)
+        distances = hamming_distances(item.phash & 0xFFFFFFFFFFFFFFFF, hashes)
+        best = int(np.argmin(distances))
+        if distances[best] <= self.max_distance:
+            self.near += 1
+            return candidates[best]
+        return None
+
+    def stats(self) -> Dict[str, int]:
+        """Duplicates caught so far, by kind."""
+        return {"exact": self.exact, "near": self.near}
@@ -0,0 +1,257 @@
+import cv2
+import datetime
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional, Tuple
+from PIL import Image
+
+from src.controllers.media_dedup import file_perceptual_hash
+from src.controllers.media_store import MediaItem
+from src.controllers.thumbnail_cache import VIDEO_EXTENSIONS
+
+MEDIA_EXTENSIONS = (".jpg", ".jpeg", ".png", ".gif", ".webp") + VIDEO_EXTENSIONS
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS media (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    event_id INTEGER NOT NULL,
+    mode TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    width INTEGER,
+    height INTEGER,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    sha256 TEXT,
+    upload_status TEXT NOT NULL DEFAULT 'pending',
+    phash INTEGER
+);
+CREATE INDEX IF NOT EXISTS media_event ON media (event_id, created_at);
+CREATE INDEX IF NOT EXISTS media_upload ON media (upload_status, event_id);
+CREATE INDEX IF NOT EXISTS media_sha256 ON media (sha256);
+"""
+
+_COLUMNS = "id, path, event_id, mode, created_at, width, height, size, sha256, upload_status, phash"
+
+# Columns added after the first release of the index
+_MIGRATIONS = (
+    ("phash", "ALTER TABLE media ADD COLUMN phash INTEGER"),
+)
+
+
+def file_sha256(path: str, chunk_size: int = 1024 * 1024) -> str:
+    """SHA-256 of a file, read in chunks so large videos don't have to fit in memory."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def media_dimensions(path: str) -> Tuple[Optional[int], Optional[int]]:
+    """(width, height) of an image or video, read from its header where possible."""
+    try:
+        if path.lower().endswith(VIDEO_EXTENSIONS):
+            capture = cv2.VideoCapture(path)
+            try:
+                return (int(capture.get(cv2.CAP_PROP_FRAME_WIDTH)) or None,
+                        int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT)) or None)
+            finally:
+                capture.release()
+        # Pillow only parses the header here, the pixels are never decoded
+        with Image.open(path) as image:
+            return image.size
+    except Exception as e:
+        print(f"Could not read dimensions of {path}: {e}")
+        return None, None
+
+
+class MediaLibrary:
+    """On-disk media library, sharded as root/event_<id>/<shard>/<file>, with a SQLite index.
+
+    The connection is shared between threads and serialized with a lock.
+    """
+
+    def __init__(self, root: str, db_name: str = "library.db"):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self.db_path = os.path.join(root, db_name)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+        # WAL keeps readers (the UI) from waiting on writers (capture, uploads)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(media)")}
+        for column, statement in _MIGRATIONS:
+            if column not in columns:
+                self._db.execute(statement)
+        self._db.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    def event_dir(self, event_id: int) -> str:
+        return os.path.join(self.root, f"event_{int(event_id)}")
+
+    def new_path(self, event_id: int, mode: str, extension: str) -> str:
+        """A fresh, unique path for a new capture; its shard directory is created."""
+        token = uuid.uuid4().hex[:10]
+        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S_%f")[:-3]
+        directory = os.path.join(self.event_dir(event_id), token[:2])
+        os.makedirs(directory, exist_ok=True)
+        return os.path.join(directory, f"{mode}_{timestamp}_{token}{extension}")
+
+    def _relative(self, path: str) -> str:
+        return os.path.relpath(os.path.abspath(path), os.path.abspath(self.root))
+
+    def _item(self, row) -> MediaItem:
+        media_id, path, event_id, mode, created_at, width, height, size, sha256, upload_status, phash = row
+        return MediaItem(os.path.join(self.root, path), mode, created_at, media_id, event_id,
+                         width, height, size, sha256, upload_status, phash)
+
+    def add(self, path: str, event_id: int, mode: str, created_at: Optional[float] = None,
+            width: Optional[int] = None, height: Optional[int] = None) -> MediaItem:
+        """Index a finished file (or refresh its entry) with its hashes and dimensions, and return it."""
+        stat = os.stat(path)
+        if width is None or height is None:
+            width, height = media_dimensions(path)
+        sha256 = file_sha256(path)
+        phash = file_perceptual_hash(path)
+        if phash is not None and phash >= 1 << 63:
+            phash -= 1 << 64  # SQLite integers are signed
+        relative = self._relative(path)
+        created_at = created_at if created_at is not None else time.time()
+        with self._lock:
+            # A re-added path keeps its id, creation time and upload status
+            # unless its content changed
+            self._db.execute(
+                "INSERT INTO media (path, event_id, mode, created_at, width, height, size, mtime_ns, sha256, phash)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT(path) DO UPDATE SET event_id=excluded.event_id, mode=excluded.mode,"
+                " width=excluded.width, height=excluded.height, size=excluded.size,"
+                " mtime_ns=excluded.mtime_ns,"
+                " upload_status=CASE WHEN sha256 IS excluded.sha256 THEN upload_status ELSE 'pending' END,"
+                " sha256=excluded.sha256, phash=excluded.phash",
+                (relative, int(event_id), mode, created_at, width, height, stat.st_size, stat.st_mtime_ns,
+                 sha256, phash),
+            )
+            self._db.commit()
+            row = self._db.execute(f"SELECT {_COLUMNS} FROM media WHERE path = ?", (relative,)).fetchone()
+        return self._item(row)
+
+    def remove(self, path: str) -> None:
+        """Drop a file from the index (the file itself is left alone)."""
+        with self._lock:
+            self._db.execute("DELETE FROM media WHERE path = ?", (self._relative(path),))
+            self._db.commit()
+
+    def get(self, path: str) -> Optional[MediaItem]:
+        with self._lock:
+            row = self._db.execute(f"SELECT {_COLUMNS} FROM media WHERE path = ?",
+                                   (self._relative(path),)).fetchone()
+        return self._item(row) if row is not None else None
+
+    def find_by_sha256(self, sha256: str, event_id: int, before_id: Optional[int] = None) -> Optional[MediaItem]:
+        """The oldest item of the event with this content hash (indexed before before_id, if given)."""
+        with self._lock:
+            row = self._db.execute(
+                f"SELECT {_COLUMNS} FROM media WHERE sha256 = ? AND event_id = ? AND id < ?"
+                " ORDER BY id LIMIT 1",
+                (sha256, int(event_id), before_id if before_id is not None else 1 << 62)).fetchone()
+        return self._item(row) if row is not None else None
+
+    def recent(self, event_id: int, mode: str, since: float, until: float,
+               exclude_id: Optional[int] = None) -> List[MediaItem]:
+        """Items of the event and mode created in [since, until], except exclude_id and duplicates."""
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT {_COLUMNS} FROM media WHERE event_id = ? AND created_at BETWEEN ? AND ?"
+                " AND mode = ? AND id IS NOT ? AND upload_status != 'duplicate'",
+                (int(event_id), since, until, mode, exclude_id)).fetchall()
+        return [self._item(row) for row in rows]
+
+    def set_upload_status(self, media_id: int, status: str) -> None:
+        """Record the upload state of an item (e.g. "pending", "queued", "uploaded", "failed", "duplicate")."""
+        with self._lock:
+            self._db.execute("UPDATE media SET upload_status = ? WHERE id = ?", (status, media_id))
+            self._db.commit()
+
+    def _where(self, event_id, mode, upload_status):
+        clauses, params = [], []
+        for column, value in (("event_id", event_id), ("mode", mode), ("upload_status", upload_status)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    def count(self, event_id: Optional[int] = None, mode: Optional[str] = None,
+              upload_status: Optional[str] = None) -> int:
+        """Number of indexed items matching the filters."""
+        where, params = self._where(event_id, mode, upload_status)
+        with self._lock:
+            return self._db.execute(f"SELECT COUNT(*) FROM media{where}", params).fetchone()[0]
+
+    def fetch(self, offset: int, limit: int, event_id: Optional[int] = None, mode: Optional[str] = None,
+              upload_status: Optional[str] = None) -> List[MediaItem]:
+        """Up to limit matching items starting offset places from the newest, newest first."""
+        where, params = self._where(event_id, mode, upload_status)
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT {_COLUMNS} FROM media{where} ORDER BY created_at DESC, id DESC LIMIT ? OFFSET ?",
+                params + [limit, max(0, offset)],
+            ).fetchall()
+        return [self._item(row) for row in rows]
+
+    def sync(self, event_id: Optional[int] = None) -> Dict[str, int]:
+        """Reconcile the index with the files on disk for one event (or all of them).
+
+        Only new or changed files are read.
+        """
+        if event_id is not None:
+            event_dirs = [(int(event_id), self.event_dir(event_id))]
+        else:
+            event_dirs = []
+            for entry in os.scandir(self.root):
+                if entry.is_dir() and entry.name.startswith("event_") and entry.name[6:].isdigit():
+                    event_dirs.append((int(entry.name[6:]), entry.path))
+
+        where, params = self._where(event_id, None, None)
+        with self._lock:
+            known = {path: (size, mtime_ns) for path, size, mtime_ns in
+                     self._db.execute(f"SELECT path, size, mtime_ns FROM media{where}", params)}
+
+        added = updated = 0
+        seen = set()
+        for current_event, directory in event_dirs:
+            for dirpath, _, filenames in os.walk(directory):
+                for filename in filenames:
+                    if not filename.lower().endswith(MEDIA_EXTENSIONS):
+                        continue
+                    path = os.path.join(dirpath, filename)
+                    relative = self._relative(path)
+                    seen.add(relative)
+                    try:
+                        stat = os.stat(path)
+                        previous = known.get(relative)
+                        if previous == (stat.st_size, stat.st_mtime_ns):
+                            continue
+                        mode = filename.split("_", 1)[0]
+                        self.add(path, current_event, mode, created_at=stat.st_mtime)
+                        if previous is None:
+                            added += 1
+                        else:
+                            updated += 1
+                    except OSError as e:
+                        print(f"Could not index {path}: {e}")
+
+        missing = [path for path in known if path not in seen]
+        with self._lock:
+            self._db.executemany("DELETE FROM media WHERE path = ?", [(path,) for path in missing])
+            self._db.commit()
+        return {"added": added, "updated": updated, "removed": len(missing), "indexed": len(seen)}
@@ -0,0 +1,44 @@
+import time
+from typing import TYPE_CHECKING, List, NamedTuple, Optional
+
+if TYPE_CHECKING:
+    from src.controllers.media_library import MediaLibrary
+
+
+class MediaItem(NamedTuple):
+    """One captured photo, video, GIF or boomerang."""
+    path: str
+    media_type: str
+    created_at: float  # time.time() when the item was added
+    id: Optional[int] = None
+    event_id: Optional[int] = None
+    width: Optional[int] = None
+    height: Optional[int] = None
+    size: Optional[int] = None
+    sha256: Optional[str] = None
+    upload_status: Optional[str] = None
+    phash: Optional[int] = None  # 64-bit perceptual hash, stored signed
+
+
+class MediaStore:
+    """Newest-first list of the media captured for one event, paged with count()/fetch().
+
+    The items live in the MediaLibrary index.
+    """
+
+    def __init__(self, library: "MediaLibrary", event_id: int):
+        self.library = library
+        self.event_id = event_id
+
+    def add(self, path: str, media_type: str, created_at: Optional[float] = None) -> MediaItem:
+        """Record a new capture and return it."""
+        return self.library.add(path, self.event_id, media_type,
+                                created_at if created_at is not None else time.time())
+
+    def count(self) -> int:
+        """Number of items in the store."""
+        return self.library.count(event_id=self.event_id)
+
+    def fetch(self, offset: int, limit: int) -> List[MediaItem]:
+        """Up to limit items starting offset places from the newest, newest first."""
+        return self.library.fetch(offset, limit, event_id=self.event_id)
@@ -0,0 +1,260 @@
+import concurrent.futures
+import cv2
+import multiprocessing
+import os
+import threading
+import time
+from typing import Callable, Dict, NamedTuple, Optional, Tuple
+
+from src.controllers.thumbnail_cache import VIDEO_EXTENSIONS
+
+
+class OutputProfile(NamedTuple):
+    """How captures are re-encoded before upload."""
+    name: str
+    max_side: Optional[int] = None  # Longest side of photos, None keeps the size
+    image_format: str = "jpeg"  # "jpeg" or "webp" (needs Pillow)
+    quality: int = 85
+    video_max_side: Optional[int] = None  # Longest side of videos, None keeps the size
+    video_fourccs: Tuple[str, ...] = ("avc1", "mp4v")  # First one the OpenCV build can write
+
+
+PROFILES = {
+    # Upload exactly what was captured
+    "original": OutputProfile("original"),
+    # Full HD photos and 720p video, good enough for sharing pages
+    "web": OutputProfile("web", max_side=1920, quality=82, video_max_side=1280),
+    # For slow venue connections
+    "small": OutputProfile("small", max_side=1280, image_format="webp", quality=75, video_max_side=854),
+}
+
+
+class TranscodeResult(NamedTuple):
+    """Outcome of preparing one file for upload."""
+    source: str
+    output: str  # The file to upload; the source itself if transcoding didn't help
+    profile: str
+    source_bytes: int
+    output_bytes: int
+    seconds: float
+    error: Optional[str] = None
+
+
+def _scaled_size(width: int, height: int, max_side: Optional[int]) -> Tuple[int, int]:
+    scale = min(1.0, max_side / float(max(width, height))) if max_side else 1.0
+    # Even dimensions keep video encoders happy
+    return max(2, int(width * scale) // 2 * 2), max(2, int(height * scale) // 2 * 2)
+
+
+def _transcode_image(source: str, output: str, profile: OutputProfile) -> None:
+    frame = cv2.imread(source, cv2.IMREAD_COLOR)
+    if frame is None:
+        raise IOError(f"Could not read {source}")
+    size = _scaled_size(frame.shape[1], frame.shape[0], profile.max_side)
+    if size != (frame.shape[1], frame.shape[0]):
+        frame = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+    if profile.image_format == "webp":
+        # Imported here so the app runs without Pillow unless WebP is used
+        from PIL import Image
+        Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)).save(
+            output, format="WEBP", quality=profile.quality, method=4)
+        return
+    params = [int(cv2.IMWRITE_JPEG_QUALITY), profile.quality,
+              int(cv2.IMWRITE_JPEG_OPTIMIZE), 1, int(cv2.IMWRITE_JPEG_PROGRESSIVE), 1]
+    ok, buffer = cv2.imencode(".jpg", frame, params)
+    if not ok:
+        raise IOError(f"JPEG encoding failed for {source}")
+    with open(output, "wb") as f:
+        f.write(buffer)
+
+
+def _transcode_video(source: str, output: str, profile: OutputProfile) -> None:
+    capture = cv2.VideoCapture(source)
+    writer = None
+    try:
+        if not capture.isOpened():
+            raise IOError(f"Could not open {source}")
+        fps = capture.get(cv2.CAP_PROP_FPS) or 30.0
+        size = _scaled_size(int(capture.get(cv2.CAP_PROP_FRAME_WIDTH)),
+                            int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT)), profile.video_max_side)
+        for fourcc in profile.video_fourccs:
+            writer = cv2.VideoWriter(output, cv2.VideoWriter_fourcc(*fourcc), fps, size)
+            if writer.isOpened():
+                break
+            writer.release()
+            writer = None
+        if writer is None:
+            raise IOError(f"No usable video codec among {profile.video_fourccs}")
+        while True:
+            ok, frame = capture.read()
+            if not ok:
+                break
+            if (frame.shape[1], frame.shape[0]) != size:
+                frame = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+            writer.write(frame)
+    finally:
+        capture.release()
+        if writer is not None:
+            writer.release()
+
+
+def transcode_file(source: str, output_dir: str, profile: OutputProfile) -> TranscodeResult:
+    """Re-encode source into output_dir with profile (runs in a worker process).
+
+    On errors, or when the output wouldn't be smaller, the result points at the source.
+    """
+    started = time.perf_counter()
+    source_bytes = os.path.getsize(source)
+    stem, extension = os.path.splitext(os.path.basename(source))
+    is_video = extension.lower() in VIDEO_EXTENSIONS
+    if profile.name == "original" or extension.lower() == ".gif":
+        return TranscodeResult(source, source, profile.name, source_bytes, source_bytes, 0.0)
+
+    if is_video:
+        extension = ".mp4"
+    else:
+        extension = ".webp" if profile.image_format == "webp" else ".jpg"
+    output = os.path.join(output_dir, f"{stem}.{profile.name}{extension}")
+    tmp_path = f"{output}.tmp{extension}"  # Keep the extension; encoders pick the format from it
+    try:
+        os.makedirs(output_dir, exist_ok=True)
+        if is_video:
+            _transcode_video(source, tmp_path, profile)
+        else:
+            _transcode_image(source, tmp_path, profile)
+        output_bytes = os.path.getsize(tmp_path)
+        if output_bytes >= source_bytes:
+            os.remove(tmp_path)
+            return TranscodeResult(source, source, profile.name, source_bytes, source_bytes,
+                                   time.perf_counter() - started)
+        os.replace(tmp_path, output)
+        return TranscodeResult(source, output, profile.name, source_bytes, output_bytes,
+                               time.perf_counter() - started)
+    except Exception as e:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return TranscodeResult(source, source, profile.name, source_bytes, source_bytes,
+                               time.perf_counter() - started, str(e))
+
+
+class MediaTranscoder:
+    """Prepares captures for upload with an OutputProfile, in a pool of spawned worker processes.
+
+    Outputs go to `output_dir` and the originals are kept.
+    """
+
+    def __init__(self, output_dir: str, profile: str = "web", workers: Optional[int] = None):
+        self.output_dir = output_dir
+        self.profile = PROFILES[profile]
+        self.workers = workers or max(1, min(2, (os.cpu_count() or 2) // 2))
+        self._executor = None
+        self._lock = threading.Lock()
+
+        self.files = 0
+        self.errors = 0
+        self.source_bytes = 0
+        self.output_bytes = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+
+    def _get_executor(self, use_threads: bool = False) -> concurrent.futures.Executor:
+        with self._lock:
+            if self._executor is None:
+                if not use_threads:
+                    try:
+                        self._executor = concurrent.futures.ProcessPoolExecutor(
+                            max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+                    except (NotImplementedError, OSError, ImportError) as e:
+                        print(f"Transcode worker processes unavailable ({e}); using threads")
+                if self._executor is None:
+                    self._executor = concurrent.futures.ThreadPoolExecutor(
+                        max_workers=self.workers, thread_name_prefix="transcode")
+            return self._executor
+
+    def _replace_executor(self, broken: concurrent.futures.Executor) -> None:
+        """Drop a pool whose worker died so the next submit gets a working one."""
+        with self._lock:
+            if self._executor is broken:
+                self._executor = None
+        broken.shutdown(wait=False)
+
+    def _submit(self, path: str, output_dir: str) -> concurrent.futures.Future:
+        executor = self._get_executor()
+        try:
+            return executor.submit(transcode_file, path, output_dir, self.profile)
+        except concurrent.futures.BrokenExecutor:
+            print("Transcode worker process died; starting a new pool")
+            self._replace_executor(executor)
+        executor = self._get_executor()
+        try:
+            return executor.submit(transcode_file, path, output_dir, self.profile)
+        except concurrent.futures.BrokenExecutor:
+            print("Transcode worker processes keep dying; using threads")
+            self._replace_executor(executor)
+        return self._get_executor(use_threads=True).submit(transcode_file, path, output_dir, self.profile)
+
+    def submit(self, path: str, output_dir: Optional[str] = None,
+               on_done: Optional[Callable[[TranscodeResult], None]] = None) -> concurrent.futures.Future:
+        """Transcode path in the background; the future (and on_done) get the TranscodeResult.
+
+        Never raises: if no worker can take the job, the result is the
+        original file.
+        """
+        try:
+            future = self._submit(path, output_dir or self.output_dir)
+        except Exception as e:
+            future = concurrent.futures.Future()
+            future.set_exception(e)
+
+        def finished(done):
+            try:
+                result = done.result()
+            except Exception as e:
+                # The worker died or no worker could take the job; upload the original
+                size = os.path.getsize(path) if os.path.exists(path) else 0
+                result = TranscodeResult(path, path, self.profile.name, size, size, 0.0, str(e))
+            self._record(result)
+            if on_done is not None:
+                try:
+                    on_done(result)
+                except Exception as e:
+                    print(f"Transcode callback error: {e}")
+
+        future.add_done_callback(finished)
+        return future
+
+    def _record(self, result: TranscodeResult) -> None:
+        with self._lock:
+            self.files += 1
+            self.errors += result.error is not None
+            self.source_bytes += result.source_bytes
+            self.output_bytes += result.output_bytes
+            self.total_seconds += result.seconds
+            self.max_seconds = max(self.max_seconds, result.seconds)
+        if result.error is not None:
+            print(f"Transcode of {result.source} failed, uploading the original: {result.error}")
+        else:
+            saved = result.source_bytes - result.output_bytes
+            print(f"Transcoded {os.path.basename(result.source)} ({result.profile}): "
+                  f"{result.source_bytes / 1024:.0f} KB -> {result.output_bytes / 1024:.0f} KB "
+                  f"(-{saved * 100 // max(1, result.source_bytes)}%) in {result.seconds:.2f}s")
+
+    def close(self) -> None:
+        """Finish queued transcodes and stop the workers."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    def stats(self) -> Dict[str, object]:
+        """Totals of bytes in/out and processing time for this session."""
+        return {
+            "profile": self.profile.name,
+            "files": self.files,
+            "errors": self.errors,
+            "source_bytes": self.source_bytes,
+            "output_bytes": self.output_bytes,
+            "saved_bytes": self.source_bytes - self.output_bytes,
+            "avg_seconds": round(self.total_seconds / self.files, 3) if self.files else 0.0,
+            "max_seconds": round(self.max_seconds, 3),
+        }
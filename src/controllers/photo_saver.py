@@ -0,0 +1,84 @@
+import cv2
+import numpy as np
+import os
+import queue
+import threading
+from typing import Callable, Dict, Optional
+
+
+class PhotoSaveQueue:
+    """Writes photos to disk on a background thread so the shutter never waits for I/O.
+
+    on_saved(path, error) is called from the worker once the photo is in place or failed.
+    """
+
+    def __init__(self, quality: int = 95, name: str = "photo-saver"):
+        self.quality = quality
+        self.name = name
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self.saved = 0
+        self.errors = 0
+        self.is_running = False
+
+    def save(self, frame: np.ndarray, path: str,
+             on_saved: Optional[Callable[[str, Optional[Exception]], None]] = None) -> None:
+        """Queue a BGR frame to be saved as a JPEG at path, starting the worker if needed."""
+        with self._lock:
+            if not self.is_running:
+                self.is_running = True
+                self._thread = threading.Thread(target=self._worker, name=self.name, daemon=True)
+                self._thread.start()
+            self._queue.put((frame, path, on_saved))
+
+    def pending(self) -> int:
+        """Number of photos waiting to be written."""
+        return self._queue.qsize()
+
+    def close(self, timeout: float = 10.0) -> None:
+        """Finish writing queued photos, then stop the worker (a later save() restarts it)."""
+        with self._lock:
+            if not self.is_running:
+                return
+            self.is_running = False
+            self._queue.put(None)
+        self._thread.join(timeout)
+
+    def stats(self) -> Dict[str, int]:
+        """Saved/error counts and queue depth."""
+        return {"saved": self.saved, "errors": self.errors, "pending": self.pending()}
+
+    def _write(self, frame: np.ndarray, path: str) -> None:
+        ok, buffer = cv2.imencode('.jpg', frame, [int(cv2.IMWRITE_JPEG_QUALITY), self.quality])
+        if not ok:
+            raise IOError(f"JPEG encoding failed for {path}")
+        tmp_path = f"{path}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(buffer)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def _worker(self) -> None:
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            frame, path, on_saved = job
+            error = None
+            try:
+                self._write(frame, path)
+                self.saved += 1
+            except Exception as e:
+                error = e
+                self.errors += 1
+                print(f"Error saving photo {path}: {e}")
+            if on_saved is not None:
+                try:
+                    on_saved(path, error)
+                except Exception as e:
+                    print(f"Photo saved callback error: {e}")
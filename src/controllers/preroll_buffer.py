@@ -0,0 +1,79 @@
+import collections
+import threading
+import time
+from typing import Dict, Optional
+from src.controllers.frame_ring import CompressedFrame
+
+
+class PrerollBuffer:
+    """The last `seconds` of video as JPEGs, capped at `max_bytes`, so a recording can start in the past.
+
+    While a recording runs the buffer is on hold and serves as the recorder's backlog.
+    """
+
+    def __init__(self, seconds: float = 1.5, max_bytes: int = 32 * 1024 * 1024, quality: int = 80):
+        self.seconds = seconds
+        self.max_bytes = max_bytes
+        self.quality = quality  # JPEG quality the recorder uses for raw frames
+
+        self._frames = collections.deque()
+        self._lock = threading.Lock()
+        self.total_bytes = 0
+        self.holding = False
+
+        self.added = 0
+        self.evicted = 0
+
+    def __len__(self) -> int:
+        return len(self._frames)
+
+    @property
+    def duration(self) -> float:
+        """Seconds between the oldest and the newest buffered frame."""
+        with self._lock:
+            if len(self._frames) < 2:
+                return 0.0
+            return self._frames[-1].timestamp - self._frames[0].timestamp
+
+    def add(self, data: bytes, seq: int = -1, timestamp: Optional[float] = None) -> None:
+        """Buffer one JPEG frame, evicting old frames as needed."""
+        if timestamp is None:
+            timestamp = time.monotonic()
+        with self._lock:
+            self._frames.append(CompressedFrame(data, seq, timestamp))
+            self.total_bytes += len(data)
+            self.added += 1
+            while self._frames and (
+                self.total_bytes > self.max_bytes
+                or (not self.holding and timestamp - self._frames[0].timestamp > self.seconds)
+            ):
+                self.total_bytes -= len(self._frames.popleft().data)
+                self.evicted += 1
+
+    def pop(self) -> Optional[CompressedFrame]:
+        """Remove and return the oldest buffered frame; releases the hold once empty."""
+        with self._lock:
+            if not self._frames:
+                self.holding = False
+                return None
+            frame = self._frames.popleft()
+            self.total_bytes -= len(frame.data)
+            if not self._frames:
+                self.holding = False
+            return frame
+
+    def clear(self) -> None:
+        """Drop all buffered frames."""
+        with self._lock:
+            self._frames.clear()
+            self.total_bytes = 0
+            self.holding = False
+
+    def stats(self) -> Dict[str, int]:
+        """Buffer occupancy and counters."""
+        return {
+            "frames": len(self._frames),
+            "bytes": self.total_bytes,
+            "added": self.added,
+            "evicted": self.evicted,
+        }
@@ -0,0 +1,133 @@
+import threading
+import time
+from typing import Dict, NamedTuple, Optional
+
+
+class PreviewSettings(NamedTuple):
+    """Current preview encoding parameters chosen by the governor."""
+    fps: float
+    scale: float  # Fraction of the capture resolution sent to the preview
+    jpeg_quality: int
+
+
+class PreviewGovernor:
+    """Adapts preview frame rate, resolution and JPEG quality to how fast the UI keeps up.
+
+    It steps down quality, then resolution, then frame rate when pushes are
+    slow, and back up after a run of fast pushes.
+    """
+
+    def __init__(self, min_fps: float = 8.0, max_fps: float = 30.0,
+                 min_scale: float = 0.35, max_scale: float = 1.0,
+                 min_quality: int = 40, max_quality: int = 85,
+                 max_width: Optional[int] = 1280, target_latency: float = 0.15,
+                 smoothing: float = 0.2, recover_after: int = 30, cooldown: int = 5):
+        self.min_fps = min_fps
+        self.max_fps = max_fps
+        self.min_scale = min_scale
+        self.max_scale = max_scale
+        self.min_quality = min_quality
+        self.max_quality = max_quality
+        self.max_width = max_width
+        self.target_latency = target_latency
+        self.smoothing = smoothing
+        self.recover_after = recover_after
+        self.cooldown = cooldown  # Pushes to wait after a step so the averages catch up
+
+        self.fps = max_fps
+        self.scale = max_scale
+        self.jpeg_quality = max_quality
+
+        self.push_time = None  # Smoothed seconds spent in the UI push
+        self.latency = None  # Smoothed seconds from capture to end of push
+        self._good_pushes = 0
+        self._pushes_since_step = 0
+        self._last_admitted = None
+        self._lock = threading.Lock()
+
+    def settings(self) -> PreviewSettings:
+        """The parameters the encode stage should use for the next frame."""
+        return PreviewSettings(self.fps, self.scale, self.jpeg_quality)
+
+    def scale_for(self, width: int) -> float:
+        """Effective resize factor for a frame of the given width, honoring max_width."""
+        scale = self.scale
+        if self.max_width and width * scale > self.max_width:
+            scale = self.max_width / float(width)
+        return scale
+
+    def wants_original(self, width: int) -> bool:
+        """True while the governor is at full size and quality, so a camera JPEG can be forwarded as-is."""
+        return self.scale_for(width) >= 1.0 and self.jpeg_quality >= self.max_quality
+
+    def admit(self, timestamp: float) -> bool:
+        """Frame-rate limiter: True if a frame captured at timestamp should be previewed."""
+        with self._lock:
+            if self._last_admitted is not None:
+                # Allow a little jitter so 30 fps sources aren't throttled to 15
+                if timestamp - self._last_admitted < 0.9 / self.fps:
+                    return False
+            self._last_admitted = timestamp
+            return True
+
+    def _smooth(self, current: Optional[float], sample: float) -> float:
+        if current is None:
+            return sample
+        return current + self.smoothing * (sample - current)
+
+    def record_push(self, push_time: float, captured_at: Optional[float] = None) -> None:
+        """Report one completed preview push and adjust the settings."""
+        now = time.monotonic()
+        with self._lock:
+            self.push_time = self._smooth(self.push_time, push_time)
+            if captured_at is not None:
+                self.latency = self._smooth(self.latency, now - captured_at)
+
+            budget = 1.0 / self.fps
+            overloaded = self.push_time > budget or (
+                self.latency is not None and self.latency > self.target_latency)
+            comfortable = self.push_time < 0.5 * budget and (
+                self.latency is None or self.latency < 0.5 * self.target_latency)
+
+            self._pushes_since_step += 1
+            if overloaded:
+                self._good_pushes = 0
+                if self._pushes_since_step >= self.cooldown:
+                    self._pushes_since_step = 0
+                    self._step_down()
+            elif comfortable:
+                self._good_pushes += 1
+                if self._good_pushes >= self.recover_after:
+                    self._good_pushes = 0
+                    self._pushes_since_step = 0
+                    self._step_up()
+            else:
+                self._good_pushes = 0
+
+    def _step_down(self) -> None:
+        """Reduce quality, then resolution, then frame rate."""
+        if self.jpeg_quality > self.min_quality:
+            self.jpeg_quality = max(self.min_quality, self.jpeg_quality - 10)
+        elif self.scale > self.min_scale:
+            self.scale = max(self.min_scale, round(self.scale * 0.8, 3))
+        elif self.fps > self.min_fps:
+            self.fps = max(self.min_fps, self.fps * 0.75)
+
+    def _step_up(self) -> None:
+        """Restore frame rate, then resolution, then quality."""
+        if self.fps < self.max_fps:
+            self.fps = min(self.max_fps, self.fps / 0.75)
+        elif self.scale < self.max_scale:
+            self.scale = min(self.max_scale, round(self.scale / 0.8, 3))
+        elif self.jpeg_quality < self.max_quality:
+            self.jpeg_quality = min(self.max_quality, self.jpeg_quality + 5)
+
+    def stats(self) -> Dict[str, float]:
+        """Current settings and smoothed measurements."""
+        return {
+            "fps": round(self.fps, 1),
+            "scale": self.scale,
+            "jpeg_quality": self.jpeg_quality,
+            "push_ms": round((self.push_time or 0.0) * 1000, 1),
+            "latency_ms": round((self.latency or 0.0) * 1000, 1),
+        }
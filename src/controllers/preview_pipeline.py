@@ -0,0 +1,338 @@
+import cv2
+import threading
+import time
+from typing import Callable, Dict, Optional
+from src.controllers.async_video_writer import AsyncVideoWriter
+from src.controllers.bounded_queue import DropOldestQueue
+from src.controllers.burst_capture import BurstCapture
+from src.controllers.change_detector import FrameChangeDetector
+from src.controllers.encoder_pool import JpegEncoderPool, decode_jpeg, encode_jpeg
+from src.controllers.frame_ring import CompressedFrame, CompressedFrameRing, FrameRef, FrameRing
+from src.controllers.preroll_buffer import PrerollBuffer
+from src.controllers.preview_governor import PreviewGovernor
+
+
+class PreviewPipeline:
+    """Camera preview split into capture, encode, UI push and recorder stages joined by DropOldestQueues.
+
+    A slow stage only drops frames in its own branch; the recorder branch
+    gets every frame.
+    """
+
+    STATS_LOG_INTERVAL = 10.0  # Seconds between drop-count log lines
+
+    def __init__(self, camera: cv2.VideoCapture, frame_ring: FrameRing,
+                 on_preview: Callable[[bytes, float], None], governor: Optional[PreviewGovernor] = None,
+                 encoder_pool: Optional[JpegEncoderPool] = None, encoder_workers: Optional[int] = None,
+                 change_detector: Optional[FrameChangeDetector] = None, push_feedback: bool = True,
+                 preview_queue_size: int = 2, record_queue_size: int = 4,
+                 preroll: Optional[PrerollBuffer] = None):
+        if record_queue_size >= frame_ring.slots - 2:
+            raise ValueError("record_queue_size must leave at least two free ring slots")
+        self.camera = camera
+        self.frame_ring = frame_ring
+        self.compressed_ring = CompressedFrameRing(frame_ring.slots)
+        self.is_passthrough = False  # Set once the camera hands us compressed frames
+        self._frame_size = None  # (width, height) of decoded frames
+        # on_preview(jpeg_bytes, captured_at) shows a frame. With push_feedback
+        # the time it takes is fed to the governor; transports that measure
+        # their own delivery time (e.g. MjpegServer) report it themselves.
+        self.on_preview = on_preview
+        self.push_feedback = push_feedback
+        self.governor = governor or PreviewGovernor()
+        self.change_detector = change_detector or FrameChangeDetector()
+
+        self.encoder_pool = encoder_pool
+        self._owns_encoder_pool = encoder_pool is None
+        self.encoder_workers = encoder_workers
+        self.ui_queue = DropOldestQueue(preview_queue_size, "ui")
+        self.record_queue = DropOldestQueue(record_queue_size, "recorder")
+
+        self.video_writer = None
+        self.preroll = preroll
+        self._writer_lock = threading.Lock()
+
+        self.is_running = False
+        self._threads = []
+        self._counters = {
+            "capture": {"frames": 0, "compressed": 0, "failed_reads": 0},
+            "encode": {"throttled": 0, "unchanged": 0, "stale": 0, "passthrough": 0},
+            "ui": {"frames": 0, "errors": 0},
+            "recorder": {"frames": 0, "stale": 0, "errors": 0, "preroll_frames": 0},
+        }
+
+    def start(self) -> None:
+        """Start all stage workers. The pipeline owns the camera from now on."""
+        if self.is_running:
+            return
+        self.is_running = True
+        if self.encoder_pool is None:
+            self.encoder_pool = JpegEncoderPool(self.encoder_workers)
+        for name, target in (
+            ("capture", self._capture_worker),
+            ("ui", self._ui_worker),
+            ("recorder", self._recorder_worker),
+        ):
+            thread = threading.Thread(target=target, name=f"preview-{name}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        print("Preview pipeline started")
+
+    def stop(self, timeout: float = 2.0) -> None:
+        """Stop all workers and release the camera."""
+        if not self.is_running:
+            return
+        self.is_running = False
+        for queue in (self.ui_queue, self.record_queue):
+            queue.close()
+        for thread in self._threads:
+            if thread is not threading.current_thread():
+                thread.join(timeout)
+        self._threads = []
+        if self._owns_encoder_pool:
+            self.encoder_pool.close(timeout)
+        print(f"Preview pipeline stopped: {self.stats()}")
+
+    def set_video_writer(self, writer: Optional[AsyncVideoWriter]) -> None:
+        """Start feeding frames to writer (pre-roll first), or stop recording with None.
+
+        Stopping hands every frame captured so far to the old writer before detaching it.
+        """
+        with self._writer_lock:
+            if writer is None and self.video_writer is not None:
+                self._flush_recorder()
+            if self.preroll is not None:
+                self.preroll.holding = writer is not None and len(self.preroll) > 0
+            self.video_writer = writer
+
+    def has_frame(self) -> bool:
+        """True once at least one frame has been captured."""
+        return self.frame_ring.last_seq >= 0 or self.compressed_ring.last_seq >= 0
+
+    def snapshot(self) -> Optional[FrameRef]:
+        """Private, full-resolution copy of the newest frame, decoding it in passthrough mode."""
+        if self.is_passthrough:
+            item = self.compressed_ring.latest()
+            if item is None:
+                return None
+            frame = decode_jpeg(item.data)
+            if frame is None:
+                return None
+            self._frame_size = (frame.shape[1], frame.shape[0])
+            return FrameRef(frame, item.seq, item.timestamp)
+        return self.frame_ring.snapshot()
+
+    def capture_burst(self, burst: BurstCapture) -> Optional[FrameRef]:
+        """Sharpest frame of a short burst starting now, as a private full-resolution copy."""
+        if self.is_passthrough:
+            return burst.capture_compressed(self.compressed_ring)
+        return burst.capture(self.frame_ring)
+
+    def frame_size(self) -> Optional[tuple]:
+        """(width, height) of captured frames, decoding one frame if not yet known."""
+        if self._frame_size is None and self.is_passthrough:
+            self.snapshot()
+        return self._frame_size
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Per-stage counters, including frames dropped by each stage's input queue."""
+        stats = {stage: dict(counters) for stage, counters in self._counters.items()}
+        if self.encoder_pool is not None:
+            stats["encode"].update(self.encoder_pool.stats())
+        for queue in (self.ui_queue, self.record_queue):
+            stats[queue.name].update(queue.stats())
+        stats["governor"] = self.governor.stats()
+        if self.preroll is not None:
+            stats["preroll"] = self.preroll.stats()
+        return stats
+
+    def _capture_worker(self) -> None:
+        """Read frames into the ring and fan them out to the other stages."""
+        counters = self._counters["capture"]
+        last_log = time.monotonic()
+        try:
+            while self.is_running:
+                try:
+                    # Raw frames are read straight into the next ring slot
+                    buffer = None if self.is_passthrough else self.frame_ring.begin_write()
+                    ret, frame = self.camera.read(buffer)
+                    if not ret or frame is None:
+                        counters["failed_reads"] += 1
+                        print("Failed to capture frame")
+                        time.sleep(0.1)
+                        continue
+                    counters["frames"] += 1
+
+                    if frame.ndim == 1 or frame.shape[0] == 1:
+                        # MJPG passthrough: a flat buffer holding the camera's JPEG
+                        self.is_passthrough = True
+                        counters["compressed"] += 1
+                        item = self.compressed_ring.push(frame.tobytes())
+                        self._submit_compressed_preview(item)
+                    else:
+                        self.is_passthrough = False
+                        seq = self.frame_ring.commit(frame)
+                        item = self.frame_ring.get(seq)
+                        self._frame_size = (frame.shape[1], frame.shape[0])
+                        self._submit_preview(item)
+
+                    if self.video_writer is not None or self.preroll is not None:
+                        self.record_queue.put(item)
+
+                    now = time.monotonic()
+                    if now - last_log >= self.STATS_LOG_INTERVAL:
+                        print(f"Preview pipeline stats: {self.stats()}")
+                        last_log = now
+                except Exception as e:
+                    print(f"Capture stage error: {e}")
+                    import traceback
+                    traceback.print_exc()
+                    time.sleep(0.1)
+        finally:
+            self.camera.release()
+            print("Camera released")
+
+    def _submit_preview(self, ref: FrameRef) -> None:
+        """Hand a frame to the encoder pool if the governor wants it previewed."""
+        if not self.governor.admit(ref.timestamp):
+            self._counters["encode"]["throttled"] += 1
+            return
+        if not self.change_detector.has_changed(ref.frame, ref.timestamp):
+            self._counters["encode"]["unchanged"] += 1
+            return
+        settings = self.governor.settings()
+        scale = self.governor.scale_for(ref.frame.shape[1])
+        self.encoder_pool.submit(ref.frame, self._on_encoded, settings.jpeg_quality, scale, tag=ref)
+
+    def _submit_compressed_preview(self, item: CompressedFrame) -> None:
+        """Forward the camera's JPEG, re-encoding only if the governor asked for less."""
+        if not self.governor.admit(item.timestamp):
+            self._counters["encode"]["throttled"] += 1
+            return
+        if not self.change_detector.has_changed_compressed(item.data, item.timestamp):
+            self._counters["encode"]["unchanged"] += 1
+            return
+
+        width = self._frame_size[0] if self._frame_size else 0
+        if width and self.governor.wants_original(width):
+            self._counters["encode"]["passthrough"] += 1
+            self.ui_queue.put((item.seq, item.timestamp, item.data))
+            return
+
+        # Let libjpeg do most of the downscale while decoding
+        scale = self.governor.scale_for(width) if width else 1.0
+        reduction = 4 if scale <= 0.25 else 2 if scale <= 0.5 else 1
+        frame = decode_jpeg(item.data, reduction)
+        if frame is None:
+            return
+        if reduction == 1:
+            self._frame_size = (frame.shape[1], frame.shape[0])
+        settings = self.governor.settings()
+        self.encoder_pool.submit(frame, self._on_encoded, settings.jpeg_quality,
+                                 min(1.0, scale * reduction), tag=item)
+
+    def _on_encoded(self, ref, jpeg: Optional[bytes]) -> None:
+        """Encoder pool callback, called in capture order."""
+        if jpeg is None:
+            return
+        if isinstance(ref, FrameRef) and not self.frame_ring.is_valid(ref.seq):
+            # The capture stage reused the slot while it was being encoded;
+            # make sure the next frame is shown even if it looks the same
+            self._counters["encode"]["stale"] += 1
+            self.change_detector.reset()
+            return
+        self.ui_queue.put((ref.seq, ref.timestamp, jpeg))
+
+    def _ui_worker(self) -> None:
+        """Push encoded preview frames to the display transport."""
+        counters = self._counters["ui"]
+        while self.is_running:
+            item = self.ui_queue.get(timeout=0.5)
+            if item is None:
+                continue
+            try:
+                _, captured_at, jpeg = item
+                started = time.monotonic()
+                self.on_preview(jpeg, captured_at)
+                if self.push_feedback:
+                    self.governor.record_push(time.monotonic() - started, captured_at)
+                counters["frames"] += 1
+            except Exception as e:
+                counters["errors"] += 1
+                print(f"UI stage error: {e}")
+
+    def _recorder_worker(self) -> None:
+        """Write frames to the active video writer, or keep them as pre-roll between recordings."""
+        counters = self._counters["recorder"]
+        while self.is_running:
+            # Don't wait for new frames while there is pre-roll left to write
+            backlog = self.video_writer is not None and self.preroll is not None and len(self.preroll) > 0
+            item = self.record_queue.get(timeout=0 if backlog else 0.5)
+            with self._writer_lock:
+                if item is not None:
+                    if self.video_writer is None or (self.preroll is not None and len(self.preroll) > 0):
+                        # Not recording, or still catching up on the pre-roll:
+                        # the frame joins the back of the buffer
+                        self._buffer_preroll(item)
+                    else:
+                        self._write_frame(item)
+                if self.video_writer is not None and self.preroll is not None:
+                    buffered = self.preroll.pop()
+                    if buffered is not None:
+                        counters["preroll_frames"] += 1
+                        self._write_frame(buffered)
+
+    def _buffer_preroll(self, item) -> None:
+        """Add a recorder item to the pre-roll buffer (compressing raw frames)."""
+        if self.preroll is None:
+            return
+        if isinstance(item, CompressedFrame):
+            self.preroll.add(item.data, item.seq, item.timestamp)
+            return
+        data = encode_jpeg(item.frame, self.preroll.quality)
+        # The slot may have been reused while it was being encoded
+        if data is None or not self.frame_ring.is_valid(item.seq):
+            self._counters["recorder"]["stale"] += 1
+            return
+        self.preroll.add(data, item.seq, item.timestamp)
+
+    def _flush_recorder(self) -> None:
+        """Write everything queued for the recorder to the current writer. Call with _writer_lock held."""
+        while True:
+            item = self.record_queue.get(timeout=0)
+            if item is None:
+                break
+            if self.preroll is not None and len(self.preroll) > 0:
+                self._buffer_preroll(item)
+            else:
+                self._write_frame(item)
+        while self.preroll is not None:
+            buffered = self.preroll.pop()
+            if buffered is None:
+                break
+            self._counters["recorder"]["preroll_frames"] += 1
+            self._write_frame(buffered)
+
+    def _write_frame(self, item) -> None:
+        """Queue one FrameRef or CompressedFrame on the video writer. Call with _writer_lock held."""
+        counters = self._counters["recorder"]
+        if isinstance(item, CompressedFrame):
+            frame = decode_jpeg(item.data)
+            if frame is None:
+                counters["errors"] += 1
+                return
+        else:
+            # Copy before waiting on the writer, then check the slot wasn't
+            # reused while copying; afterwards the ring can move on freely
+            frame = item.frame.copy()
+            if not self.frame_ring.is_valid(item.seq):
+                counters["stale"] += 1
+                return
+        try:
+            # Wait for room rather than drop: this thread is the one that
+            # should absorb a slow writer, via record_queue and the pre-roll
+            self.video_writer.write(frame, item.timestamp, copy=False, wait=True)
+            counters["frames"] += 1
+        except Exception as e:
+            counters["errors"] += 1
+            print(f"Error writing video frame: {e}")
@@ -0,0 +1,113 @@
+import cv2
+import numpy as np
+import time
+from typing import Optional, Tuple
+
+
+class SimulatedCamera:
+    """Vectorized generator for the animated test pattern used when no real camera is available."""
+
+    def __init__(self, width: int = 1280, height: int = 720, fps: float = 30.0):
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.frame_count = 0
+
+        x = np.arange(width, dtype=np.float32)
+        y = np.arange(height, dtype=np.float32)
+        diagonal = np.arange(width + height - 1, dtype=np.float32)
+
+        # Precomputed sine tables for the spatial phase of each channel
+        self._sin_x, self._cos_x = np.sin(x / 50), np.cos(x / 50)
+        self._sin_y, self._cos_y = np.sin(y / 50), np.cos(y / 50)
+        self._sin_d, self._cos_d = np.sin(diagonal / 100), np.cos(diagonal / 100)
+
+        # Scratch buffers reused every frame to avoid per-frame allocations
+        self._red = np.empty(width, dtype=np.uint8)
+        self._green = np.empty(height, dtype=np.uint8)
+        self._blue = np.empty(width + height - 1, dtype=np.uint8)
+
+        # Scale the overlay text with the frame so it stays readable at 1080p
+        self._font = cv2.FONT_HERSHEY_SIMPLEX
+        self._font_scale = max(1.0, height / 480.0)
+        self._text_thickness = max(2, int(round(2 * self._font_scale)))
+        self._counter_scale = 0.5 * self._font_scale
+
+        text_size = cv2.getTextSize("SIMULATED CAMERA", self._font, self._font_scale, self._text_thickness)[0]
+        self._text_origin = ((width - text_size[0]) // 2, height // 2)
+
+    @property
+    def frame_shape(self) -> Tuple[int, int, int]:
+        """Shape of the frames produced by this generator."""
+        return (self.height, self.width, 3)
+
+    @staticmethod
+    def _channel(sin_table: np.ndarray, cos_table: np.ndarray, phase: float, out: np.ndarray) -> np.ndarray:
+        """Evaluate 127 + 127 * sin(table + phase) into a uint8 buffer."""
+        values = sin_table * np.float32(np.cos(phase)) + cos_table * np.float32(np.sin(phase))
+        values *= 127
+        values += 127
+        np.copyto(out, values, casting="unsafe")
+        return out
+
+    def render(self, t: Optional[float] = None, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """Render one frame of the pattern at time t, optionally into a preallocated BGR buffer."""
+        if t is None:
+            t = time.time() * 2  # Same animation speed as the original pattern
+        if out is None or out.shape != self.frame_shape:
+            out = np.empty(self.frame_shape, dtype=np.uint8)
+
+        self.frame_count += 1
+
+        red = self._channel(self._sin_x, self._cos_x, t, self._red)
+        green = self._channel(self._sin_y, self._cos_y, t * 0.7, self._green)
+        blue = self._channel(self._sin_d, self._cos_d, t * 1.3, self._blue)
+
+        # Row y of the blue channel is blue[y:y + width]; expose that as a strided view
+        blue_view = np.lib.stride_tricks.as_strided(
+            blue,
+            shape=(self.height, self.width),
+            strides=(blue.strides[0], blue.strides[0]),
+            writeable=False,
+        )
+
+        # OpenCV uses BGR channel order
+        out[:, :, 0] = blue_view
+        out[:, :, 1] = green[:, None]
+        out[:, :, 2] = red[None, :]
+
+        cv2.putText(out, "SIMULATED CAMERA", self._text_origin, self._font,
+                    self._font_scale, (255, 255, 255), self._text_thickness)
+        cv2.putText(out, f"Frame: {self.frame_count}", (10, self.height - 20), self._font,
+                    self._counter_scale, (255, 255, 255), 1)
+        return out
+
+    def render_placeholder(self, text: str = "SIMULATED CAMERA INITIALIZING...") -> np.ndarray:
+        """Render a black frame with a centered status message."""
+        frame = np.zeros(self.frame_shape, dtype=np.uint8)
+        text_size = cv2.getTextSize(text, self._font, self._font_scale, self._text_thickness)[0]
+        origin = ((self.width - text_size[0]) // 2, self.height // 2)
+        cv2.putText(frame, text, origin, self._font, self._font_scale, (255, 255, 255), self._text_thickness)
+        return frame
+
+
+class FramePacer:
+    """Deadline-based pacing that holds a steady frame rate instead of sleeping a fixed amount."""
+
+    def __init__(self, fps: float):
+        self.interval = 1.0 / fps
+        self._next_deadline = None
+
+    def wait(self):
+        """Sleep until the next frame is due, resynchronizing if we fell more than a frame behind."""
+        now = time.monotonic()
+        if self._next_deadline is None:
+            self._next_deadline = now
+        self._next_deadline += self.interval
+
+        delay = self._next_deadline - now
+        if delay > 0:
+            time.sleep(delay)
+        elif delay < -self.interval:
+            # Running late: drop the backlog rather than bursting to catch up
+            self._next_deadline = now
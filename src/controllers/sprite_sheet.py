@@ -0,0 +1,110 @@
+import cv2
+import numpy as np
+from typing import Dict, Hashable, List, Optional, Sequence, Tuple
+from src.controllers.encoder_pool import encode_jpeg
+
+
+class SpriteSheet:
+    """A row of square tiles packed into one image, sent to the UI as a single JPEG.
+
+    arrange() reuses tiles whose key is already on the sheet; `version`
+    counts changes to the canvas.
+    """
+
+    def __init__(self, tiles: int, tile_size: int = 120, spacing: int = 10,
+                 quality: int = 80, background: Tuple[int, int, int] = (0x23, 0x23, 0x23)):
+        self.tiles = tiles
+        self.tile_size = tile_size
+        self.spacing = spacing
+        self.quality = quality
+        self.background = background
+
+        self.width = tiles * tile_size + (tiles - 1) * spacing
+        self.height = tile_size
+        self.canvas = np.empty((self.height, self.width, 3), dtype=np.uint8)
+        self.canvas[:] = background
+        self.keys: List[Optional[Hashable]] = [None] * tiles
+        self._drawn: List[bool] = [False] * tiles  # Whether each tile holds a drawn image
+        self._jpeg = None
+        self.version = 0  # Bumped whenever the canvas changes
+
+        self.encodes = 0
+        self.drawn = 0
+        self.moved = 0
+
+    def _tile(self, index: int) -> np.ndarray:
+        left = index * (self.tile_size + self.spacing)
+        return self.canvas[:, left:left + self.tile_size]
+
+    def arrange(self, keys: Sequence[Optional[Hashable]]) -> List[int]:
+        """Lay out the sheet for keys (None leaves a tile blank).
+
+        Returns the indices of the tiles that still need a draw().
+        """
+        keys = list(keys)[:self.tiles] + [None] * max(0, self.tiles - len(keys))
+        if keys == self.keys:
+            return []
+        old_positions = {key: index for index, key in enumerate(self.keys) if key is not None}
+        # Copy the tiles that move first; moves can overlap (shift by one)
+        moving = {}
+        for index, key in enumerate(keys):
+            old_index = old_positions.get(key)
+            if old_index is not None and old_index != index and key not in moving:
+                moving[key] = self._tile(old_index).copy()
+
+        drawn = [False] * self.tiles
+        missing = []
+        for index, key in enumerate(keys):
+            if key in moving:
+                self._tile(index)[:] = moving[key]
+                drawn[index] = self._drawn[old_positions[key]]
+                self.moved += 1
+            elif key is not None and old_positions.get(key) == index:
+                drawn[index] = self._drawn[index]
+            else:
+                self._tile(index)[:] = self.background
+            if key is not None and not drawn[index]:
+                missing.append(index)
+        self.keys = keys
+        self._drawn = drawn
+        self._jpeg = None
+        self.version += 1
+        return missing
+
+    def draw(self, index: int, image: np.ndarray) -> None:
+        """Scale a BGR image to cover tile index (center crop) and draw it."""
+        height, width = image.shape[:2]
+        scale = self.tile_size / float(min(height, width))
+        size = (max(self.tile_size, int(round(width * scale))), max(self.tile_size, int(round(height * scale))))
+        interpolation = cv2.INTER_AREA if scale < 1.0 else cv2.INTER_LINEAR
+        resized = cv2.resize(image, size, interpolation=interpolation)
+        top = (size[1] - self.tile_size) // 2
+        left = (size[0] - self.tile_size) // 2
+        self._tile(index)[:] = resized[top:top + self.tile_size, left:left + self.tile_size]
+        self._drawn[index] = True
+        self.drawn += 1
+        self._jpeg = None
+        self.version += 1
+
+    def tile_at(self, x: float, y: float) -> Optional[int]:
+        """Tile index under sheet coordinates (x, y), or None for the gaps and outside."""
+        if x is None or y is None or not (0 <= x < self.width and 0 <= y < self.height):
+            return None
+        index, offset = divmod(int(x), self.tile_size + self.spacing)
+        return index if offset < self.tile_size else None
+
+    def encode(self) -> Optional[bytes]:
+        """JPEG of the sheet, re-encoded only if it changed."""
+        if self._jpeg is None:
+            self._jpeg = encode_jpeg(self.canvas, self.quality)
+            self.encodes += 1
+        return self._jpeg
+
+    def stats(self) -> Dict[str, int]:
+        """Tile draw/move and encode counters."""
+        return {
+            "drawn": self.drawn,
+            "moved": self.moved,
+            "encodes": self.encodes,
+            "bytes": len(self._jpeg) if self._jpeg is not None else 0,
+        }
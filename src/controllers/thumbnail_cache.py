@@ -0,0 +1,178 @@
+import collections
+import concurrent.futures
+import cv2
+import hashlib
+import numpy as np
+import os
+import threading
+from typing import Callable, Dict, Optional
+
+VIDEO_EXTENSIONS = (".mp4", ".mov", ".avi", ".mkv", ".webm")
+
+
+class ThumbnailCache:
+    """Small JPEG thumbnails (and first-frame posters for videos) in an on-disk LRU cache.
+
+    Entries are keyed by source path, mtime and size, so a changed file gets
+    a fresh thumbnail.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None, size: int = 240,
+                 max_bytes: int = 64 * 1024 * 1024, quality: int = 80, workers: int = 2):
+        if cache_dir is None:
+            cache_dir = os.path.join(os.path.expanduser("~"), ".selfiebooth", "thumbnails")
+        self.cache_dir = cache_dir
+        self.size = size  # Longest side, in pixels
+        self.max_bytes = max_bytes
+        self.quality = quality
+
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers,
+                                                               thread_name_prefix="thumbnail")
+        self._lock = threading.Lock()
+        self._entries = collections.OrderedDict()  # Cache file name -> bytes, oldest first
+        self._pending = {}  # Cache file name -> Future
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+        self._load_index()
+
+    def _load_index(self) -> None:
+        """Rebuild the LRU order from the files already in the cache directory."""
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            files = []
+            for entry in os.scandir(self.cache_dir):
+                if entry.is_file() and entry.name.endswith(".jpg"):
+                    stat = entry.stat()
+                    files.append((stat.st_mtime, entry.name, stat.st_size))
+        except Exception as e:
+            print(f"Could not read thumbnail cache {self.cache_dir}: {e}")
+            return
+        for _, name, size in sorted(files):
+            self._entries[name] = size
+            self.total_bytes += size
+
+    def _key(self, path: str) -> Optional[str]:
+        """Cache file name for path in its current version, or None if it doesn't exist."""
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+        digest = hashlib.sha1(f"{os.path.abspath(path)}|{mtime}|{self.size}".encode("utf-8")).hexdigest()
+        return f"{digest}.jpg"
+
+    def get(self, path: str) -> Optional[str]:
+        """Path of the cached thumbnail for path, or None if it hasn't been generated."""
+        key = self._key(path)
+        if key is None:
+            return None
+        with self._lock:
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+        thumb_path = os.path.join(self.cache_dir, key)
+        try:
+            # Persist the recency for the next session
+            os.utime(thumb_path)
+        except OSError:
+            with self._lock:
+                self.total_bytes -= self._entries.pop(key, 0)
+            return None
+        return thumb_path
+
+    def request(self, path: str,
+                on_ready: Optional[Callable[[str, Optional[str]], None]] = None) -> concurrent.futures.Future:
+        """Get or generate the thumbnail for path in the background.
+
+        The future resolves to the thumbnail path (None on failure), also passed to on_ready(path, thumb_path).
+        """
+        thumb_path = self.get(path)
+        if thumb_path is not None:
+            with self._lock:
+                self.hits += 1
+            future = concurrent.futures.Future()
+            future.set_result(thumb_path)
+        else:
+            key = self._key(path)
+            with self._lock:
+                self.misses += 1
+                future = self._pending.get(key) if key is not None else None
+                if future is None:
+                    future = self._executor.submit(self._generate, path, key)
+                    if key is not None:
+                        self._pending[key] = future
+        if on_ready is not None:
+            future.add_done_callback(lambda done: on_ready(path, done.result()))
+        return future
+
+    def close(self) -> None:
+        """Stop the worker pool; thumbnails already being generated are finished."""
+        self._executor.shutdown(wait=True)
+
+    def stats(self) -> Dict[str, int]:
+        """Cache occupancy and hit/miss/eviction counters."""
+        return {
+            "entries": len(self._entries),
+            "bytes": self.total_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evicted": self.evicted,
+        }
+
+    def _read_source(self, path: str) -> Optional[np.ndarray]:
+        """First frame of a video, or the image itself (first frame for GIFs)."""
+        if path.lower().endswith(VIDEO_EXTENSIONS):
+            capture = cv2.VideoCapture(path)
+            try:
+                ok, frame = capture.read()
+            finally:
+                capture.release()
+            return frame if ok else None
+        return cv2.imread(path, cv2.IMREAD_COLOR)
+
+    def _generate(self, path: str, key: Optional[str]) -> Optional[str]:
+        try:
+            if key is None:
+                return None
+            frame = self._read_source(path)
+            if frame is None:
+                print(f"Could not read {path} for a thumbnail")
+                return None
+            scale = min(1.0, self.size / float(max(frame.shape[:2])))
+            if scale < 1.0:
+                size = (max(1, int(frame.shape[1] * scale)), max(1, int(frame.shape[0] * scale)))
+                frame = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+            ok, buffer = cv2.imencode(".jpg", frame, [int(cv2.IMWRITE_JPEG_QUALITY), self.quality])
+            if not ok:
+                return None
+
+            thumb_path = os.path.join(self.cache_dir, key)
+            tmp_path = thumb_path + ".tmp"
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(tmp_path, "wb") as f:
+                f.write(buffer)
+            os.replace(tmp_path, thumb_path)
+
+            with self._lock:
+                self.total_bytes += len(buffer) - self._entries.pop(key, 0)
+                self._entries[key] = len(buffer)
+                self._evict()
+            return thumb_path
+        except Exception as e:
+            print(f"Thumbnail error for {path}: {e}")
+            return None
+        finally:
+            with self._lock:
+                self._pending.pop(key, None)
+
+    def _evict(self) -> None:
+        """Remove least recently used thumbnails until under max_bytes. Call with _lock held."""
+        while self.total_bytes > self.max_bytes and len(self._entries) > 1:
+            name, size = self._entries.popitem(last=False)
+            self.total_bytes -= size
+            self.evicted += 1
+            try:
+                os.remove(os.path.join(self.cache_dir, name))
+            except OSError:
+                pass
@@ -0,0 +1,346 @@
+import httpx
+import os
+import random
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS uploads (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL,
+    event_id INTEGER NOT NULL,
+    media_type TEXT NOT NULL,
+    template_id INTEGER,
+    media_id INTEGER,
+    status TEXT NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL DEFAULT 0,
+    last_error TEXT,
+    size INTEGER,
+    created_at REAL NOT NULL,
+    finished_at REAL,
+    upload_id TEXT,
+    committed_offset INTEGER NOT NULL DEFAULT 0,
+    content_hash TEXT
+);
+CREATE INDEX IF NOT EXISTS uploads_due ON uploads (status, next_attempt_at);
+"""
+
+_COLUMNS = ("id, path, event_id, media_type, template_id, media_id, status, attempts, last_error, size,"
+            " upload_id, committed_offset")
+
+# Columns added after the first release of the journal
+_MIGRATIONS = (
+    ("upload_id", "ALTER TABLE uploads ADD COLUMN upload_id TEXT"),
+    ("committed_offset", "ALTER TABLE uploads ADD COLUMN committed_offset INTEGER NOT NULL DEFAULT 0"),
+    ("content_hash", "ALTER TABLE uploads ADD COLUMN content_hash TEXT"),
+)
+
+# Server answers worth retrying (timeout, too early, rate limited) besides 5xx;
+# any other 4xx means the request itself is wrong
+_RETRY_STATUS = (408, 425, 429)
+
+
+class UploadJob(NamedTuple):
+    """One file in the upload queue, as recorded in the journal."""
+    id: int
+    path: str
+    event_id: int
+    media_type: str
+    template_id: Optional[int]
+    media_id: Optional[int]  # MediaLibrary id, if the file is indexed
+    status: str  # "queued", "uploading", "done" or "failed"
+    attempts: int
+    last_error: Optional[str]
+    size: Optional[int]
+    upload_id: Optional[str]  # Server upload session of a chunked upload
+    committed_offset: int  # Bytes of a chunked upload the server has acknowledged
+
+
+class UploadProgress(NamedTuple):
+    """Progress of the current attempt at uploading a job."""
+    job: UploadJob
+    sent: int
+    total: int
+    elapsed: float
+    bytes_per_second: float
+
+
+class UploadQueue:
+    """Uploads captured media in the background, journaled in SQLite so it survives crashes and restarts.
+
+    Failed attempts are retried with exponential backoff, and large files
+    are sent in chunks that resume where the server stopped.
+    """
+
+    def __init__(self, api_client, journal_path: str, workers: int = 2, max_attempts: int = 8,
+                 base_delay: float = 2.0, max_delay: float = 300.0, progress_interval: float = 0.25,
+                 chunk_size: int = 1024 * 1024, chunked_threshold: int = 8 * 1024 * 1024,
+                 on_progress: Optional[Callable[[UploadProgress], None]] = None,
+                 on_finished: Optional[Callable[[UploadJob], None]] = None):
+        self.api_client = api_client
+        self.journal_path = journal_path
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.progress_interval = progress_interval
+        self.chunk_size = chunk_size
+        self.chunked_threshold = chunked_threshold
+        self.on_progress = on_progress
+        self.on_finished = on_finished
+
+        os.makedirs(os.path.dirname(os.path.abspath(journal_path)), exist_ok=True)
+        self._db = sqlite3.connect(journal_path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(_SCHEMA)
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(uploads)")}
+        for column, statement in _MIGRATIONS:
+            if column not in columns:
+                self._db.execute(statement)
+        # Created after the migrations, which may have just added the column
+        self._db.execute("CREATE INDEX IF NOT EXISTS uploads_content ON uploads (content_hash, event_id)")
+        self._db.commit()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._threads: List[threading.Thread] = []
+        self.is_running = False
+
+        self.bytes_sent = 0
+        self.upload_seconds = 0.0
+        self.uploaded = 0
+        self.retries = 0
+        self.failed = 0
+        self.duplicates = 0
+
+    def _job(self, row) -> UploadJob:
+        return UploadJob(*row)
+
+    def start(self) -> None:
+        """Resume interrupted jobs and start the workers."""
+        with self._lock:
+            if self.is_running:
+                return
+            # Anything that was uploading when the app stopped starts over
+            resumed = self._db.execute(
+                "UPDATE uploads SET status = 'queued', next_attempt_at = 0 WHERE status = 'uploading'").rowcount
+            self._db.commit()
+            self.is_running = True
+            self._threads = [
+                threading.Thread(target=self._worker, name=f"upload-{index}", daemon=True)
+                for index in range(self.workers)
+            ]
+        if resumed:
+            print(f"Resuming {resumed} interrupted upload(s)")
+        for thread in self._threads:
+            thread.start()
+
+    def enqueue(self, path: str, event_id: int, media_type: str = 'photo',
+                template_id: Optional[int] = None, media_id: Optional[int] = None,
+                content_hash: Optional[str] = None) -> int:
+        """Journal a file for upload and return its job id (the existing one for duplicate content)."""
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            size = None
+        with self._wakeup:
+            if content_hash is not None:
+                row = self._db.execute(
+                    "SELECT id FROM uploads WHERE content_hash = ? AND event_id = ? AND status != 'failed'"
+                    " LIMIT 1", (content_hash, int(event_id))).fetchone()
+                if row is not None:
+                    self.duplicates += 1
+                    print(f"Skipping upload of {os.path.basename(path)}: same content as upload {row[0]}")
+                    return row[0]
+            job_id = self._db.execute(
+                "INSERT INTO uploads (path, event_id, media_type, template_id, media_id, size, created_at,"
+                " content_hash) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (path, int(event_id), media_type, template_id, media_id, size, time.time(), content_hash),
+            ).lastrowid
+            self._db.commit()
+            self._wakeup.notify()
+        return job_id
+
+    def retry_failed(self) -> int:
+        """Queue every failed job again with a fresh set of attempts."""
+        with self._wakeup:
+            count = self._db.execute(
+                "UPDATE uploads SET status = 'queued', attempts = 0, next_attempt_at = 0"
+                " WHERE status = 'failed'").rowcount
+            self._db.commit()
+            self._wakeup.notify_all()
+        return count
+
+    def jobs(self, status: Optional[str] = None, limit: int = 100) -> List[UploadJob]:
+        """Journaled jobs, oldest first, optionally only those with the given status."""
+        where, params = (" WHERE status = ?", [status]) if status else ("", [])
+        with self._lock:
+            rows = self._db.execute(f"SELECT {_COLUMNS} FROM uploads{where} ORDER BY id LIMIT ?",
+                                    params + [limit]).fetchall()
+        return [self._job(row) for row in rows]
+
+    def job(self, job_id: int) -> Optional[UploadJob]:
+        """The journaled job with this id, if any."""
+        with self._lock:
+            row = self._db.execute(f"SELECT {_COLUMNS} FROM uploads WHERE id = ?", (job_id,)).fetchone()
+        return self._job(row) if row is not None else None
+
+    def pending(self) -> int:
+        """Number of jobs not yet done or failed."""
+        with self._lock:
+            return self._db.execute(
+                "SELECT COUNT(*) FROM uploads WHERE status IN ('queued', 'uploading')").fetchone()[0]
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Stop the workers after their current upload; unfinished jobs stay journaled."""
+        with self._wakeup:
+            if not self.is_running:
+                return
+            self.is_running = False
+            self._wakeup.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+        if not any(thread.is_alive() for thread in self._threads):
+            with self._lock:
+                self._db.close()
+
+    def stats(self) -> Dict[str, object]:
+        """Job counts by status plus throughput counters for this session."""
+        with self._lock:
+            counts = dict(self._db.execute("SELECT status, COUNT(*) FROM uploads GROUP BY status"))
+        return {
+            "queued": counts.get("queued", 0),
+            "uploading": counts.get("uploading", 0),
+            "done": counts.get("done", 0),
+            "failed": counts.get("failed", 0),
+            "uploaded": self.uploaded,
+            "retries": self.retries,
+            "duplicates": self.duplicates,
+            "bytes_sent": self.bytes_sent,
+            "bytes_per_second": round(self.bytes_sent / self.upload_seconds) if self.upload_seconds else 0,
+        }
+
+    def _next_job(self) -> Optional[UploadJob]:
+        """Claim the oldest due job, waiting for one; None once the queue is closed."""
+        with self._wakeup:
+            while self.is_running:
+                now = time.time()
+                row = self._db.execute(
+                    f"SELECT {_COLUMNS} FROM uploads WHERE status = 'queued' AND next_attempt_at <= ?"
+                    " ORDER BY id LIMIT 1", (now,)).fetchone()
+                if row is not None:
+                    self._db.execute("UPDATE uploads SET status = 'uploading', attempts = attempts + 1"
+                                     " WHERE id = ?", (row[0],))
+                    self._db.commit()
+                    job = self._job(row)
+                    return job._replace(status="uploading", attempts=job.attempts + 1)
+                # Sleep until the next backoff expires or a job is added
+                next_due = self._db.execute(
+                    "SELECT MIN(next_attempt_at) FROM uploads WHERE status = 'queued'").fetchone()[0]
+                self._wakeup.wait(None if next_due is None else max(0.05, next_due - now))
+        return None
+
+    def _finish(self, job: UploadJob, status: str, error: Optional[str] = None,
+                next_attempt_at: float = 0) -> UploadJob:
+        with self._lock:
+            self._db.execute(
+                "UPDATE uploads SET status = ?, last_error = ?, next_attempt_at = ?, finished_at = ? WHERE id = ?",
+                (status, error, next_attempt_at, time.time() if status in ("done", "failed") else None, job.id),
+            )
+            self._db.commit()
+        return job._replace(status=status, last_error=error)
+
+    def _commit_offset(self, job_id: int, upload_id: str, offset: int) -> None:
+        """Journal the server's acknowledged offset of a chunked upload."""
+        with self._lock:
+            self._db.execute("UPDATE uploads SET upload_id = ?, committed_offset = ? WHERE id = ?",
+                             (upload_id, offset, job_id))
+            self._db.commit()
+
+    def _backoff(self, attempts: int) -> float:
+        delay = min(self.max_delay, self.base_delay * (2 ** (attempts - 1)))
+        return delay * random.uniform(0.5, 1.0)
+
+    def _upload(self, job: UploadJob) -> None:
+        started = time.monotonic()
+        last_report = 0.0
+        # A resumed chunked upload only sends what the server doesn't have yet
+        resumed_from = job.committed_offset if job.upload_id else 0
+
+        def on_progress(sent, total):
+            nonlocal last_report
+            now = time.monotonic()
+            if self.on_progress is None or (now - last_report < self.progress_interval and sent < total):
+                return
+            last_report = now
+            elapsed = now - started
+            rate = max(0, sent - resumed_from) / elapsed if elapsed > 0 else 0.0
+            try:
+                self.on_progress(UploadProgress(job, sent, total, elapsed, rate))
+            except Exception as e:
+                print(f"Upload progress callback error: {e}")
+
+        if not os.path.exists(job.path):
+            self._done(job, "failed", "File not found")
+            return
+        try:
+            if (job.size or 0) >= self.chunked_threshold:
+                response = self.api_client.post_media_chunked(
+                    job.event_id, job.path, job.media_type, job.template_id, on_progress,
+                    chunk_size=self.chunk_size, upload_id=job.upload_id,
+                    on_committed=lambda upload_id, offset: self._commit_offset(job.id, upload_id, offset),
+                )
+            else:
+                response = self.api_client.post_media(job.event_id, job.path, job.media_type,
+                                                      job.template_id, on_progress)
+        except (httpx.HTTPError, OSError) as e:
+            self._retry_or_fail(job, f"{type(e).__name__}: {e}")
+            return
+
+        if response.status_code in (200, 201):
+            elapsed = time.monotonic() - started
+            size = max(0, (job.size or 0) - resumed_from)
+            self.uploaded += 1
+            self.bytes_sent += size
+            self.upload_seconds += elapsed
+            print(f"Uploaded {os.path.basename(job.path)} ({size / 1024:.0f} KB in {elapsed:.2f}s, "
+                  f"{size / elapsed / 1024 if elapsed > 0 else 0:.0f} KB/s)")
+            self._done(job, "done")
+        elif response.status_code >= 500 or response.status_code in _RETRY_STATUS:
+            self._retry_or_fail(job, f"HTTP {response.status_code}")
+        else:
+            self._done(job, "failed", f"HTTP {response.status_code}: {response.text[:200]}")
+
+    def _retry_or_fail(self, job: UploadJob, error: str) -> None:
+        if job.attempts >= self.max_attempts:
+            self._done(job, "failed", error)
+            return
+        delay = self._backoff(job.attempts)
+        self.retries += 1
+        print(f"Upload of {os.path.basename(job.path)} failed ({error}), retrying in {delay:.1f}s")
+        self._finish(job, "queued", error, time.time() + delay)
+
+    def _done(self, job: UploadJob, status: str, error: Optional[str] = None) -> None:
+        job = self._finish(job, status, error)
+        if status == "failed":
+            self.failed += 1
+            print(f"Upload of {job.path} failed after {job.attempts} attempt(s): {error}")
+        if self.on_finished is not None:
+            try:
+                self.on_finished(job)
+            except Exception as e:
+                print(f"Upload finished callback error: {e}")
+
+    def _worker(self) -> None:
+        while True:
+            job = self._next_job()
+            if job is None:
+                return
+            try:
+                self._upload(job)
+            except Exception as e:
+                # Never lose the job to an unexpected error; treat it as a failed attempt
+                print(f"Upload worker error: {e}")
+                self._retry_or_fail(job, str(e))
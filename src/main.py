@@ -24,7 +24,7 @@ if is_ios:
     print(f"iOS app path added: {ios_app_path}")
 
 # Try different import patterns to handle various deployment scenarios
-from utils.api_client import APIClient
+from utils.async_api_client import AsyncAPIClient
 from views.login import LoginView
 from views.event_list import EventListView
 from views.event_details import EventDetailsView
@@ -66,11 +66,12 @@ def main(page: ft.Page):
         # Use a proper API endpoint based on platform
         if is_ios:
             # For iOS, use a remote API endpoint
-            api_client = APIClient(base_url="https://selfieboothapiservice.azurewebsites.net/api")
+            # HTTP/2 multiplexes the app's concurrent requests over one connection
+            api_client = AsyncAPIClient(base_url="https://selfieboothapiservice.azurewebsites.net/api", http2=True)
             print(f"Using iOS API endpoint: {api_client.base_url}")
         else:
             # For desktop development
-            api_client = APIClient(base_url="http://127.0.0.1:8001/api")
+            api_client = AsyncAPIClient(base_url="http://127.0.0.1:8001/api")
             print(f"Using local API endpoint: {api_client.base_url}")
     except Exception as e:
         error_msg = f"Error initializing app: {str(e)}"
@@ -263,9 +264,14 @@ def main(page: ft.Page):
         top_view = page.views[-1]
         page.go(top_view.route)
     
+    async def close_session(e):
+        # Close the API client's pooled connections when the app exits
+        await api_client.aclose()
+    
     # Set up routing events
     page.on_route_change = route_change
     page.on_view_pop = view_pop
+    page.on_close = close_session
     
     # Start directly with camera test page for testing
     print("Opening camera test page directly")
@@ -274,8 +280,11 @@ def main(page: ft.Page):
     page.go("/")
 
 
-# Check if assets folder exists for development vs packaged mode
-if os.path.exists(os.path.join(os.path.dirname(__file__), "assets")):
-    ft.app(target=main, assets_dir="assets")
-else:
-    ft.app(target=main)
+# Guarded so worker processes (which re-import the main module when
+# spawned) don't start a second app
+if __name__ == "__main__":
+    # Check if assets folder exists for development vs packaged mode
+    if os.path.exists(os.path.join(os.path.dirname(__file__), "assets")):
+        ft.app(target=main, assets_dir="assets")
+    else:
+        ft.app(target=main)
@@ -1,7 +1,48 @@
 import httpx
-from typing import Optional, Dict, List, Any, Tuple
+import io
+from typing import Callable, Optional, Dict, List, Tuple
 import os
 
+
+class _ProgressFile(io.FileIO):
+    """File opened for upload that reports its read position as it is sent."""
+    
+    def __init__(self, path: str, on_read: Callable[[int], None]):
+        super().__init__(path, 'rb')
+        self.on_read = on_read
+    
+    def read(self, size=-1):
+        data = super().read(size)
+        if data:
+            # The position, not a running total: a retried request rewinds
+            self.on_read(self.tell())
+        return data
+
+
+class _FileRange:
+    """A byte range of an open file, read in small pieces each time it is iterated.
+    
+    Used as a request body, it keeps only one piece in memory, and unlike a
+    generator it can be sent again (e.g. after a token refresh).
+    """
+    
+    def __init__(self, f, offset: int, length: int, piece_size: int = 64 * 1024):
+        self.f = f
+        self.offset = offset
+        self.length = length
+        self.piece_size = piece_size
+    
+    def __iter__(self):
+        self.f.seek(self.offset)
+        remaining = self.length
+        while remaining > 0:
+            piece = self.f.read(min(self.piece_size, remaining))
+            if not piece:
+                raise IOError("File shrank during upload")
+            remaining -= len(piece)
+            yield piece
+
+
 class APIClient:
     """API Client for SelfieBooth application"""
     
@@ -12,8 +53,9 @@ class APIClient:
         self.user_data: Optional[Dict] = None
         self.client = httpx.Client(timeout=30.0)
     
-    def _get_headers(self) -> Dict[str, str]:
-        headers = {'Content-Type': 'application/json'}
+    def _get_headers(self, content_type: Optional[str] = 'application/json') -> Dict[str, str]:
+        # Multipart requests pass content_type=None so httpx can add the boundary
+        headers = {'Content-Type': content_type} if content_type else {}
         if self.access_token:
             headers['Authorization'] = f'Bearer {self.access_token}'
         return headers
@@ -63,15 +105,15 @@ class APIClient:
         except Exception:
             return False
     
-    def _request_with_refresh(self, method, url, **kwargs):
+    def _request_with_refresh(self, method, url, content_type='application/json', **kwargs):
         """Make a request and refresh token if needed"""
-        kwargs.setdefault('headers', {}).update(self._get_headers())
+        kwargs.setdefault('headers', {}).update(self._get_headers(content_type))
         response = self.client.request(method, url, **kwargs)
         
         if response.status_code == 401:
             # Try to refresh the token and retry the request
             if self._refresh_access_token():
-                kwargs['headers'].update(self._get_headers())
+                kwargs['headers'].update(self._get_headers(content_type))
                 response = self.client.request(method, url, **kwargs)
         
         return response
@@ -131,26 +173,124 @@ class APIClient:
         response = self._request_with_refresh('GET', url)
         return response.json() if response.status_code == 200 else []
     
+    def post_media(self, event_id: int, file_path: str, media_type: str = 'photo',
+                   template_id: Optional[int] = None,
+                   on_progress: Optional[Callable[[int, int], None]] = None) -> httpx.Response:
+        """Upload a media file and return the server's response.
+        
+        The file is streamed from disk rather than read into memory;
+        on_progress(sent, total) is called as it goes out. Transport
+        errors are raised (httpx.HTTPError, OSError) so callers can retry.
+        """
+        total = os.path.getsize(file_path)
+        data = {'media_type': media_type}
+        if template_id:
+            data['template_id'] = template_id
+        
+        def on_read(position):
+            if on_progress is not None:
+                on_progress(position, total)
+        
+        with _ProgressFile(file_path, on_read) as f:
+            return self._request_with_refresh(
+                'POST',
+                f"{self.base_url}/events/{event_id}/media/",
+                content_type=None,
+                files={'file': (os.path.basename(file_path), f)},
+                data=data,
+            )
+    
+    def post_media_chunked(self, event_id: int, file_path: str, media_type: str = 'photo',
+                           template_id: Optional[int] = None,
+                           on_progress: Optional[Callable[[int, int], None]] = None,
+                           chunk_size: int = 1024 * 1024, upload_id: Optional[str] = None,
+                           on_committed: Optional[Callable[[str, int], None]] = None) -> httpx.Response:
+        """Upload a media file in fixed-size chunks, resuming where a previous attempt stopped.
+        
+        The server holds an upload session:
+        
+            POST  /events/<id>/media/uploads/        {filename, size, media_type, ...} -> {upload_id, offset}
+            GET   /events/<id>/media/uploads/<uid>/  -> {offset}
+            PUT   /events/<id>/media/uploads/<uid>/  one chunk, Content-Range: bytes a-b/size -> {offset}
+        
+        The offset in each answer is what the server has committed; the next
+        chunk starts there. Pass the upload_id of an interrupted upload to
+        continue it (a new session is opened if the server no longer knows
+        it). on_committed(upload_id, offset) is called after each
+        acknowledged chunk so the caller can persist it. Chunks are streamed
+        from disk, so memory use doesn't depend on the file or chunk size,
+        and the client timeout applies per chunk.
+        
+        Every acknowledged chunk must move the offset forward and never past
+        the file size; otherwise httpx.RemoteProtocolError is raised instead
+        of sending the same range again and again.
+        
+        Returns the response to the final chunk (the created media) or the
+        first response that wasn't a success; transport errors are raised.
+        """
+        total = os.path.getsize(file_path)
+        uploads_url = f"{self.base_url}/events/{event_id}/media/uploads/"
+        
+        offset = None
+        if upload_id:
+            response = self._request_with_refresh('GET', f"{uploads_url}{upload_id}/")
+            if response.status_code == 200:
+                offset = int(response.json().get('offset', 0))
+            elif response.status_code not in (404, 410):
+                return response
+        if offset is None:
+            data = {'filename': os.path.basename(file_path), 'size': total, 'media_type': media_type}
+            if template_id:
+                data['template_id'] = template_id
+            response = self._request_with_refresh('POST', uploads_url, json=data)
+            if response.status_code not in (200, 201):
+                return response
+            session = response.json()
+            upload_id = str(session['upload_id'])
+            offset = int(session.get('offset', 0))
+            if on_committed is not None:
+                on_committed(upload_id, offset)
+        if not 0 <= offset <= total:
+            raise httpx.RemoteProtocolError(f"Upload {upload_id}: server offset {offset} outside 0-{total}")
+
+        with open(file_path, 'rb') as f:
+            while True:
+                end = min(total, offset + chunk_size)
+                headers = {'Content-Length': str(end - offset)}
+                # No byte range can describe an empty file; it goes up as one PUT without one
+                if total:
+                    headers['Content-Range'] = f"bytes {offset}-{end - 1}/{total}"
+                response = self._request_with_refresh(
+                    'PUT',
+                    f"{uploads_url}{upload_id}/",
+                    content_type='application/octet-stream',
+                    headers=headers,
+                    content=_FileRange(f, offset, end - offset),
+                )
+                if response.status_code not in (200, 201):
+                    return response
+                committed = int(response.json().get('offset', end))
+                if committed > total or (committed <= offset < total):
+                    raise httpx.RemoteProtocolError(
+                        f"Upload {upload_id}: server offset {committed} after sending bytes "
+                        f"{offset}-{end - 1} of {total}")
+                offset = committed
+                if on_committed is not None:
+                    on_committed(upload_id, offset)
+                if on_progress is not None:
+                    on_progress(offset, total)
+                if offset >= total:
+                    return response
+    
     def upload_media(self, event_id: int, file_path: str, media_type: str = 'photo',
                      template_id: Optional[int] = None) -> bool:
         """Upload media file to the server"""
         try:
             if not os.path.exists(file_path):
                 return False
-                
-            with open(file_path, 'rb') as f:
-                files = {'file': f}
-                data = {'media_type': media_type}
-                if template_id:
-                    data['template_id'] = template_id
-
-                response = self._request_with_refresh(
-                    'POST',
-                    f"{self.base_url}/events/{event_id}/media/",
-                    files=files,
-                    data=data
-                )
-                return response.status_code in (200, 201)
+            
+            response = self.post_media(event_id, file_path, media_type, template_id)
+            return response.status_code in (200, 201)
         except Exception as e:
             print(f"Upload error: {str(e)}")
             return False
@@ -0,0 +1,224 @@
+import httpx
+import os
+from typing import Optional, Dict, List, Tuple
+
+from src.utils.api_client import APIClient
+
+
+class AsyncAPIClient:
+    """Asynchronous API client for SelfieBooth, for use from Flet async handlers.
+
+    Has the same methods as APIClient, as coroutines, so views can await
+    the backend without blocking the UI. Requests share one
+    httpx.AsyncClient with an explicit connection pool: idle connections
+    are kept alive for `keepalive_expiry` seconds and reused by concurrent
+    calls. With http2=True (needs the `h2` package, i.e. httpx[http2])
+    concurrent calls are multiplexed over a single connection; without h2
+    the client falls back to HTTP/1.1.
+
+    Login state lives in a blocking APIClient, available as `sync`, which
+    shares the same tokens. Code running on worker threads (e.g. the
+    upload queue) uses that one.
+
+    The pool is opened on the first request. aclose() closes it (on logout
+    and when the app exits); a later request opens a new one.
+    """
+
+    def __init__(self, base_url: str, http2: bool = False, max_connections: int = 10,
+                 max_keepalive_connections: int = 5, keepalive_expiry: float = 30.0,
+                 timeout: float = 30.0):
+        self.sync = APIClient(base_url)
+        if http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                print("HTTP/2 requested but the h2 package is not installed; using HTTP/1.1")
+                http2 = False
+        self.http2 = http2
+        self.timeout = httpx.Timeout(timeout, connect=10.0)
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self._client = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """The pooled httpx client, opened on first use"""
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=self.timeout, limits=self.limits, http2=self.http2)
+        return self._client
+
+    # Session state is shared with the blocking client
+    @property
+    def base_url(self) -> str:
+        return self.sync.base_url
+
+    @property
+    def access_token(self) -> Optional[str]:
+        return self.sync.access_token
+
+    @access_token.setter
+    def access_token(self, value: Optional[str]):
+        self.sync.access_token = value
+
+    @property
+    def refresh_token(self) -> Optional[str]:
+        return self.sync.refresh_token
+
+    @refresh_token.setter
+    def refresh_token(self, value: Optional[str]):
+        self.sync.refresh_token = value
+
+    @property
+    def user_data(self) -> Optional[Dict]:
+        return self.sync.user_data
+
+    @user_data.setter
+    def user_data(self, value: Optional[Dict]):
+        self.sync.user_data = value
+
+    def _get_headers(self, content_type: Optional[str] = 'application/json') -> Dict[str, str]:
+        return self.sync._get_headers(content_type)
+
+    async def aclose(self):
+        """Close pooled connections"""
+        client, self._client = self._client, None
+        if client is not None:
+            await client.aclose()
+
+    async def login(self, username: str, password: str) -> bool:
+        """Authenticate user and store tokens"""
+        try:
+            response = await self.client.post(
+                f"{self.base_url}/auth/jwt/create/",
+                json={'email': username, 'password': password}
+            )
+            if response.status_code == 200:
+                data = response.json()
+                self.access_token = data.get('access')
+                self.refresh_token = data.get('refresh')
+                await self._fetch_user_info()
+                return True
+            return False
+        except Exception as e:
+            print(f"Login error: {str(e)}")
+            return False
+
+    async def _fetch_user_info(self) -> bool:
+        """Fetch user information after login"""
+        try:
+            response = await self._request_with_refresh('GET', f"{self.base_url}/auth/users/me/")
+            if response.status_code == 200:
+                self.user_data = response.json()
+                return True
+            return False
+        except Exception:
+            return False
+
+    async def _refresh_access_token(self) -> bool:
+        """Refresh the access token using the refresh token"""
+        if not self.refresh_token:
+            return False
+        try:
+            response = await self.client.post(
+                f"{self.base_url}/auth/jwt/refresh/",
+                json={'refresh': self.refresh_token}
+            )
+            if response.status_code == 200:
+                self.access_token = response.json().get('access')
+                return True
+            return False
+        except Exception:
+            return False
+
+    async def _request_with_refresh(self, method, url, content_type='application/json', **kwargs):
+        """Make a request and refresh token if needed"""
+        kwargs.setdefault('headers', {}).update(self._get_headers(content_type))
+        response = await self.client.request(method, url, **kwargs)
+
+        if response.status_code == 401:
+            # Try to refresh the token and retry the request
+            if await self._refresh_access_token():
+                kwargs['headers'].update(self._get_headers(content_type))
+                response = await self.client.request(method, url, **kwargs)
+
+        return response
+
+    def logout(self):
+        """Clear authentication data"""
+        self.sync.logout()
+
+    async def get_events(self) -> List[Dict]:
+        """Get all events"""
+        response = await self._request_with_refresh('GET', f"{self.base_url}/events/")
+        return response.json() if response.status_code == 200 else []
+
+    async def get_events_paginated(self, page=1, page_size=10, tab=None, search=None) -> Tuple[List[Dict], int]:
+        """Get paginated events with filters"""
+        params = {'page': page, 'page_size': page_size}
+
+        if tab:
+            if tab == 'upcoming':
+                params['date_filter'] = 'gt'
+            elif tab == 'today':
+                params['date_filter'] = 'exact'
+            elif tab == 'past':
+                params['date_filter'] = 'lt'
+
+        if search:
+            params['search'] = search
+
+        response = await self._request_with_refresh('GET', f"{self.base_url}/events/", params=params)
+        if response.status_code == 200:
+            data = response.json()
+            return data.get('data', []), data.get('count', 0)
+        return [], 0
+
+    async def get_event(self, event_id: int) -> Optional[Dict]:
+        """Get details for a specific event"""
+        response = await self._request_with_refresh('GET', f"{self.base_url}/events/{event_id}/")
+        return response.json() if response.status_code == 200 else None
+
+    async def verify_event_pin(self, event_id: int, pin: str) -> bool:
+        """Verify an event's PIN code"""
+        response = await self._request_with_refresh(
+            'POST',
+            f"{self.base_url}/events/{event_id}/verify_pin/",
+            json={'pin': pin}
+        )
+        return response.status_code == 200
+
+    async def get_templates(self, event_id: Optional[int] = None) -> List[Dict]:
+        """Get templates, optionally filtered by event"""
+        url = f"{self.base_url}/templates/"
+        if event_id:
+            url = f"{self.base_url}/events/{event_id}/templates/"
+
+        response = await self._request_with_refresh('GET', url)
+        return response.json() if response.status_code == 200 else []
+
+    async def upload_media(self, event_id: int, file_path: str, media_type: str = 'photo',
+                           template_id: Optional[int] = None) -> bool:
+        """Upload media file to the server"""
+        try:
+            if not os.path.exists(file_path):
+                return False
+
+            data = {'media_type': media_type}
+            if template_id:
+                data['template_id'] = template_id
+            with open(file_path, 'rb') as f:
+                # Streamed from the open file, like the blocking client
+                response = await self._request_with_refresh(
+                    'POST',
+                    f"{self.base_url}/events/{event_id}/media/",
+                    content_type=None,
+                    files={'file': (os.path.basename(file_path), f)},
+                    data=data,
+                )
+            return response.status_code in (200, 201)
+        except Exception as e:
+            print(f"Upload error: {str(e)}")
+            return False
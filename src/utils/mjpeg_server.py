@@ -0,0 +1,190 @@
+import http.server
+import socketserver
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+
+class _ThreadingHTTPServer(socketserver.ThreadingMixIn, http.server.HTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class MjpegServer:
+    """Local HTTP endpoint that streams preview JPEGs as multipart MJPEG.
+
+    The preview pipeline publishes raw JPEG bytes here instead of pushing
+    base64 strings through the Flet control channel; an ft.Image pointed
+    at stream_url then receives frames as plain HTTP, 33% smaller and
+    outside the control protocol. Every connected client always gets the
+    newest frame (slow clients skip frames rather than queueing them).
+
+    The server binds to 127.0.0.1 by default, which covers the desktop app
+    and kiosk browsers on the same machine. Pass host="0.0.0.0" and a
+    public_host to serve browsers on other devices.
+
+    If on_sent is given it is called as on_sent(write_seconds, captured_at)
+    after each frame is written to a client, so the preview governor can
+    react to slow viewers the same way it reacts to slow page.update()s.
+    """
+
+    BOUNDARY = "selfieboothframe"
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0,
+                 public_host: Optional[str] = None,
+                 on_sent: Optional[Callable[[float, Optional[float]], None]] = None):
+        self.host = host
+        self.port = port
+        self.public_host = public_host
+        self.on_sent = on_sent
+
+        self._frame = None
+        self._frame_seq = 0
+        self._captured_at = None
+        self._new_frame = threading.Condition()
+        self._server = None
+        self._thread = None
+        self.is_running = False
+
+        self.frames_published = 0
+        # Client handlers run on their own threads and share these counters
+        self._counter_lock = threading.Lock()
+        self.frames_sent = 0
+        self.bytes_sent = 0
+        self.clients = 0
+
+    @property
+    def base_url(self) -> str:
+        host = self.public_host or ("127.0.0.1" if self.host in ("", "0.0.0.0") else self.host)
+        return f"http://{host}:{self.port}"
+
+    @property
+    def stream_url(self) -> str:
+        """URL of the multipart MJPEG stream."""
+        return f"{self.base_url}/stream.mjpg"
+
+    @property
+    def snapshot_url(self) -> str:
+        """URL that returns the newest frame as a single JPEG."""
+        return f"{self.base_url}/frame.jpg"
+
+    def start(self) -> str:
+        """Start serving in a background thread and return the stream URL."""
+        if self.is_running:
+            return self.stream_url
+        self._server = _ThreadingHTTPServer((self.host, self.port), self._make_handler())
+        self.port = self._server.server_address[1]
+        self.is_running = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name="mjpeg-server", daemon=True)
+        self._thread.start()
+        print(f"MJPEG preview server listening on {self.stream_url}")
+        return self.stream_url
+
+    def stop(self) -> None:
+        """Stop serving and disconnect clients."""
+        if not self.is_running:
+            return
+        self.is_running = False
+        with self._new_frame:
+            self._new_frame.notify_all()
+        self._server.shutdown()
+        self._server.server_close()
+        self._server = None
+        print(f"MJPEG preview server stopped: {self.stats()}")
+
+    def publish(self, jpeg: bytes, captured_at: Optional[float] = None) -> None:
+        """Make jpeg the current frame for all clients."""
+        with self._new_frame:
+            self._frame = jpeg
+            self._frame_seq += 1
+            self._captured_at = captured_at
+            self.frames_published += 1
+            self._new_frame.notify_all()
+
+    def wait_for_frame(self, after_seq: int, timeout: float = 1.0):
+        """Block until a frame newer than after_seq is published; returns (seq, jpeg, captured_at)."""
+        with self._new_frame:
+            if self._frame_seq <= after_seq and self.is_running:
+                self._new_frame.wait(timeout)
+            return self._frame_seq, self._frame, self._captured_at
+
+    def stats(self) -> Dict[str, int]:
+        """Publish/send counters."""
+        with self._counter_lock:
+            return {
+                "published": self.frames_published,
+                "sent": self.frames_sent,
+                "bytes_sent": self.bytes_sent,
+                "clients": self.clients,
+            }
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                # Keep per-request logging out of the app console
+                pass
+
+            def do_GET(self):
+                path = self.path.split("?")[0]
+                if path == "/stream.mjpg":
+                    self._stream()
+                elif path == "/frame.jpg":
+                    self._snapshot()
+                else:
+                    self.send_error(404)
+
+            def _send_common_headers(self):
+                self.send_header("Cache-Control", "no-cache, no-store, must-revalidate")
+                self.send_header("Pragma", "no-cache")
+                self.send_header("Access-Control-Allow-Origin", "*")
+
+            def _snapshot(self):
+                _, jpeg, _ = server.wait_for_frame(0, timeout=0)
+                if jpeg is None:
+                    self.send_error(503, "No frame yet")
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "image/jpeg")
+                self.send_header("Content-Length", str(len(jpeg)))
+                self._send_common_headers()
+                self.end_headers()
+                self.wfile.write(jpeg)
+
+            def _stream(self):
+                self.send_response(200)
+                self.send_header("Content-Type", f"multipart/x-mixed-replace; boundary={server.BOUNDARY}")
+                self._send_common_headers()
+                self.end_headers()
+                with server._counter_lock:
+                    server.clients += 1
+                last_seq = 0
+                try:
+                    while server.is_running:
+                        seq, jpeg, captured_at = server.wait_for_frame(last_seq)
+                        if jpeg is None or seq == last_seq:
+                            continue
+                        last_seq = seq
+                        started = time.monotonic()
+                        self.wfile.write(
+                            f"--{server.BOUNDARY}\r\n"
+                            f"Content-Type: image/jpeg\r\n"
+                            f"Content-Length: {len(jpeg)}\r\n\r\n".encode("ascii")
+                        )
+                        self.wfile.write(jpeg)
+                        self.wfile.write(b"\r\n")
+                        self.wfile.flush()
+                        with server._counter_lock:
+                            server.frames_sent += 1
+                            server.bytes_sent += len(jpeg)
+                        if server.on_sent is not None:
+                            server.on_sent(time.monotonic() - started, captured_at)
+                except (BrokenPipeError, ConnectionResetError):
+                    # Client went away (view closed or image source changed)
+                    pass
+                finally:
+                    with server._counter_lock:
+                        server.clients -= 1
+
+        return Handler
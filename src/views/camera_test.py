@@ -5,28 +5,97 @@ import os
 import base64
 import cv2
 import platform
-from src.utils.api_client import APIClient
+from src.utils.async_api_client import AsyncAPIClient
+from src.utils.mjpeg_server import MjpegServer
+from src.components.media_strip import MediaStrip
 from src.components.topbar import TopBar
-from src.controllers.camera_controller import CameraController
+from src.controllers.async_video_writer import AsyncVideoWriter
+from src.controllers.boomerang_builder import BoomerangBuilder
+from src.controllers.burst_capture import BurstCapture
+from src.controllers.camera_discovery import CameraDiscovery
+from src.controllers.frame_ring import FrameRing
+from src.controllers.gif_builder import GifBuilder
+from src.controllers.media_dedup import UploadDeduplicator
+from src.controllers.media_library import MediaLibrary
+from src.controllers.media_store import MediaStore
+from src.controllers.media_transcoder import MediaTranscoder
+from src.controllers.photo_saver import PhotoSaveQueue
+from src.controllers.preroll_buffer import PrerollBuffer
+from src.controllers.preview_governor import PreviewGovernor
+from src.controllers.preview_pipeline import PreviewPipeline
+from src.controllers.thumbnail_cache import ThumbnailCache
+from src.controllers.upload_queue import UploadQueue
 from src.utils.ios_permissions import IOSPermissions, is_ios, get_device_type
 
 class CameraTestView(ft.View):
-    def __init__(self, page: ft.Page, api_client: APIClient, event_id: str, mode: str = "photo"):
+    def __init__(self, page: ft.Page, api_client: AsyncAPIClient, event_id: str, mode: str = "photo",
+                 preview_transport: str = None, preroll_seconds: float = 1.5, upload_profile: str = "web",
+                 collapse_near_duplicates: bool = False, mjpeg_host: str = None, mjpeg_public_host: str = None):
         super().__init__()
         self.page = page
         self.api_client = api_client
         self.event_id = int(event_id)
         self.mode = mode
-        self.camera_controller = CameraController()
         self.is_initialized = False
         self.is_recording = False
         self.recording_timer = None
         self.recording_seconds = 0
-        self.captured_media = []
-        self._latest_frame_data = None
+        self.frame_ring = FrameRing()
+        self.burst = BurstCapture()
+        # Recordings start with the last moments before the button press
+        self.preroll = PrerollBuffer(seconds=preroll_seconds)
+        self.gif_builder = GifBuilder()
+        self.boomerang_builder = BoomerangBuilder()
+        self.photo_saver = PhotoSaveQueue()
+        self._shutter_lock = threading.Lock()
+        self._output_dir = None  # Resolved on first use
+        # Captures are filed per event and indexed in SQLite
+        self.media_library = MediaLibrary(self._media_output_dir())
+        self.media_store = MediaStore(self.media_library, self.event_id)
+        # Copies (and, if enabled, near-identical shots) are not uploaded twice
+        self.deduplicator = UploadDeduplicator(self.media_library, collapse_near=collapse_near_duplicates)
+        # Uploads get a smaller, web-friendly copy; the originals stay in the library
+        self.transcoder = MediaTranscoder(
+            os.path.join(self.media_library.root, "transcoded", f"event_{self.event_id}"),
+            profile=upload_profile,
+        )
+        # Captures upload in the background; the journal survives restarts.
+        # Its worker threads use the blocking client, which shares the login
+        self.upload_queue = UploadQueue(
+            getattr(api_client, "sync", api_client),
+            os.path.join(self.media_library.root, "uploads.db"),
+            on_progress=self._on_upload_progress,
+            on_finished=self._on_upload_finished,
+        )
+        self.thumbnail_cache = ThumbnailCache()
+        self.preview_pipeline = None
+        # "base64" pushes frames through the Flet control channel; "mjpeg"
+        # streams them over an HTTP endpoint, which is much cheaper in web mode
+        # but only works if the browser can reach it (see _choose_preview_transport)
+        self.mjpeg_public_host = mjpeg_public_host
+        self.mjpeg_host = mjpeg_host or ("0.0.0.0" if mjpeg_public_host else "127.0.0.1")
+        self.preview_transport = self._choose_preview_transport(preview_transport)
+        self.mjpeg_server = None
         self._preview_timer = None
         self.build()
     
+    def _choose_preview_transport(self, requested):
+        """Pick the preview transport and log why"""
+        if requested:
+            transport, reason = requested, "requested"
+        elif not getattr(self.page, "web", False):
+            transport, reason = "base64", "desktop app"
+        elif not self.mjpeg_public_host:
+            # A stream on 127.0.0.1 is unreachable from browsers on other devices
+            transport, reason = "base64", "no public MJPEG host configured"
+        elif str(getattr(self.page, "url", "") or "").startswith("https:"):
+            # Browsers block a plain http stream inside an https page
+            transport, reason = "base64", "page is served over HTTPS"
+        else:
+            transport, reason = "mjpeg", f"streaming from {self.mjpeg_public_host}"
+        print(f"Preview transport: {transport} ({reason})")
+        return transport
+    
     def build(self):
         """Build the camera test view UI"""
         self.route = f"/camera_test/{self.event_id}"
@@ -82,8 +151,8 @@ class CameraTestView(ft.View):
         )
         
         self.video_button = ft.ElevatedButton(
-            "Record Video",
-            icon=ft.Icons.VIDEOCAM,
+            {"gif": "Create GIF", "boomerang": "Create Boomerang"}.get(self.mode, "Record Video"),
+            icon={"gif": ft.Icons.GIF, "boomerang": ft.Icons.REPEAT}.get(self.mode, ft.Icons.VIDEOCAM),
             on_click=self.toggle_recording,
             disabled=True,  # Initially disabled until camera is ready
             style=ft.ButtonStyle(
@@ -111,17 +180,30 @@ class CameraTestView(ft.View):
             color="white",
         )
         
-        self.thumbnails_row = ft.Row(
-            scroll=ft.ScrollMode.AUTO,
-            height=120,
+        self.upload_text = ft.Text(
+            "",
+            size=14,
+            color="#a1a1aa",
+        )
+        
+        # A fixed window of thumbnails; older media is paged in from the store.
+        # In web mode the thumbnails go out as one sprite sheet per update
+        self.media_strip = MediaStrip(
+            self.media_store,
+            self.thumbnail_cache,
+            on_select=lambda item: self._preview_media(item.path),
+            sprite_sheet=getattr(self.page, "web", False),
+            width=780,  # Inside the 800 px container's padding
         )
+        # Show what this event already has on disk
+        self.media_strip.refresh()
         
         self.thumbnails_container = ft.Container(
             content=ft.Column(
                 [
-                    self.thumbnails_label,
+                    ft.Row([self.thumbnails_label, self.upload_text], spacing=20),
                     ft.Container(
-                        content=self.thumbnails_row,
+                        content=self.media_strip,
                         height=150,
                         width=800,
                         bgcolor="#232323",
@@ -164,6 +246,9 @@ class CameraTestView(ft.View):
         """Called when the view is mounted"""
         print("CameraTestView mounted, checking permissions...")
         
+        # Resume uploads left over from earlier sessions
+        self.upload_queue.start()
+        
         # Update status
         self.status_text.value = "Checking permissions..."
         self.page.update(self.status_text)
@@ -249,50 +334,6 @@ class CameraTestView(ft.View):
         # Request all permissions (camera, microphone, photo library)
         IOSPermissions.request_all_permissions(on_permissions_result)
         
-    def _initialize_camera(self):
-        """Initialize camera in background thread"""
-        try:
-            # Update status
-            def update_status(message, success=None):
-                self.status_text.value = message
-                if success is not None:
-                    self.status_text.color = "green" if success else "red"
-                self.page.update(self.status_text)
-            
-            update_status("Initializing camera...", None)
-            
-            # Initialize camera controller
-            if self.camera_controller.initialize():
-                update_status("Camera initialized successfully", True)
-                self.is_initialized = True
-                
-                # Enable camera controls
-                self.capture_button.disabled = False
-                self.video_button.disabled = False
-                self.page.update(self.capture_button)
-                self.page.update(self.video_button)
-                
-                # Start frame capture thread
-                thread = threading.Thread(target=self._update_preview, daemon=True)
-                thread.daemon = True  # Ensure thread dies with main process
-                thread.start()
-                
-                # Set up timer to regularly update UI with latest frame
-                self._setup_preview_timer()
-                
-                update_status("Camera ready", True)
-            else:
-                update_status("Failed to initialize camera", False)
-        except Exception as e:
-            print(f"Error initializing camera: {e}")
-            import traceback
-            traceback.print_exc()
-            
-            # Update UI with error message
-            self.status_text.value = f"Camera error: {str(e)}"
-            self.status_text.color = "red"
-            self.page.update(self.status_text)
-    
     def will_unmount(self):
         """Called when the view is about to be unmounted"""
         # Release camera resources
@@ -304,8 +345,28 @@ class CameraTestView(ft.View):
             self._preview_timer.cancel()
             self._preview_timer = None
         
-        if self.camera_controller:
-            self.camera_controller.release()
+        # Stop the preview pipeline, which also releases the camera. Taking
+        # the shutter lock lets a burst in progress hand its photo to the
+        # saver first; later presses find no pipeline
+        with self._shutter_lock:
+            pipeline, self.preview_pipeline = self.preview_pipeline, None
+        if pipeline is not None:
+            pipeline.stop()
+        
+        if self.mjpeg_server is not None:
+            self.mjpeg_server.stop()
+            self.mjpeg_server = None
+        
+        # Finish writing any photos still in the save queue
+        self.photo_saver.close()
+        self.thumbnail_cache.close()
+        # Queued transcodes still hand their output to the upload queue.
+        # Unfinished uploads stay journaled and resume on the next start
+        self.transcoder.close()
+        print(f"Upload transcodes: {self.transcoder.stats()}")
+        self.upload_queue.close()
+        # Last, since saver, transcoder and upload callbacks all record to it
+        self.media_library.close()
         
         self.is_initialized = False
     
@@ -324,88 +385,16 @@ class CameraTestView(ft.View):
         try:
             print("Starting direct camera access...")
             
-            # List all possible camera indices
-            print("Checking for available cameras...")
-            
-            # Try different camera APIs in this preferred order
-            backends = [
-                cv2.CAP_ANY,      # Auto-detect
-                cv2.CAP_V4L2,     # Video4Linux - common on Linux
-                cv2.CAP_DSHOW,    # DirectShow - Windows
-                cv2.CAP_MSMF,     # Media Foundation - Windows
-                cv2.CAP_AVFOUNDATION  # AVFoundation - macOS
-            ]
-            
-            camera = None
-            camera_found = False
-            
-            # Try camera indices 0-4 with different backends
-            for backend in backends:
-                for cam_id in range(5):  # Try camera IDs 0 through 4
-                    try:
-                        print(f"Trying camera ID {cam_id} with backend {backend}...")
-                        camera = cv2.VideoCapture(cam_id, backend)
-                        
-                        if camera.isOpened():
-                            # Try to read a test frame to confirm it works
-                            ret, test_frame = camera.read()
-                            if ret and test_frame is not None:
-                                print(f"Successfully opened camera with ID {cam_id} using backend {backend}")
-                                camera_found = True
-                                break
-                            else:
-                                print(f"Camera {cam_id} opened but could not read frames")
-                                camera.release()
-                        else:
-                            print(f"Could not open camera {cam_id}")
-                            if camera is not None:
-                                camera.release()
-                    except Exception as e:
-                        print(f"Error with camera {cam_id}, backend {backend}: {e}")
-                        if camera is not None:
-                            camera.release()
-                
-                if camera_found:
-                    break
-            
-            if not camera_found or not camera.isOpened():
-                # Try one more approach - system-specific device paths
-                try:
-                    print("Trying direct device access...")
-                    # Check for system cameras
-                    import subprocess
-                    result = subprocess.run(['ls', '-l', '/dev/video*'], capture_output=True, text=True)
-                    print(f"Available video devices:\n{result.stdout}")
-                    
-                    # Try the first available video device
-                    if 'video' in result.stdout:
-                        for line in result.stdout.split('\n'):
-                            if 'video' in line:
-                                device = line.split()[-1]
-                                print(f"Trying direct access to {device}")
-                                camera = cv2.VideoCapture(device)
-                                if camera.isOpened():
-                                    ret, test_frame = camera.read()
-                                    if ret and test_frame is not None:
-                                        print(f"Successfully opened camera with device {device}")
-                                        camera_found = True
-                                        break
-                                    else:
-                                        camera.release()
-                except Exception as e:
-                    print(f"Error with direct device access: {e}")
+            # Open the last known-good camera, or probe all devices in parallel
+            camera, camera_info = CameraDiscovery(width=640, height=480, passthrough=True).open()
             
-            if not camera_found or not camera.isOpened():
+            if camera is None:
                 error_msg = "Could not access any camera after trying multiple methods. Please check camera connections and permissions."
                 print(error_msg)
                 self.status_text.value = f"Error: {error_msg}"
                 self.status_text.color = "red"
                 self.page.update(self.status_text)
                 return
-                
-            # Set camera properties
-            camera.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-            camera.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
             
             # Get actual properties
             width = camera.get(cv2.CAP_PROP_FRAME_WIDTH)
@@ -428,45 +417,25 @@ class CameraTestView(ft.View):
             # Set initialized flag
             self.is_initialized = True
             
-            # Main capture loop - this is the key part from the working debug app
-            frame_count = 0
-            while self.is_initialized:
-                # Capture frame from real camera
-                ret, frame = camera.read()
-                
-                if not ret or frame is None:
-                    print("Failed to capture frame")
-                    time.sleep(0.1)
-                    continue
-                
-                frame_count += 1
-                
-                # Convert to JPEG and then to base64 - exactly as in debug app
-                _, buffer = cv2.imencode('.jpg', frame)
-                img_bytes = buffer.tobytes()
-                img_base64 = base64.b64encode(img_bytes).decode('utf-8')
-                
-                # Update the UI directly - key part from debug app
-                self.camera_preview.src_base64 = img_base64
+            # Hand the camera to the staged preview pipeline: capture, encode,
+            # UI push and recording each run on their own worker
+            # The governor trades preview fps, size and JPEG quality against
+            # how long page.update() takes; it never goes wider than the preview box
+            governor = PreviewGovernor(max_width=int(self.camera_preview.width))
+            if self.preview_transport == "mjpeg":
+                # Point the image at the local MJPEG stream once; frames then
+                # bypass page.update() entirely
+                self.mjpeg_server = MjpegServer(host=self.mjpeg_host, public_host=self.mjpeg_public_host,
+                                                on_sent=governor.record_push)
+                self.camera_preview.src = self.mjpeg_server.start()
+                self.camera_preview.src_base64 = None
                 self.page.update(self.camera_preview)
-                
-                # Store for potential photo capture
-                self.latest_frame = frame.copy()
-                
-                # Write frame to video if recording
-                if self.is_recording and hasattr(self, 'video_writer') and self.video_writer is not None:
-                    try:
-                        self.video_writer.write(frame)
-                    except Exception as e:
-                        print(f"Error writing video frame: {e}")
-                        # Don't crash the preview thread on video writing errors
-                
-                # Log progress occasionally
-                if frame_count % 30 == 0:
-                    print(f"Camera frame #{frame_count} successfully displayed")
-                
-                # Control frame rate
-                time.sleep(0.03)  # ~33 FPS
+                self.preview_pipeline = PreviewPipeline(camera, self.frame_ring, self.mjpeg_server.publish,
+                                                        governor, push_feedback=False, preroll=self.preroll)
+            else:
+                self.preview_pipeline = PreviewPipeline(camera, self.frame_ring, self._push_preview, governor,
+                                                        preroll=self.preroll)
+            self.preview_pipeline.start()
                 
         except Exception as e:
             print(f"Camera error: {e}")
@@ -479,160 +448,126 @@ class CameraTestView(ft.View):
             self.page.update(self.status_text)
             
         finally:
-            # Clean up
-            if camera is not None:
-                camera.release()
-                print("Camera released")
-            
-            self.is_initialized = False
-    
-    def _update_preview_with_controller(self):
-        """Fallback method using camera controller"""
-        frame_count = 0
-        print("Starting camera preview using controller...")
-        
-        while self.is_initialized:
-            try:
-                frame = self.camera_controller.get_preview_frame()
+            # Clean up unless the pipeline took ownership of the camera
+            if self.preview_pipeline is None or not self.preview_pipeline.is_running:
+                if camera is not None:
+                    camera.release()
+                    print("Camera released")
                 
-                if frame is not None:
-                    frame_count += 1
-                    
-                    # Encode frame
-                    _, buffer = cv2.imencode('.jpg', frame, [int(cv2.IMWRITE_JPEG_QUALITY), 85])
-                    img_base64 = base64.b64encode(buffer.tobytes()).decode('utf-8')
-                    
-                    # Update UI
-                    self.camera_preview.src_base64 = img_base64
-                    self.page.update(self.camera_preview)
-                    
-                    if frame_count % 30 == 0:
-                        print(f"Controller frame #{frame_count} displayed")
-                else:
-                    print("No frame from controller")
-                    time.sleep(0.1)
-                
-                # Control frame rate
-                time.sleep(0.04)
-            except Exception as e:
-                print(f"Controller preview error: {e}")
-                import traceback
-                traceback.print_exc()
-                time.sleep(0.1)
+                self.is_initialized = False
+    
+    def _push_preview(self, jpeg, captured_at=None):
+        """Show an encoded preview frame (called from the pipeline's UI stage)"""
+        self.camera_preview.src_base64 = base64.b64encode(jpeg).decode('utf-8')
+        self.page.update(self.camera_preview)
     
     def capture_photo(self, e=None):
-        """Capture a photo and add to thumbnails"""
-        if not self.is_initialized or not hasattr(self, 'latest_frame'):
+        """Capture a photo and add to thumbnails once it is saved"""
+        if not self.is_initialized or self.preview_pipeline is None or not self.preview_pipeline.has_frame():
             print("Camera not initialized or no frame available")
             return
         
         # Flash effect
         self._flash_effect()
         
+        # The burst and the save both happen off the click handler, so the
+        # shutter can be pressed again right away
+        threading.Thread(target=self._shoot_photo, daemon=True).start()
+    
+    def _shoot_photo(self):
+        """Take a burst, keep the sharpest frame and queue it for saving"""
         try:
-            # Use the latest frame directly
-            if self.latest_frame is not None:
-                # Create output directory if it doesn't exist
-                import os
-                import platform
-                
-                # On iOS simulator, we need to use a different directory structure
-                is_ios = platform.system() == "Darwin" and (os.path.exists("/var/mobile") or "/CoreSimulator/" in os.getcwd())
-                
-                if is_ios:
-                    # Use the app's Documents directory for iOS
-                    if "/CoreSimulator/" in os.getcwd():
-                        # For simulator
-                        output_dir = os.path.join(os.getcwd(), "Documents", "SelfieBooth_Media")
-                    else:
-                        # For real device
-                        output_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Documents", "SelfieBooth_Media")
-                    print(f"iOS media storage path: {output_dir}")
-                else:
-                    # Standard path for desktop
-                    output_dir = os.path.join(os.path.expanduser("~"), "SelfieBooth_Media")
-                
-                # Create the directory with appropriate permissions
-                try:
-                    os.makedirs(output_dir, exist_ok=True)
-                    print(f"Created/verified media directory: {output_dir}")
-                except Exception as e:
-                    print(f"Warning: Could not create media directory: {e}")
-                    # Fall back to temporary directory
-                    import tempfile
-                    output_dir = os.path.join(tempfile.gettempdir(), "SelfieBooth_Media")
-                    os.makedirs(output_dir, exist_ok=True)
-                    print(f"Using fallback media directory: {output_dir}")
-                    
-                # Create filename with timestamp
-                import datetime
-                timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-                filepath = os.path.join(output_dir, f"photo_{timestamp}.jpg")
-                
-                # Save the photo
-                cv2.imwrite(filepath, self.latest_frame)
-                print(f"Photo saved to {filepath}")
-                
-                # Add thumbnail
-                self._add_thumbnail(filepath, "photo")
-            else:
-                print("No frame available for capture")
+            # Rapid presses take their bursts one after another
+            with self._shutter_lock:
+                if self.preview_pipeline is None:
+                    return  # The view is closing
+                snapshot = self.preview_pipeline.capture_burst(self.burst)
+                print(f"Burst capture: {self.burst.stats()}")
+                if snapshot is None:
+                    print("No frame available for capture")
+                    return
+                
+                filepath = self.media_library.new_path(self.event_id, "photo", ".jpg")
+                self.photo_saver.save(snapshot.frame, filepath, self._on_photo_saved)
         except Exception as e:
             print(f"Error capturing photo: {e}")
             import traceback
             traceback.print_exc()
+    
+    def _on_photo_saved(self, filepath, error):
+        """Called by the save queue once a photo is on disk (or failed)"""
+        if error is not None:
+            self.status_text.value = f"Failed to save photo: {error}"
+            self.status_text.color = "red"
+            self.page.update(self.status_text)
+            return
+        print(f"Photo saved to {filepath}")
+        self._add_thumbnail(filepath, "photo")
+    
+    def _media_output_dir(self):
+        """Directory captured media is saved to, created on first use"""
+        if self._output_dir is not None:
+            return self._output_dir
+        
+        # On iOS simulator, we need to use a different directory structure
+        is_ios = platform.system() == "Darwin" and (os.path.exists("/var/mobile") or "/CoreSimulator/" in os.getcwd())
+        
+        if is_ios:
+            # Use the app's Documents directory for iOS
+            if "/CoreSimulator/" in os.getcwd():
+                # For simulator
+                output_dir = os.path.join(os.getcwd(), "Documents", "SelfieBooth_Media")
+            else:
+                # For real device
+                output_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Documents", "SelfieBooth_Media")
+            print(f"iOS media storage path: {output_dir}")
+        else:
+            # Standard path for desktop
+            output_dir = os.path.join(os.path.expanduser("~"), "SelfieBooth_Media")
+        
+        # Create the directory with appropriate permissions
+        try:
+            os.makedirs(output_dir, exist_ok=True)
+            print(f"Created/verified media directory: {output_dir}")
+        except Exception as e:
+            print(f"Warning: Could not create media directory: {e}")
+            # Fall back to temporary directory
+            import tempfile
+            output_dir = os.path.join(tempfile.gettempdir(), "SelfieBooth_Media")
+            os.makedirs(output_dir, exist_ok=True)
+            print(f"Using fallback media directory: {output_dir}")
+        self._output_dir = output_dir
+        return output_dir
+    
     def toggle_recording(self, e=None):
         """Start or stop video recording using direct camera access"""
-        import os, datetime  # Import needed modules at the method level
-        
-        if not self.is_initialized or not hasattr(self, 'latest_frame'):
+        if not self.is_initialized or self.preview_pipeline is None or not self.preview_pipeline.has_frame():
             print("Camera not initialized or no frame available")
             return
         
+        if self.mode == "gif":
+            # GIFs are built from sampled frames rather than recorded
+            if not self.is_recording:
+                threading.Thread(target=self._create_gif, daemon=True).start()
+            return
+        
+        if self.mode == "boomerang":
+            # Boomerangs are a fixed-length clip played forward and back
+            if not self.is_recording:
+                threading.Thread(target=self._create_boomerang, daemon=True).start()
+            return
+        
         if not self.is_recording:
             try:
-                # Create output directory if it doesn't exist
-                import platform
-                
-                # On iOS simulator, we need to use a different directory structure
-                is_ios = platform.system() == "Darwin" and (os.path.exists("/var/mobile") or "/CoreSimulator/" in os.getcwd())
+                self.output_path = self.media_library.new_path(self.event_id, "video", ".mp4")
                 
-                if is_ios:
-                    # Use the app's Documents directory for iOS
-                    if "/CoreSimulator/" in os.getcwd():
-                        # For simulator
-                        output_dir = os.path.join(os.getcwd(), "Documents", "SelfieBooth_Media")
-                    else:
-                        # For real device
-                        output_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Documents", "SelfieBooth_Media")
-                    print(f"iOS media storage path: {output_dir}")
-                else:
-                    # Standard path for desktop
-                    output_dir = os.path.join(os.path.expanduser("~"), "SelfieBooth_Media")
-                
-                # Create the directory with appropriate permissions
-                try:
-                    os.makedirs(output_dir, exist_ok=True)
-                    print(f"Created/verified media directory: {output_dir}")
-                except Exception as e:
-                    print(f"Warning: Could not create media directory: {e}")
-                    # Fall back to temporary directory
-                    import tempfile
-                    output_dir = os.path.join(tempfile.gettempdir(), "SelfieBooth_Media")
-                    os.makedirs(output_dir, exist_ok=True)
-                    print(f"Using fallback media directory: {output_dir}")
-                
-                # Create filename with timestamp
-                timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-                self.output_path = os.path.join(output_dir, f"video_{timestamp}.mp4")
-                
-                # Initialize video writer
+                # Initialize video writer; it encodes on its own thread
                 fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-                self.video_writer = cv2.VideoWriter(
+                self.video_writer = AsyncVideoWriter(
                     self.output_path,
                     fourcc,
                     30.0,  # FPS
-                    (self.latest_frame.shape[1], self.latest_frame.shape[0])
+                    self.preview_pipeline.frame_size()
                 )
                 
                 if not self.video_writer.isOpened():
@@ -640,6 +575,8 @@ class CameraTestView(ft.View):
                 
                 print(f"Started recording video to {self.output_path}")
                 self.is_recording = True
+                if self.preview_pipeline is not None:
+                    self.preview_pipeline.set_video_writer(self.video_writer)
                 self.recording_start_time = time.time()
                 self.video_button.text = "Stop Recording"
                 self.video_button.bgcolor = "#7f1d1d"
@@ -649,11 +586,6 @@ class CameraTestView(ft.View):
                 self.recording_seconds = 0
                 self._start_recording_timer()
                 
-                # Auto-stop after 5 seconds for special modes
-                if self.mode == "gif" or self.mode == "boomerang":
-                    max_seconds = 3 if self.mode == "boomerang" else 5
-                    threading.Timer(max_seconds, self.toggle_recording).start()
-                
                 self.status_text.value = "Recording started"
             except Exception as e:
                 print(f"Error starting recording: {e}")
@@ -668,9 +600,19 @@ class CameraTestView(ft.View):
                 
                 # Stop recording
                 if hasattr(self, 'video_writer') and self.video_writer is not None:
+                    # Detach from the recorder stage (which hands over any frames
+                    # still in flight), then let the writer drain and release
+                    if self.preview_pipeline is not None:
+                        self.preview_pipeline.set_video_writer(None)
                     self.video_writer.release()
+                    clip = self.video_writer.stats()
+                    # The clip length follows capture timestamps (including
+                    # the pre-roll), so report that rather than button time
+                    duration = self.video_writer.duration or duration
                     self.video_writer = None
-                    print(f"Video recording stopped after {duration:.1f}s")
+                    print(f"Video recording stopped after {duration:.1f}s "
+                          f"({clip['achieved_fps']} fps captured, {clip['duplicated']} duplicated, "
+                          f"{clip['skipped'] + clip['dropped']} dropped)")
                     
                     # Reset UI
                     self.is_recording = False
@@ -680,7 +622,9 @@ class CameraTestView(ft.View):
                     
                     # Add thumbnail
                     if hasattr(self, 'output_path') and os.path.exists(self.output_path):
-                        self._add_thumbnail(self.output_path, "video")
+                        # Indexing hashes the whole clip, so keep it off the UI thread
+                        threading.Thread(target=self._add_thumbnail, args=(self.output_path, "video"),
+                                         daemon=True).start()
                         self.status_text.value = f"Video recorded ({duration:.1f}s)"
                     else:
                         self.status_text.value = "Video saved but file not found"
@@ -698,6 +642,111 @@ class CameraTestView(ft.View):
         
         self.update()
     
+    def _create_gif(self):
+        """Sample frames for a GIF, encode it in a worker process and show it before saving"""
+        self.is_recording = True
+        self.video_button.disabled = True
+        self.capture_button.disabled = True
+        self.update()
+        try:
+            def get_frame():
+                snapshot = self.preview_pipeline.snapshot()
+                return snapshot.frame if snapshot is not None else None
+            
+            def on_progress(captured, total):
+                self.status_text.value = f"Capturing GIF: {captured}/{total}"
+                self.page.update(self.status_text)
+            
+            if self.gif_builder.capture(get_frame, on_progress) == 0:
+                self.status_text.value = "No frames captured for GIF"
+                return
+            
+            self.status_text.value = "Building GIF..."
+            self.page.update(self.status_text)
+            started = time.monotonic()
+            data = self.gif_builder.encode().result()
+            print(f"GIF encoded in {time.monotonic() - started:.2f}s ({len(data) / 1024:.0f} KB)")
+            
+            # Show the animation straight from memory, then write the file
+            self._show_gif_preview(data)
+            filepath = self.gif_builder.save(data, self.media_library.new_path(self.event_id, "gif", ".gif"))
+            print(f"GIF saved to {filepath}")
+            self._add_thumbnail(filepath, "gif")
+            self.status_text.value = "GIF created"
+        except Exception as e:
+            print(f"Error creating GIF: {e}")
+            import traceback
+            traceback.print_exc()
+            self.status_text.value = f"Failed to create GIF: {str(e)}"
+            self.status_text.color = "red"
+        finally:
+            self.is_recording = False
+            self.video_button.disabled = False
+            self.capture_button.disabled = False
+            self.update()
+    
+    def _create_boomerang(self):
+        """Capture a short clip and write it as a forward-and-reverse loop"""
+        self.is_recording = True
+        self.video_button.disabled = True
+        self.capture_button.disabled = True
+        self.update()
+        try:
+            def get_frame():
+                snapshot = self.preview_pipeline.snapshot()
+                return snapshot.frame if snapshot is not None else None
+            
+            def on_progress(captured, total):
+                self.status_text.value = f"Capturing boomerang: {captured}/{total}"
+                self.page.update(self.status_text)
+            
+            if self.boomerang_builder.capture(get_frame, on_progress) == 0:
+                self.status_text.value = "No frames captured for boomerang"
+                return
+            print(f"Boomerang clip: {self.boomerang_builder.stats()}")
+            
+            self.status_text.value = "Building boomerang..."
+            self.page.update(self.status_text)
+            filepath = self.media_library.new_path(self.event_id, "boomerang", ".mp4")
+            written = self.boomerang_builder.write(filepath)
+            print(f"Boomerang saved to {filepath} ({written} frames)")
+            self._add_thumbnail(filepath, "boomerang")
+            self.status_text.value = "Boomerang created"
+        except Exception as e:
+            print(f"Error creating boomerang: {e}")
+            import traceback
+            traceback.print_exc()
+            self.status_text.value = f"Failed to create boomerang: {str(e)}"
+            self.status_text.color = "red"
+        finally:
+            # Drop the clip (and its scratch file) until the next boomerang
+            self.boomerang_builder.release()
+            self.is_recording = False
+            self.video_button.disabled = False
+            self.capture_button.disabled = False
+            self.update()
+    
+    def _show_gif_preview(self, data):
+        """Play a freshly built GIF over the live preview for a few loops"""
+        gif_preview = ft.Image(
+            src_base64=base64.b64encode(data).decode('utf-8'),
+            width=640,
+            height=480,
+            fit=ft.ImageFit.CONTAIN,
+            border_radius=10,
+        )
+        self.preview_container.content = ft.Stack([
+            self.camera_preview,
+            gif_preview,
+        ])
+        self.update()
+        
+        def remove_preview():
+            self.preview_container.content = self.camera_preview
+            self.update()
+        
+        threading.Timer(self.gif_builder.duration * 2, remove_preview).start()
+    
     def _start_recording_timer(self):
         """Update recording timer display"""
         if not self.is_recording:
@@ -736,30 +785,62 @@ class CameraTestView(ft.View):
         threading.Timer(0.1, remove_flash).start()
     
     def _add_thumbnail(self, filepath, media_type):
-        """Add a thumbnail for captured media"""
+        """Index captured media and add it to the front of the media strip"""
         try:
-            # Create thumbnail container
-            thumbnail = ft.Container(
-                content=ft.Image(
-                    src=filepath,
-                    width=120,
-                    height=120,
-                    fit=ft.ImageFit.COVER,
-                    border_radius=5,
-                ),
-                width=120,
-                height=120,
-                border_radius=5,
-                on_click=lambda e, path=filepath: self._preview_media(path),
-                tooltip=f"{media_type.capitalize()}: {os.path.basename(filepath)}",
-            )
-            
-            # Add to thumbnails row
-            self.thumbnails_row.controls.insert(0, thumbnail)
-            self.update()
+            item = self.media_store.add(filepath, media_type)
+            # Thumbnails (posters for videos) are generated in the background
+            self.media_strip.item_added()
+            duplicate = self.deduplicator.find(item)
+            if duplicate is not None:
+                print(f"Not uploading {os.path.basename(filepath)}: duplicate of {os.path.basename(duplicate.path)}")
+                self.media_library.set_upload_status(item.id, "duplicate")
+                return
+            # Re-encode for upload in a worker process, then queue the result
+            self.media_library.set_upload_status(item.id, "processing")
+            self.transcoder.submit(filepath, on_done=lambda result: self._queue_upload(item, result))
         except Exception as e:
             print(f"Error adding thumbnail: {e}")
     
+    def _queue_upload(self, item, result):
+        """Queue the transcoded file (or the original) for upload"""
+        job_id = self.upload_queue.enqueue(result.output, self.event_id, item.media_type, media_id=item.id,
+                                           content_hash=item.sha256)
+        job = self.upload_queue.job(job_id)
+        if job is not None and job.media_id != item.id:
+            # Same content is already queued or uploaded for another item
+            self.media_library.set_upload_status(item.id, "duplicate")
+            if result.output != result.source and os.path.exists(result.output):
+                os.remove(result.output)
+            return
+        self.media_library.set_upload_status(item.id, "queued")
+    
+    def _on_upload_progress(self, progress):
+        """Show the progress of the upload in flight (called from upload workers)"""
+        percent = progress.sent * 100 // progress.total if progress.total else 100
+        self.upload_text.value = (f"Uploading {os.path.basename(progress.job.path)}: {percent}% "
+                                  f"({progress.bytes_per_second / 1024:.0f} KB/s)")
+        if self.upload_text.page:
+            self.upload_text.update()
+    
+    def _on_upload_finished(self, job):
+        """Record the upload result in the library (called from upload workers)"""
+        try:
+            if job.media_id is not None:
+                self.media_library.set_upload_status(job.media_id, "uploaded" if job.status == "done" else "failed")
+            if (job.status == "done" and job.path.startswith(self.transcoder.output_dir)
+                    and os.path.exists(job.path)):
+                # The upload copy is no longer needed once the server has it; a failed
+                # job keeps it so retry_failed() can send it again
+                os.remove(job.path)
+            pending = self.upload_queue.pending()
+            self.upload_text.value = f"{pending} upload(s) pending" if pending else "All media uploaded"
+            if job.status == "failed":
+                self.upload_text.value += f" ({os.path.basename(job.path)} failed)"
+            if self.upload_text.page:
+                self.upload_text.update()
+        except Exception as e:
+            print(f"Error recording upload: {e}")
+    
     def _preview_media(self, filepath):
         """Show a larger preview of the selected media"""
         # This would be implemented with more time
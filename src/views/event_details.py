@@ -1,10 +1,10 @@
 import flet as ft
-from src.utils.api_client import APIClient
+from src.utils.async_api_client import AsyncAPIClient
 from src.components.topbar import TopBar
 from datetime import datetime
 
 class EventDetailsView(ft.View):
-    def __init__(self, page: ft.Page, api_client: APIClient, event_id: str):
+    def __init__(self, page: ft.Page, api_client: AsyncAPIClient, event_id: str):
         super().__init__()
         self.page = page
         self.api_client = api_client
@@ -146,13 +146,17 @@ class EventDetailsView(ft.View):
         """Called when the view is mounted"""
         # Schedule loading event to happen after the view is mounted
         self.page.update()
-        # Load event details
-        self.load_event()
+        # Load event details without blocking the UI
+        self.page.run_task(self.load_event)
     
-    def load_event(self):
+    async def load_event(self):
         """Load event details from API"""
         # Fetch event details
-        self.event = self.api_client.get_event(self.event_id)
+        try:
+            self.event = await self.api_client.get_event(self.event_id)
+        except Exception as e:
+            print(f"Error loading event {self.event_id}: {e}")
+            self.event = None
         
         if self.event:
             # Update UI with event details
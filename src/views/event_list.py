@@ -1,11 +1,11 @@
 import flet as ft
-from src.utils.api_client import APIClient
+from src.utils.async_api_client import AsyncAPIClient
 from src.components.topbar import TopBar
 from datetime import datetime
 from typing import List, Dict
 
 class EventListView(ft.View):
-    def __init__(self, page: ft.Page, api_client: APIClient):
+    def __init__(self, page: ft.Page, api_client: AsyncAPIClient):
         super().__init__()
         self.page = page
         self.api_client = api_client
@@ -15,6 +15,7 @@ class EventListView(ft.View):
         self.page_size = 10
         self.total_pages = 1
         self.search_term = ""
+        self._load_generation = 0  # Bumped by each load; older responses are dropped
         self.build()
     
     def build(self):
@@ -150,8 +151,8 @@ class EventListView(ft.View):
         """Called when the view is mounted"""
         # Schedule loading events to happen after the view is mounted
         self.page.update()
-        # Run the load_events method directly after the view is mounted
-        self.load_events()
+        # Load events on the page's event loop so a slow API never blocks the UI
+        self.page.run_task(self.load_events)
     
     def _create_tab_button(self, text: str, tab_id: str):
         """Create a tab button for event filtering"""
@@ -186,43 +187,54 @@ class EventListView(ft.View):
         
         # View will be updated by the parent
     
-    def handle_tab_click(self, e):
+    async def handle_tab_click(self, e):
         """Handle tab button click"""
         if e.control.data != self.current_tab:
             self.current_tab = e.control.data
             self.current_page = 1
             self._update_tab_styling()
-            self.load_events()
+            await self.load_events()
     
-    def handle_search_change(self, e):
+    async def handle_search_change(self, e):
         """Handle search input change"""
         self.search_term = e.control.value
         self.current_page = 1
-        self.load_events()
+        await self.load_events()
     
     def change_page(self, page):
         """Change to a specific page"""
         if 1 <= page <= self.total_pages:
             self.current_page = page
-            self.load_events()
+            self.page.run_task(self.load_events)
     
-    def refresh_events(self, e=None):
+    async def refresh_events(self, e=None):
         """Refresh events data"""
-        self.load_events()
+        await self.load_events()
     
-    def load_events(self):
+    async def load_events(self):
         """Load events from API with current filters"""
+        self._load_generation += 1
+        generation = self._load_generation
+        
         # Show loading indicator
         self.loading_indicator.visible = True
         self.update()
         
         # Fetch events from API
-        events, total_count = self.api_client.get_events_paginated(
-            page=self.current_page,
-            page_size=self.page_size,
-            tab=self.current_tab,
-            search=self.search_term
-        )
+        try:
+            events, total_count = await self.api_client.get_events_paginated(
+                page=self.current_page,
+                page_size=self.page_size,
+                tab=self.current_tab,
+                search=self.search_term
+            )
+        except Exception as e:
+            print(f"Error loading events: {e}")
+            events, total_count = [], 0
+        
+        # A newer search or page change was started while this one was in flight
+        if generation != self._load_generation:
+            return
         
         # Update state
         self.events = events
@@ -265,7 +277,9 @@ class EventListView(ft.View):
         """Handle event row click"""
         self.page.go(f"/event/{event['id']}")
     
-    def handle_logout(self, e=None):
+    async def handle_logout(self, e=None):
         """Handle logout button click"""
         self.api_client.logout()
+        # Drop the pooled connections along with the session
+        await self.api_client.aclose()
         self.page.go("/")
@@ -1,9 +1,9 @@
 import flet as ft
-from src.utils.api_client import APIClient
+from src.utils.async_api_client import AsyncAPIClient
 from src.components.topbar import TopBar
 
 class ExperienceSelectView(ft.View):
-    def __init__(self, page: ft.Page, api_client: APIClient, event_id: str):
+    def __init__(self, page: ft.Page, api_client: AsyncAPIClient, event_id: str):
         super().__init__()
         self.page = page
         self.api_client = api_client
@@ -33,12 +33,9 @@ class ExperienceSelectView(ft.View):
             text_align=ft.TextAlign.CENTER,
         )
         
-        # Loading the event details
-        self.event = self.api_client.get_event(self.event_id)
-        
-        # Event name subtitle
+        # Event name subtitle, filled in once the event has loaded
         self.event_name = ft.Text(
-            self.event.get("name", "Event") if self.event else "Event",
+            "Event",
             size=20,
             color="#aaaaaa",
             text_align=ft.TextAlign.CENTER,
@@ -136,7 +133,23 @@ class ExperienceSelectView(ft.View):
                 expand=True,
             )
         ]
-    
+
+    def did_mount(self, e=None):
+        """Called when the view is mounted"""
+        # Fetch the event name in the background instead of during build
+        self.page.run_task(self.load_event)
+
+    async def load_event(self):
+        """Load the event from the API and show its name"""
+        try:
+            self.event = await self.api_client.get_event(self.event_id)
+        except Exception as e:
+            print(f"Error loading event {self.event_id}: {e}")
+            return
+        if self.event:
+            self.event_name.value = self.event.get("name", "Event")
+            self.update()
+
     def _create_experience_card(self, title, icon, description, color, on_click, width, height):
         """Create an experience option card"""
         # Create the card content
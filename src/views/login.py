@@ -1,8 +1,8 @@
 import flet as ft
-from src.utils.api_client import APIClient
+from src.utils.async_api_client import AsyncAPIClient
 
 class LoginView(ft.View):
-    def __init__(self, page: ft.Page, api_client: APIClient):
+    def __init__(self, page: ft.Page, api_client: AsyncAPIClient):
         super().__init__()
         self.page = page
         self.api_client = api_client
@@ -147,7 +147,9 @@ class LoginView(ft.View):
         self.update()
         
         # Attempt login
-        # success = self.api_client.login(email, password)
+        # Login is disabled for now; the client's login() is a coroutine, so enabling it
+        # means making this handler async and awaiting it:
+        # success = await self.api_client.login(email, password)
         success = True
         if success:
             # Navigate to events page
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""Chunked, resumable uploads against a local mock of the upload-session API."""
+import http.server
+import json
+import os
+import re
+import threading
+import uuid
+
+import httpx
+import pytest
+
+from src.controllers.upload_queue import UploadQueue
+from src.utils.api_client import APIClient
+
+
+class MockUploadServer(http.server.ThreadingHTTPServer):
+    """POST/GET/PUT /api/events/<id>/media/uploads/[<upload_id>/], in memory."""
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _UploadHandler)
+        self.sessions = {}
+        self.fail_puts = set()  # PUT numbers (1-based) answered with 503
+        self.stuck = False  # Acknowledge PUTs without moving the offset
+        self.puts = 0
+        self.ranges = []  # Content-Range header of every PUT
+        self.bytes_received = 0
+        self.completed = []
+
+
+class _UploadHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _body(self):
+        return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+    def _send(self, code, obj):
+        body = json.dumps(obj).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _session(self):
+        return self.server.sessions.get(self.path.rstrip("/").split("/")[-1])
+
+    def do_POST(self):
+        request = json.loads(self._body())
+        upload_id = uuid.uuid4().hex
+        self.server.sessions[upload_id] = {"size": request["size"], "data": bytearray()}
+        self._send(201, {"upload_id": upload_id, "offset": 0})
+
+    def do_GET(self):
+        session = self._session()
+        if session is None:
+            self._send(404, {})
+        else:
+            self._send(200, {"offset": len(session["data"])})
+
+    def do_PUT(self):
+        body = self._body()
+        server, session = self.server, self._session()
+        server.puts += 1
+        server.ranges.append(self.headers.get("Content-Range"))
+        server.bytes_received += len(body)
+        if server.puts in server.fail_puts:
+            self._send(503, {})
+            return
+        if server.stuck:
+            self._send(200, {"offset": len(session["data"])})
+            return
+        content_range = self.headers.get("Content-Range")
+        start = int(re.match(r"bytes (\d+)-", content_range).group(1)) if content_range else 0
+        assert start == len(session["data"])
+        session["data"] += body
+        if len(session["data"]) >= session["size"]:
+            server.completed.append(bytes(session["data"]))
+            self._send(201, {"id": 1, "offset": len(session["data"])})
+        else:
+            self._send(200, {"offset": len(session["data"])})
+
+
+@pytest.fixture
+def server():
+    server = MockUploadServer()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def video(tmp_path):
+    path = tmp_path / "video_test.mp4"
+    path.write_bytes(os.urandom(5 * 64 * 1024 + 123))
+    return str(path)
+
+
+def _client(server):
+    return APIClient(base_url=f"http://127.0.0.1:{server.server_address[1]}/api")
+
+
+def test_chunked_upload_resumes_from_committed_offset(server, video):
+    chunk = 64 * 1024
+    committed = []
+    server.fail_puts = {3}
+    client = _client(server)
+
+    # The third chunk fails; the first two stay committed on the server
+    response = client.post_media_chunked(1, video, "video", chunk_size=chunk,
+                                         on_committed=lambda uid, offset: committed.append((uid, offset)))
+    assert response.status_code == 503
+    upload_id, offset = committed[-1]
+    assert offset == 2 * chunk
+
+    response = client.post_media_chunked(1, video, "video", chunk_size=chunk, upload_id=upload_id)
+    assert response.status_code == 201
+    with open(video, "rb") as f:
+        content = f.read()
+    assert server.completed == [content]
+    # Only the failed chunk was sent twice
+    assert server.bytes_received == len(content) + chunk
+
+
+def test_chunked_upload_of_empty_file_sends_one_put_without_range(server, tmp_path):
+    path = tmp_path / "empty.mp4"
+    path.write_bytes(b"")
+    response = _client(server).post_media_chunked(1, str(path), "video", chunk_size=64 * 1024)
+    assert response.status_code == 201
+    assert server.ranges == [None]
+    assert server.completed == [b""]
+
+
+def test_chunked_upload_rejects_offset_that_does_not_advance(server, video):
+    server.stuck = True
+    with pytest.raises(httpx.RemoteProtocolError):
+        _client(server).post_media_chunked(1, video, "video", chunk_size=64 * 1024)
+    assert server.puts == 1
+
+
+def test_upload_queue_fails_job_when_offset_never_advances(server, video, tmp_path):
+    server.stuck = True
+    finished = threading.Event()
+    queue = UploadQueue(_client(server), str(tmp_path / "uploads.db"), workers=1, max_attempts=3,
+                        base_delay=0.01, chunk_size=64 * 1024, chunked_threshold=0,
+                        on_finished=lambda job: finished.set())
+    queue.start()
+    try:
+        job_id = queue.enqueue(video, 1, "video")
+        assert finished.wait(10)
+        job = next(job for job in queue.jobs() if job.id == job_id)
+        assert job.status == "failed"
+        assert job.attempts == 3
+        assert server.puts == 3
+    finally:
+        queue.close()
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""Ordering and invariants of the frame ring, queues, video writer and encoder pool."""
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from src.controllers import async_video_writer, encoder_pool
+from src.controllers.async_video_writer import AsyncVideoWriter
+from src.controllers.bounded_queue import DropOldestQueue
+from src.controllers.encoder_pool import JpegEncoderPool
+from src.controllers.frame_ring import FrameRing
+from src.controllers.preview_pipeline import PreviewPipeline
+
+FPS = 30.0
+
+
+class FakeVideoWriter:
+    """Stands in for cv2.VideoWriter; keeps the first pixel of every frame written."""
+
+    def __init__(self, *args):
+        self.frames = []
+        self.gate = threading.Event()
+        self.gate.set()
+        self.released = False
+
+    def isOpened(self):
+        return not self.released
+
+    def write(self, frame):
+        self.gate.wait()
+        self.frames.append(int(frame[0, 0, 0]))
+
+    def release(self):
+        self.released = True
+
+
+@pytest.fixture
+def fake_writer(monkeypatch):
+    writers = []
+
+    def factory(*args):
+        writers.append(FakeVideoWriter(*args))
+        return writers[-1]
+
+    monkeypatch.setattr(async_video_writer.cv2, "VideoWriter", factory)
+    return writers
+
+
+def _frame(value):
+    return np.full((4, 4, 3), value, dtype=np.uint8)
+
+
+def test_ring_invalidates_frames_once_the_producer_laps_them():
+    ring = FrameRing(4)
+    for seq in range(4):
+        ring.push(_frame(seq), seq / FPS)
+    ref = ring.get(1)
+    assert ring.is_valid(1) and int(ref.frame[0, 0, 0]) == 1
+
+    for seq in range(4, 8):
+        ring.push(_frame(seq), seq / FPS)
+    # Slot 1 now holds frame 5; the old view sees the new pixels, is_valid() tells
+    assert not ring.is_valid(1)
+    assert ring.get(1) is None
+    assert int(ref.frame[0, 0, 0]) == 5
+    assert ring.is_valid(5) and ring.latest().seq == 7
+    # recent() leaves out the slot the producer writes next
+    assert [ref.seq for ref in ring.recent(8)] == [5, 6, 7]
+
+
+def test_drop_oldest_queue_keeps_the_newest_items():
+    queue = DropOldestQueue(3)
+    dropped = [queue.put(item) for item in range(5)]
+    assert dropped == [False, False, False, True, True]
+    assert queue.stats() == {"enqueued": 5, "dropped": 2, "depth": 3}
+    assert queue.get(timeout=0.01) == 2
+
+    queue.close()
+    assert queue.put(5) is False
+    # Items queued before close() are still handed out, then get() stops waiting
+    assert [queue.get(timeout=5), queue.get(timeout=5)] == [3, 4]
+    started = time.monotonic()
+    assert queue.get(timeout=5) is None
+    assert time.monotonic() - started < 1
+
+
+def test_writer_maps_capture_times_onto_the_output_clock(fake_writer):
+    writer = AsyncVideoWriter("clip.mp4", 0, FPS, (4, 4))
+    # Slot 1 is captured twice, slots 2 and 3 are missed
+    for value, slot in [(0, 0), (1, 1), (2, 1.4), (3, 4)]:
+        writer.write(_frame(value), 100.0 + slot / FPS, wait=True)
+    writer.release()
+
+    assert fake_writer[0].frames == [0, 1, 1, 1, 3]
+    assert fake_writer[0].released
+    assert (writer.written, writer.skipped, writer.duplicated) == (3, 1, 2)
+
+
+def test_encoder_pool_delivers_in_submission_order(monkeypatch):
+    def slow_encode(frame, quality, scale):
+        # Earlier frames take longer, so workers finish out of order
+        time.sleep(0.01 * (8 - int(frame[0, 0, 0])))
+        return bytes([int(frame[0, 0, 0])])
+
+    monkeypatch.setattr(encoder_pool, "encode_jpeg", slow_encode)
+    delivered = []
+    done = threading.Event()
+
+    def on_encoded(tag, jpeg):
+        delivered.append((tag, jpeg))
+        if len(delivered) == 8:
+            done.set()
+
+    pool = JpegEncoderPool(workers=4, queue_size=8)
+    try:
+        for value in range(8):
+            pool.submit(_frame(value), on_encoded, tag=value)
+        assert done.wait(5)
+    finally:
+        pool.close()
+    assert delivered == [(value, bytes([value])) for value in range(8)]
+
+
+def test_recorder_writes_the_frame_it_dequeued_while_writer_is_full(fake_writer):
+    ring = FrameRing(8)
+    pipeline = PreviewPipeline(None, ring, lambda data, captured_at: None)
+    pipeline.video_writer = AsyncVideoWriter("clip.mp4", 0, FPS, (4, 4), queue_size=1)
+    writer = fake_writer[0]
+    writer.gate.clear()
+
+    refs = [ring.get(ring.push(_frame(seq), seq / FPS)) for seq in range(3)]
+    recorder = threading.Thread(target=lambda: [pipeline._write_frame(ref) for ref in refs])
+    recorder.start()
+    # Frame 0 is in the encoder, frame 1 fills the queue, frame 2 waits for room
+    deadline = time.monotonic() + 5
+    while pipeline._counters["recorder"]["frames"] < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    time.sleep(0.05)
+    # Meanwhile the camera laps the ring and overwrites frame 2's slot
+    for seq in range(3, 3 + ring.slots):
+        ring.push(_frame(200), seq / FPS)
+    writer.gate.set()
+    recorder.join(5)
+    pipeline.video_writer.release()
+
+    assert writer.frames == [0, 1, 2]
+    assert pipeline._counters["recorder"]["stale"] == 0
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""Boomerang loop schedules and perceptual-hash duplicate detection."""
+import cv2
+import numpy as np
+import pytest
+
+from src.controllers.boomerang_builder import loop_indices
+from src.controllers.media_dedup import UploadDeduplicator, hamming_distances, perceptual_hash
+from src.controllers.media_store import MediaItem
+
+
+@pytest.mark.parametrize("count", [2, 3, 5, 45])
+def test_loop_folds_back_symmetrically(count):
+    indices = loop_indices(count)
+    assert len(indices) == 2 * (count - 1)
+    assert indices[0] == 0 and indices[count - 1] == count - 1
+    # The return half mirrors the forward half, and every step (including
+    # the jump back to the start of the next pass) moves one frame
+    assert indices[1:].tolist() == indices[1:][::-1].tolist()
+    assert set(np.abs(np.diff(np.append(indices, indices[0]))).tolist()) == {1}
+
+
+def test_loop_of_a_single_frame():
+    assert loop_indices(1).tolist() == [0]
+
+
+def test_speed_ramp_is_slow_at_the_turnarounds():
+    count = 30
+    indices = loop_indices(count, speed_ramp=True, min_speed=0.5, max_speed=2.0)
+    steps = np.abs(np.diff(indices))
+    assert indices[0] == 0 and indices.max() == count - 1 and indices.min() == 0
+    assert abs(int(indices[-1]) - int(indices[0])) <= 1
+    turn = int(np.argmax(indices))
+    # At half speed near either end, full speed in between
+    assert steps[:3].max() <= 1 and steps[-3:].max() <= 1
+    assert steps[turn - 2:turn + 2].max() <= 1
+    assert steps.max() == 2
+    # A flat ramp at 1x is the plain loop
+    assert loop_indices(count, True, 1.0, 1.0).tolist() == loop_indices(count).tolist()
+
+
+class FakeLibrary:
+    """The two MediaLibrary queries UploadDeduplicator uses, over a list of items."""
+
+    def __init__(self, items):
+        self.items = items
+
+    def find_by_sha256(self, sha256, event_id, before_id=None):
+        return next((item for item in self.items if item.sha256 == sha256 and item.event_id == event_id
+                     and (before_id is None or item.id < before_id)), None)
+
+    def recent(self, event_id, mode, since, until, exclude_id=None):
+        return [item for item in self.items if item.event_id == event_id and item.media_type == mode
+                and since <= item.created_at <= until and item.id != exclude_id]
+
+
+def _photo(media_id, phash, created_at=100.0, sha256=None):
+    return MediaItem(f"photo_{media_id}.jpg", "photo", created_at, media_id, 1, sha256=sha256, phash=phash)
+
+
+def _signed(value):
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def _scene(seed):
+    rng = np.random.default_rng(seed)
+    return cv2.resize(rng.integers(0, 256, (6, 8, 3), dtype=np.uint8), (320, 240), interpolation=cv2.INTER_CUBIC)
+
+
+def test_dhash_survives_reencoding_but_not_a_different_scene():
+    scene = _scene(1)
+    ok, jpeg = cv2.imencode(".jpg", cv2.convertScaleAbs(scene, alpha=1.0, beta=10), [cv2.IMWRITE_JPEG_QUALITY, 40])
+    reencoded = cv2.resize(cv2.imdecode(jpeg, cv2.IMREAD_COLOR), (160, 120))
+    hashes = np.array([perceptual_hash(reencoded), perceptual_hash(_scene(2))], dtype=np.uint64)
+    near, other = hamming_distances(perceptual_hash(scene), hashes)
+    assert near <= 4
+    assert other > 16
+
+
+@pytest.mark.parametrize("flipped_bits, duplicate", [(0, True), (4, True), (5, False), (32, False)])
+def test_near_duplicates_are_within_max_distance(flipped_bits, duplicate):
+    # High bit set, so the library stores the hash as a negative integer
+    original = 0xF0E1D2C3B4A59687
+    earlier = _photo(1, _signed(original))
+    item = _photo(2, _signed(original ^ ((1 << flipped_bits) - 1)), created_at=105.0)
+    dedup = UploadDeduplicator(FakeLibrary([earlier, item]), collapse_near=True, window=10.0, max_distance=4)
+    assert dedup.find(item) == (earlier if duplicate else None)
+    assert dedup.stats() == {"exact": 0, "near": int(duplicate)}
+
+
+def test_near_duplicates_only_within_window_and_when_enabled():
+    earlier = _photo(1, 0x1234)
+    item = _photo(2, 0x1235, created_at=120.0)
+    assert UploadDeduplicator(FakeLibrary([earlier, item]), collapse_near=True, window=10.0).find(item) is None
+    item = item._replace(created_at=105.0)
+    assert UploadDeduplicator(FakeLibrary([earlier, item]), collapse_near=False).find(item) is None
+    assert UploadDeduplicator(FakeLibrary([earlier, item]), collapse_near=True).find(item) == earlier
+
+
+def test_exact_duplicates_are_caught_without_collapse_near():
+    earlier = _photo(1, 0x1234, sha256="abc")
+    item = _photo(2, ~0x1234, created_at=500.0, sha256="abc")
+    dedup = UploadDeduplicator(FakeLibrary([earlier, item]))
+    assert dedup.find(item) == earlier
+    assert dedup.find(earlier) is None
+    assert dedup.stats() == {"exact": 1, "near": 0}
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""Journal recovery, retries and deduplication of the upload queue, with a fake API client."""
+import sqlite3
+import threading
+
+import httpx
+import pytest
+
+from src.controllers import upload_queue
+from src.controllers.upload_queue import UploadQueue
+
+
+class FakeResponse:
+    def __init__(self, status_code):
+        self.status_code = status_code
+        self.text = ""
+
+
+class FakeClient:
+    """Answers each upload with the next status code (or raises the next exception), then 201."""
+
+    def __init__(self, *answers):
+        self.answers = list(answers)
+        self.uploads = []
+
+    def post_media(self, event_id, path, media_type, template_id=None, on_progress=None):
+        self.uploads.append(path)
+        answer = self.answers.pop(0) if self.answers else 201
+        if isinstance(answer, Exception):
+            raise answer
+        return FakeResponse(answer)
+
+
+class Finished:
+    """on_finished callback that lets a test wait for a number of finished jobs."""
+
+    def __init__(self):
+        self.jobs = []
+        self._changed = threading.Condition()
+
+    def __call__(self, job):
+        with self._changed:
+            self.jobs.append(job)
+            self._changed.notify_all()
+
+    def wait(self, count, timeout=10):
+        with self._changed:
+            return self._changed.wait_for(lambda: len(self.jobs) >= count, timeout)
+
+
+@pytest.fixture
+def photo(tmp_path):
+    path = tmp_path / "photo.jpg"
+    path.write_bytes(b"\xff\xd8" + b"x" * 1000)
+    return str(path)
+
+
+def _queue(tmp_path, client, **kwargs):
+    kwargs.setdefault("workers", 1)
+    kwargs.setdefault("base_delay", 0.001)
+    return UploadQueue(client, str(tmp_path / "uploads.db"), **kwargs)
+
+
+def _job(queue, job_id):
+    return next(job for job in queue.jobs() if job.id == job_id)
+
+
+def test_restart_resumes_interrupted_uploads_only(tmp_path, photo):
+    first = _queue(tmp_path, FakeClient())
+    interrupted = first.enqueue(photo, 1)
+    uploaded = first.enqueue(photo, 1)
+    first.close()
+    # The app died mid-upload of one job after finishing the other
+    db = sqlite3.connect(str(tmp_path / "uploads.db"))
+    db.execute("UPDATE uploads SET status = 'uploading', attempts = 1 WHERE id = ?", (interrupted,))
+    db.execute("UPDATE uploads SET status = 'done', attempts = 1 WHERE id = ?", (uploaded,))
+    db.commit()
+    db.close()
+
+    client, finished = FakeClient(), Finished()
+    queue = _queue(tmp_path, client, on_finished=finished)
+    queue.start()
+    try:
+        assert finished.wait(1)
+        assert client.uploads == [photo]
+        assert [job.id for job in finished.jobs] == [interrupted]
+        assert _job(queue, interrupted).status == "done"
+        assert _job(queue, interrupted).attempts == 2
+    finally:
+        queue.close()
+
+
+def test_backoff_doubles_up_to_the_maximum(tmp_path, monkeypatch):
+    queue = _queue(tmp_path, FakeClient(), base_delay=2.0, max_delay=30.0)
+    monkeypatch.setattr(upload_queue.random, "uniform", lambda low, high: high)
+    assert [queue._backoff(attempts) for attempts in range(1, 7)] == [2.0, 4.0, 8.0, 16.0, 30.0, 30.0]
+    # Jitter only ever shortens the delay, by at most half
+    monkeypatch.setattr(upload_queue.random, "uniform", lambda low, high: low)
+    assert queue._backoff(3) == 4.0
+    queue.close()
+
+
+@pytest.mark.parametrize("answer, retried", [
+    (503, True),
+    (500, True),
+    (408, True),
+    (425, True),
+    (429, True),
+    (httpx.ConnectError("connection refused"), True),
+    (400, False),
+    (404, False),
+    (409, False),
+    (413, False),
+])
+def test_retry_classification(tmp_path, photo, answer, retried):
+    client, finished = FakeClient(answer), Finished()
+    queue = _queue(tmp_path, client, max_attempts=3, on_finished=finished)
+    queue.start()
+    try:
+        job_id = queue.enqueue(photo, 1)
+        assert finished.wait(1)
+        job = _job(queue, job_id)
+        if retried:
+            assert (job.status, job.attempts, len(client.uploads)) == ("done", 2, 2)
+            assert queue.retries == 1
+        else:
+            assert (job.status, job.attempts, len(client.uploads)) == ("failed", 1, 1)
+            assert job.last_error.startswith(f"HTTP {answer}")
+    finally:
+        queue.close()
+
+
+def test_gives_up_after_max_attempts(tmp_path, photo):
+    client, finished = FakeClient(503, 503, 503, 503), Finished()
+    queue = _queue(tmp_path, client, max_attempts=3, on_finished=finished)
+    queue.start()
+    try:
+        job_id = queue.enqueue(photo, 1)
+        assert finished.wait(1)
+        job = _job(queue, job_id)
+        assert (job.status, job.attempts, job.last_error) == ("failed", 3, "HTTP 503")
+        assert len(client.uploads) == 3
+    finally:
+        queue.close()
+
+
+def test_same_content_is_queued_once_per_event(tmp_path, photo):
+    client, finished = FakeClient(400), Finished()
+    queue = _queue(tmp_path, client, on_finished=finished)
+    first = queue.enqueue(photo, 1, content_hash="abc")
+    assert queue.enqueue(photo, 1, content_hash="abc") == first
+    assert queue.duplicates == 1
+    other_event = queue.enqueue(photo, 2, content_hash="abc")
+    assert other_event != first
+    assert len(queue.jobs()) == 2
+
+    # A failed upload doesn't block queueing the same content again
+    queue.start()
+    try:
+        assert finished.wait(2)
+        assert _job(queue, first).status == "failed"
+        again = queue.enqueue(photo, 1, content_hash="abc")
+        assert again not in (first, other_event)
+        assert finished.wait(3)
+        assert _job(queue, again).status == "done"
+    finally:
+        queue.close()